@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+almacen_contenido.py - Almacén por contenido: cada video idéntico, una sola vez
+El mismo clip resubido en Facebook, Instagram y TikTok (o con otro título)
+ocupa lo mismo una vez que diez: cada archivo terminado se identifica por
+la huella de su contenido, se guarda en ~/Descargas/.almacen y queda en la
+carpeta de descarga, con su nombre de siempre, como enlace duro al objeto.
+
+La huella se calcula en una sola pasada leyendo el archivo con mmap: xxh3
+de 128 bits si está instalado xxhash (pip install xxhash), BLAKE2b si no.
+
+Ojo: todos los nombres de un mismo objeto son el mismo archivo; editarlo
+en sitio cambia todas las copias. Borrar un nombre no borra los demás.
+
+Uso como comando:
+    python almacen_contenido.py escanear [directorio ...] [--simular]
+    python almacen_contenido.py limpiar
+"""
+
+import errno
+import hashlib
+import mmap
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+from core import formatear_titulo_seccion
+
+
+BLOQUE_LECTURA = 8 * 1024 * 1024
+# Antes de leer archivos enteros del mismo tamaño se compara su principio
+BYTES_HUELLA_PARCIAL = 1024 * 1024
+
+# Línea que yt-dlp añade al registro al terminar cada descarga
+PLANTILLA_REGISTRO = "after_move:%(filepath)s"
+
+# Sistemas de archivos donde no se puede enlazar (FAT, otra unidad...)
+_SIN_ENLACES = {errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP}
+
+
+def ruta_almacen_por_defecto():
+    """En ~/Descargas, para compartir sistema de archivos con las carpetas de descarga"""
+    return Path.home() / "Descargas" / ".almacen"
+
+
+def algoritmo_disponible():
+    """'xxh3_128' si está instalado xxhash, si no 'blake2b'"""
+    try:
+        import xxhash  # noqa: F401
+    except ImportError:
+        return 'blake2b'
+    return 'xxh3_128'
+
+
+def _nuevo_hash(algoritmo):
+    if algoritmo == 'xxh3_128':
+        import xxhash
+        return xxhash.xxh3_128()
+    return hashlib.blake2b(digest_size=16)
+
+
+def huella(ruta, algoritmo=None, limite=None):
+    """Huella hexadecimal del contenido (de los primeros `limite` bytes si se indica)"""
+    calculo = _nuevo_hash(algoritmo or algoritmo_disponible())
+    with open(ruta, 'rb') as f:
+        tamano = os.fstat(f.fileno()).st_size
+        if limite is not None:
+            tamano = min(tamano, limite)
+        if tamano == 0:
+            return calculo.hexdigest()      # mmap no admite archivos vacíos
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            if hasattr(mapa, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+                mapa.madvise(mmap.MADV_SEQUENTIAL)
+            vista = memoryview(mapa)
+            try:
+                for inicio in range(0, tamano, BLOQUE_LECTURA):
+                    calculo.update(vista[inicio:min(inicio + BLOQUE_LECTURA, tamano)])
+            finally:
+                vista.release()
+    return calculo.hexdigest()
+
+
+def _inodo(estado):
+    return estado.st_dev, estado.st_ino
+
+
+class AlmacenContenido:
+    """Objetos <raíz>/<algoritmo>/<2 primeros>/<huella>, enlazados desde las descargas
+
+    El propio sistema de archivos hace de índice: no hay base de datos que
+    mantener, y un objeto al que ya no enlaza ninguna descarga (un solo
+    enlace) se puede borrar con limpiar(). Seguro entre hilos y procesos:
+    solo usa operaciones atómicas (link, replace).
+    """
+
+    def __init__(self, raiz=None, algoritmo=None):
+        self.raiz = Path(raiz or ruta_almacen_por_defecto()).expanduser()
+        self.algoritmo = algoritmo or algoritmo_disponible()
+
+    def ruta_objeto(self, valor):
+        return self.raiz / self.algoritmo / valor[:2] / valor
+
+    def objetos(self, todos=False):
+        """Rutas de los objetos guardados con este algoritmo (o con cualquiera)"""
+        base = self.raiz if todos else self.raiz / self.algoritmo
+        if not base.is_dir():
+            return []
+        return [r for r in base.glob("*/*/*" if todos else "*/*") if r.is_file()]
+
+    def guardar(self, ruta, valor=None):
+        """Guarda el archivo en el almacén y lo deja enlazado al objeto
+
+        Devuelve los bytes ahorrados: el tamaño del archivo si ya había una
+        copia idéntica guardada, 0 si es la primera. Lanza OSError si el
+        almacén está en otro sistema de archivos o no admite enlaces duros.
+        """
+        ruta = Path(ruta)
+        estado = ruta.stat()
+        objeto = self.ruta_objeto(valor or huella(ruta, self.algoritmo))
+        objeto.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(ruta, objeto)           # primera copia: el objeto es el propio archivo
+            return 0
+        except FileExistsError:
+            pass
+        estado_objeto = objeto.stat()
+        if _inodo(estado_objeto) == _inodo(estado):
+            return 0
+        if estado_objeto.st_size != estado.st_size:
+            # Objeto a medias o corrupto: se sustituye por el archivo
+            self._enlazar(ruta, objeto)
+            return 0
+        self._enlazar(objeto, ruta)
+        return estado.st_size
+
+    @staticmethod
+    def _enlazar(origen, destino):
+        """Sustituye destino por un enlace duro a origen sin dejar un hueco"""
+        temporal = destino.with_name(f".{destino.name}.{os.getpid()}.enlace")
+        try:
+            os.link(origen, temporal)
+            os.replace(temporal, destino)
+        finally:
+            if temporal.exists():
+                temporal.unlink()
+
+    def guardar_descarga(self, ruta):
+        """guardar() para los descargadores: avisa en pantalla y nunca falla"""
+        try:
+            ahorrado = self.guardar(ruta)
+        except OSError as e:
+            if e.errno in _SIN_ENLACES:
+                print(f"⚠️  No se puede enlazar con el almacén ({self.raiz}): {e.strerror}")
+            else:
+                print(f"⚠️  No se pudo guardar en el almacén {Path(ruta).name}: {e}")
+            return 0
+        if ahorrado:
+            from eventos_progreso import formatear_bytes
+            print(f"♻️  Copia idéntica ya guardada: {Path(ruta).name} "
+                  f"({formatear_bytes(ahorrado)} ahorrados)")
+        return ahorrado
+
+    @contextmanager
+    def registro_ytdlp(self):
+        """Argumentos para que yt-dlp informe de lo descargado; se guarda al salir"""
+        temporal = tempfile.mkdtemp(prefix="almacen-")
+        ruta_registro = os.path.join(temporal, "descargas.txt")
+        try:
+            yield ["--print-to-file", PLANTILLA_REGISTRO, ruta_registro]
+            try:
+                with open(ruta_registro, 'r', encoding='utf-8') as f:
+                    rutas = f.read().splitlines()
+            except OSError:
+                rutas = []
+            for ruta in rutas:
+                if ".carrera-" in ruta:
+                    from carrera import ruta_promovida
+                    ruta = ruta_promovida(ruta)
+                if os.path.isfile(ruta):
+                    self.guardar_descarga(ruta)
+        finally:
+            shutil.rmtree(temporal, ignore_errors=True)
+
+    def deduplicar(self, directorios, simular=False):
+        """Enlaza al almacén los archivos de las carpetas que tengan copia idéntica
+
+        Solo se leen archivos cuyo tamaño coincide con el de otro archivo
+        u objeto (y, entre esos, enteros solo los que coinciden en el
+        primer MB). Devuelve un resumen con lo examinado, leído y ahorrado.
+        """
+        from archivo_descargas import EXTENSIONES_MEDIA
+
+        # tamaño -> {inodo: [rutas]}; los objetos van primero en su lista
+        por_tamano = defaultdict(lambda: defaultdict(list))
+        examinados = 0
+        for objeto in self.objetos():
+            estado = objeto.stat()
+            por_tamano[estado.st_size][_inodo(estado)].append(objeto)
+        for directorio in directorios:
+            directorio = Path(directorio).expanduser()
+            if not directorio.is_dir():
+                continue
+            for raiz, carpetas, archivos in os.walk(directorio):
+                carpetas[:] = [c for c in carpetas if not c.startswith('.')]
+                for nombre in archivos:
+                    ruta = Path(raiz) / nombre
+                    if ruta.suffix.lower() not in EXTENSIONES_MEDIA:
+                        continue
+                    estado = ruta.stat()
+                    if estado.st_size == 0:
+                        continue
+                    por_tamano[estado.st_size][_inodo(estado)].append(ruta)
+                    examinados += 1
+
+        resumen = {'examinados': examinados, 'leidos': 0, 'duplicados': 0, 'ahorrado': 0}
+        for tamano, inodos in por_tamano.items():
+            if len(inodos) < 2:
+                continue
+            grupos = [list(inodos.values())]
+            if tamano > BYTES_HUELLA_PARCIAL:
+                grupos = self._agrupar(grupos, BYTES_HUELLA_PARCIAL, resumen)
+            for grupo in self._agrupar(grupos, None, resumen, tamano):
+                self._deduplicar_grupo(grupo, tamano, simular, resumen)
+        return resumen
+
+    def _agrupar(self, grupos, limite, resumen, tamano=None):
+        """Separa cada grupo de inodos por la huella de sus primeros `limite` bytes
+
+        Con limite=None la huella es completa y devuelve pares (huella,
+        [rutas de cada inodo]) de contenido idéntico.
+        """
+        resultado = []
+        for grupo in grupos:
+            por_huella = defaultdict(list)
+            for rutas in grupo:
+                valor = huella(rutas[0], self.algoritmo, limite)
+                resumen['leidos'] += limite or tamano
+                por_huella[valor].append(rutas)
+            for valor, iguales in por_huella.items():
+                if len(iguales) > 1:
+                    resultado.append(iguales if limite is not None else (valor, iguales))
+        return resultado
+
+    def _deduplicar_grupo(self, grupo, tamano, simular, resumen):
+        valor, inodos = grupo
+        objeto = self.ruta_objeto(valor)
+        # Se queda el inodo del objeto (o, si no hay, el del primer archivo)
+        conservado = next((rutas for rutas in inodos if objeto in rutas), inodos[0])
+        if not simular and objeto not in conservado:
+            self.guardar(conservado[0], valor)
+        for rutas in inodos:
+            if rutas is conservado:
+                continue
+            resumen['duplicados'] += len(rutas)
+            resumen['ahorrado'] += tamano
+            if not simular:
+                for ruta in rutas:
+                    self._enlazar(objeto, ruta)
+
+    def limpiar(self):
+        """Borra los objetos a los que ya no enlaza ninguna descarga; devuelve (objetos, bytes)"""
+        borrados = 0
+        liberado = 0
+        for objeto in self.objetos(todos=True):
+            estado = objeto.stat()
+            if estado.st_nlink == 1:
+                objeto.unlink()
+                borrados += 1
+                liberado += estado.st_size
+        return borrados, liberado
+
+
+def main(argv=None):
+    import argparse
+
+    from archivo_descargas import directorios_por_defecto
+    from eventos_progreso import formatear_bytes
+
+    parser = argparse.ArgumentParser(description="Almacén de videos por contenido")
+    parser.add_argument("--almacen", help="Carpeta del almacén (por defecto ~/Descargas/.almacen)")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_escanear = sub.add_parser("escanear",
+                                help="Enlaza al almacén las copias idénticas de las carpetas")
+    p_escanear.add_argument("directorios", nargs="*", help="Carpetas a recorrer")
+    p_escanear.add_argument("--simular", action="store_true",
+                            help="Solo informar de lo que se ahorraría")
+
+    sub.add_parser("limpiar", help="Borra los objetos que ya no usa ninguna descarga")
+
+    args = parser.parse_args(argv)
+    almacen = AlmacenContenido(args.almacen)
+
+    if args.comando == "limpiar":
+        borrados, liberado = almacen.limpiar()
+        print(f"🧹 {borrados} objetos sin usar borrados ({formatear_bytes(liberado)} liberados)")
+        return 0
+
+    directorios = args.directorios or directorios_por_defecto()
+    print(formatear_titulo_seccion("♻️  BUSCANDO COPIAS IDÉNTICAS"))
+    inicio = time.perf_counter()
+    try:
+        resumen = almacen.deduplicar(directorios, simular=args.simular)
+    except OSError as e:
+        print(f"❌ {e}")
+        if e.errno in _SIN_ENLACES:
+            print("   El almacén tiene que estar en el mismo disco que las descargas (--almacen)")
+        return 1
+    print(f"📊 {resumen['examinados']} archivos examinados, "
+          f"{formatear_bytes(resumen['leidos'])} leídos en {time.perf_counter() - inicio:.1f}s")
+    verbo = "se ahorrarían" if args.simular else "ahorrados"
+    print(f"✅ {resumen['duplicados']} copias idénticas: "
+          f"{formatear_bytes(resumen['ahorrado'])} {verbo}")
+    print(f"📁 Almacén: {almacen.raiz} ({almacen.algoritmo})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
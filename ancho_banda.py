@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ancho_banda.py - Reparto global del ancho de banda entre descargas
+Un presupuesto total (bytes/s) se divide entre las descargas activas según
+su peso (plataforma y prioridad) y se recalcula cada vez que una empieza o
+termina. Cada descarga tiene una cuota con su propio cubo de fichas.
+
+    from core import configurar_ancho_banda
+    configurar_ancho_banda("4M", pesos={'youtube': 2})
+
+- Subproceso: yt-dlp arranca con --limit-rate igual al presupuesto total
+  (ninguna descarga sola puede pasar de ahí) y su cuota se hace cumplir con
+  el cubo de fichas, pausándolo (SIGSTOP/SIGCONT) cuando se adelanta. Así
+  la cuota sigue los cambios en los dos sentidos: si otras descargas
+  terminan, la suya sube. En Windows no hay pausas: el --limit-rate es la
+  cuota del arranque y no cambia.
+- En proceso: la cuota actualiza params['ratelimit'] del YoutubeDL en marcha.
+- Cualquier otro descargador puede llamar a cuota.consumir(n) y
+  cuota.esperar() en su bucle de lectura.
+"""
+
+import os
+import re
+import signal
+import threading
+import time
+
+
+RAFAGA_SEGUNDOS = 1.0     # fichas acumulables: un segundo de cuota
+PAUSA_MINIMA = 0.05       # no pausar un proceso por menos de esto
+PUEDE_PAUSAR = hasattr(signal, 'SIGSTOP') and os.name != 'nt'
+
+_TASA = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([kKmMgG]?)(?:i?[bB])?(?:/s)?\s*$')
+_MULTIPLICADORES = {'': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3}
+
+
+def interpretar_tasa(valor):
+    """'500K', '4.2M', 2048 -> bytes/s (mismas unidades que --limit-rate)"""
+    if isinstance(valor, (int, float)):
+        tasa = float(valor)
+    else:
+        coincidencia = _TASA.match(str(valor))
+        if coincidencia is None:
+            raise ValueError(f"Tasa no válida: {valor!r} (ejemplos: 500K, 4M)")
+        tasa = float(coincidencia.group(1)) * _MULTIPLICADORES[coincidencia.group(2).lower()]
+    if tasa <= 0:
+        raise ValueError(f"La tasa debe ser mayor que 0: {valor!r}")
+    return tasa
+
+
+class CuotaBanda:
+    """Parte del presupuesto asignada a una descarga (cubo de fichas)"""
+
+    def __init__(self, gestor, peso, al_cambiar=None):
+        self._gestor = gestor
+        self.peso = peso
+        self.al_cambiar = al_cambiar
+        self.tasa = gestor.total
+        self._saldo = 0.0
+        self._momento = time.monotonic()
+
+    def _reponer(self, ahora):
+        rafaga = self.tasa * RAFAGA_SEGUNDOS
+        self._saldo = min(rafaga, self._saldo + self.tasa * (ahora - self._momento))
+        self._momento = ahora
+
+    def _cambiar_tasa(self, tasa):
+        self._reponer(time.monotonic())
+        self.tasa = tasa
+
+    def limite_subproceso(self):
+        """--limit-rate para un subproceso regulado con ReguladorProceso
+
+        Con pausas, el presupuesto total: la cuota la impone el regulador y
+        puede subir más tarde. Sin pausas, la cuota actual es el único freno.
+        """
+        return self._gestor.total if PUEDE_PAUSAR else self.tasa
+
+    def consumir(self, cantidad):
+        """Descuenta bytes recibidos (el saldo puede quedar en negativo)"""
+        with self._gestor._cerrojo:
+            self._reponer(time.monotonic())
+            self._saldo -= cantidad
+
+    def espera(self):
+        """Segundos hasta saldar la deuda de fichas (0 si hay saldo)"""
+        with self._gestor._cerrojo:
+            self._reponer(time.monotonic())
+            return max(0.0, -self._saldo / self.tasa)
+
+    def esperar(self):
+        segundos = self.espera()
+        if segundos > 0:
+            time.sleep(segundos)
+
+    def liberar(self):
+        """La descarga terminó: su parte se reparte entre las demás"""
+        self._gestor._quitar(self)
+
+
+class GestorAnchoBanda:
+    """Presupuesto total repartido en proporción al peso de cada descarga activa
+
+    El peso de una descarga es el de su plataforma (pesos, 1 por defecto)
+    multiplicado por su prioridad.
+    """
+
+    def __init__(self, total, pesos=None):
+        self.total = interpretar_tasa(total)
+        self.pesos = dict(pesos or {})
+        self._cerrojo = threading.Lock()
+        self._cuotas = []
+
+    def registrar(self, plataforma=None, prioridad=1.0, al_cambiar=None):
+        """Da de alta una descarga y devuelve su cuota"""
+        peso = self.pesos.get(plataforma, 1.0) * prioridad
+        cuota = CuotaBanda(self, max(peso, 1e-6), al_cambiar)
+        with self._cerrojo:
+            self._cuotas.append(cuota)
+            cambios = self._rebalancear()
+        self._avisar(cambios)
+        return cuota
+
+    def _quitar(self, cuota):
+        with self._cerrojo:
+            if cuota not in self._cuotas:
+                return
+            self._cuotas.remove(cuota)
+            cambios = self._rebalancear()
+        self._avisar(cambios)
+
+    def _rebalancear(self):
+        peso_total = sum(c.peso for c in self._cuotas)
+        cambios = []
+        for cuota in self._cuotas:
+            tasa = self.total * cuota.peso / peso_total
+            if tasa != cuota.tasa:
+                cuota._cambiar_tasa(tasa)
+                cambios.append(cuota)
+        return cambios
+
+    @staticmethod
+    def _avisar(cambios):
+        # Fuera del cerrojo: al_cambiar puede tocar un YoutubeDL de otro hilo
+        for cuota in cambios:
+            if cuota.al_cambiar is not None:
+                cuota.al_cambiar(cuota.tasa)
+
+    @property
+    def activas(self):
+        with self._cerrojo:
+            return len(self._cuotas)
+
+    def tasas(self):
+        with self._cerrojo:
+            return [c.tasa for c in self._cuotas]
+
+
+class ReguladorProceso:
+    """Hace cumplir una cuota a un subproceso pausándolo cuando se adelanta
+
+    contabilizar(n) se llama con los bytes que va informando el proceso;
+    atender() lo reanuda cuando ya ha saldado su deuda. al_reanudar recibe
+    los segundos que estuvo pausado (para no confundirlos con un atasco).
+    """
+
+    def __init__(self, proceso, cuota, al_reanudar=None):
+        self.proceso = proceso
+        self.cuota = cuota
+        self.al_reanudar = al_reanudar
+        self._pausado_desde = None
+
+    @property
+    def pausado(self):
+        return self._pausado_desde is not None
+
+    def contabilizar(self, cantidad):
+        if cantidad <= 0:
+            return
+        self.cuota.consumir(cantidad)
+        if PUEDE_PAUSAR and not self.pausado and self.cuota.espera() >= PAUSA_MINIMA:
+            try:
+                self.proceso.send_signal(signal.SIGSTOP)
+            except OSError:
+                return
+            self._pausado_desde = time.monotonic()
+
+    def atender(self):
+        """Reanuda si toca; devuelve cuánto esperar como mucho antes de volver a mirar"""
+        if not self.pausado:
+            return None
+        espera = self.cuota.espera()
+        if espera > 0:
+            return espera
+        self._reanudar()
+        return None
+
+    def _reanudar(self):
+        try:
+            self.proceso.send_signal(signal.SIGCONT)
+        except OSError:
+            pass
+        pausado = time.monotonic() - self._pausado_desde
+        self._pausado_desde = None
+        if self.al_reanudar is not None:
+            self.al_reanudar(pausado)
+
+    def soltar(self):
+        """Reanuda el proceso si estaba pausado y libera la cuota"""
+        if self.pausado:
+            self._reanudar()
+        self.cuota.liberar()
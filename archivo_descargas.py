@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+archivo_descargas.py - Índice persistente de videos ya descargados
+Permite saltar videos que ya están en disco antes de tocar la red
+
+Uso como comando:
+    python archivo_descargas.py reconstruir [directorio ...]
+    python archivo_descargas.py buscar URL|ID
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from canonicalizar import canonicalizar
+from core import formatear_titulo_seccion
+
+
+EXTENSIONES_MEDIA = {
+    '.mp4', '.mkv', '.webm', '.mov', '.avi', '.flv', '.m4a', '.mp3',
+    '.ogg', '.opus', '.aac', '.wav', '.3gp',
+}
+
+# Línea que yt-dlp añade al registro al terminar cada descarga
+PLANTILLA_REGISTRO = "after_move:%(id)s\t%(filepath)s\t%(webpage_url)s"
+
+
+def ruta_archivo_por_defecto():
+    """Índice compartido por descargar_videos.py y facebook_descargador.py"""
+    return Path.home() / "Descargas" / ".archivo_descargas.sqlite3"
+
+
+def directorios_por_defecto():
+    """Carpetas que usan los descargadores"""
+    base = Path.home() / "Descargas"
+    return [base / "Videos", base / "Facebook_Videos"]
+
+
+class ArchivoDescargas:
+    """Índice (plataforma, id de video) -> ruta, tamaño y fecha
+
+    Las búsquedas van por clave primaria en tablas WITHOUT ROWID, así que
+    cuestan lo mismo con cien entradas que con cientos de miles. Las URLs
+    que llevan el id del video se resuelven sin consultar alias; el resto
+    se guardan como alias, en forma canónica, para comprobarlas sin extraer
+    nada.
+    """
+
+    def __init__(self, ruta=None, catalogo=None):
+        self.ruta = Path(ruta or ruta_archivo_por_defecto()).expanduser()
+        # Las descargas (y sus cambios de ruta) se anotan también en el catálogo
+        self.catalogo = catalogo
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        self._cerrojo = threading.Lock()
+        self._conexion = sqlite3.connect(str(self.ruta), check_same_thread=False, timeout=30)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.executescript("""
+            CREATE TABLE IF NOT EXISTS descargas (
+                plataforma TEXT NOT NULL,
+                video_id TEXT NOT NULL,
+                ruta TEXT NOT NULL,
+                tamano INTEGER,
+                fecha REAL NOT NULL,
+                PRIMARY KEY (plataforma, video_id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS alias (
+                url TEXT PRIMARY KEY,
+                plataforma TEXT NOT NULL,
+                video_id TEXT NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS descargas_por_id ON descargas (video_id);
+        """)
+        self._conexion.commit()
+
+    def cerrar(self):
+        with self._cerrojo:
+            self._conexion.close()
+
+    def __len__(self):
+        with self._cerrojo:
+            return self._conexion.execute("SELECT COUNT(*) FROM descargas").fetchone()[0]
+
+    def buscar(self, plataforma, video_id):
+        """Devuelve {'ruta', 'tamano', 'fecha'} si el video está descargado y sigue en disco"""
+        with self._cerrojo:
+            fila = self._conexion.execute(
+                "SELECT ruta, tamano, fecha FROM descargas WHERE plataforma = ? AND video_id = ?",
+                (plataforma, str(video_id))
+            ).fetchone()
+            if fila is None:
+                return None
+            existe = os.path.exists(fila[0])
+            if not existe:
+                # El archivo se borró a mano: olvidar la entrada
+                self._conexion.execute(
+                    "DELETE FROM descargas WHERE plataforma = ? AND video_id = ?",
+                    (plataforma, str(video_id))
+                )
+                self._conexion.commit()
+        if not existe:
+            if self.catalogo is not None:
+                self.catalogo.olvidar_descarga(plataforma, video_id)
+            return None
+        return {'ruta': fila[0], 'tamano': fila[1], 'fecha': fila[2]}
+
+    def buscar_id(self, video_id):
+        """Entradas (con 'plataforma') de un id de video en cualquier plataforma"""
+        with self._cerrojo:
+            filas = self._conexion.execute(
+                "SELECT plataforma FROM descargas WHERE video_id = ?", (str(video_id),)
+            ).fetchall()
+        resultado = []
+        for (plataforma,) in filas:
+            entrada = self.buscar(plataforma, video_id)
+            if entrada is not None:
+                resultado.append(dict(entrada, plataforma=plataforma))
+        return resultado
+
+    def entradas(self):
+        """[(plataforma, id, ruta, tamaño, fecha)] de todo el índice"""
+        with self._cerrojo:
+            return self._conexion.execute(
+                "SELECT plataforma, video_id, ruta, tamano, fecha FROM descargas"
+            ).fetchall()
+
+    def entradas_por_ruta(self):
+        """{ruta: (plataforma, id)} de todo el índice"""
+        with self._cerrojo:
+            filas = self._conexion.execute(
+                "SELECT ruta, plataforma, video_id FROM descargas"
+            ).fetchall()
+        return {ruta: (plataforma, video_id) for ruta, plataforma, video_id in filas}
+
+    def mover(self, plataforma, video_id, anterior, nueva):
+        """Actualiza la ruta de una entrada tras mover el archivo (sin confirmar)"""
+        with self._cerrojo:
+            cambiada = self._conexion.execute(
+                "UPDATE descargas SET ruta = ? WHERE plataforma = ? AND video_id = ? AND ruta = ?",
+                (str(Path(nueva).absolute()), plataforma, str(video_id),
+                 str(Path(anterior).absolute()))
+            ).rowcount
+        if cambiada and self.catalogo is not None:
+            self.catalogo.registrar_descarga(plataforma, video_id, Path(nueva).absolute(),
+                                             os.path.getsize(nueva), confirmar=False)
+
+    def buscar_url(self, url):
+        """Busca por URL sin tocar la red (cualquier variante de la URL)"""
+        plataforma, video_id, canonica = canonicalizar(url)
+        if video_id is not None:
+            return self.buscar(plataforma, video_id)
+        with self._cerrojo:
+            # Los índices creados antes de canonicalizar guardan la URL tal cual
+            clave = self._conexion.execute(
+                "SELECT plataforma, video_id FROM alias WHERE url IN (?, ?)",
+                (canonica, url.strip())
+            ).fetchone()
+        if clave is None:
+            return None
+        return self.buscar(*clave)
+
+    def registrar(self, plataforma, video_id, ruta, urls=(), confirmar=True):
+        """Añade o actualiza una descarga en el índice"""
+        ruta = str(Path(ruta).absolute())
+        try:
+            tamano = os.path.getsize(ruta)
+        except OSError:
+            tamano = None
+
+        with self._cerrojo:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO descargas VALUES (?, ?, ?, ?, ?)",
+                (plataforma, str(video_id), ruta, tamano, time.time())
+            )
+            for url in urls:
+                if url:
+                    self._conexion.execute(
+                        "INSERT OR REPLACE INTO alias VALUES (?, ?, ?)",
+                        (canonicalizar(url)[2], plataforma, str(video_id))
+                    )
+            if confirmar:
+                self._conexion.commit()
+        if self.catalogo is not None:
+            self.catalogo.registrar_descarga(plataforma, video_id, ruta, tamano,
+                                             confirmar=confirmar)
+
+    def confirmar(self):
+        with self._cerrojo:
+            self._conexion.commit()
+        if self.catalogo is not None:
+            self.catalogo.confirmar()
+
+    def importar_registro(self, ruta_registro, url):
+        """Lee las líneas que yt-dlp escribió con PLANTILLA_REGISTRO"""
+        try:
+            with open(ruta_registro, 'r', encoding='utf-8') as f:
+                lineas = f.read().splitlines()
+        except OSError:
+            return 0
+
+        registradas = 0
+        for linea in lineas:
+            partes = linea.split('\t')
+            if len(partes) != 3:
+                continue
+            video_id, ruta, url_pagina = partes
+            if ".carrera-" in ruta:
+                # Descarga en modo carrera: el ganador se movió a la carpeta final
+                from carrera import ruta_promovida
+                ruta = ruta_promovida(ruta)
+            if not os.path.exists(ruta):
+                continue
+            url_pagina = url_pagina if url_pagina != 'NA' else None
+            plataforma = canonicalizar(url_pagina or url)[0]
+            self.registrar(plataforma, video_id, ruta, urls=(url, url_pagina))
+            registradas += 1
+        return registradas
+
+    @contextmanager
+    def registro_ytdlp(self, url):
+        """Argumentos para que yt-dlp informe de lo descargado; se registra al salir"""
+        import shutil
+        import tempfile
+
+        temporal = tempfile.mkdtemp(prefix="registro-")
+        ruta_registro = os.path.join(temporal, "descargas.tsv")
+        try:
+            yield ["--print-to-file", PLANTILLA_REGISTRO, ruta_registro]
+            self.importar_registro(ruta_registro, url)
+        finally:
+            shutil.rmtree(temporal, ignore_errors=True)
+
+    def reconstruir(self, directorios, cache=None):
+        """Vuelve a crear el índice recorriendo las carpetas de descarga
+
+        El id de cada archivo se obtiene del .info.json que lo acompañe o,
+        si no hay, de la URL que yt-dlp guarda en sus metadatos (purl),
+        resuelta con la caché de extracciones.
+        Devuelve (registrados, sin_identificar).
+        """
+        registrados = 0
+        sin_identificar = []
+
+        for directorio in directorios:
+            directorio = Path(directorio).expanduser()
+            if not directorio.is_dir():
+                continue
+            for raiz, carpetas, archivos in os.walk(directorio):
+                carpetas[:] = [c for c in carpetas if not c.startswith('.')]
+                for nombre in archivos:
+                    ruta = Path(raiz) / nombre
+                    if ruta.suffix.lower() not in EXTENSIONES_MEDIA:
+                        continue
+                    clave = identificar_archivo(ruta, cache)
+                    if clave is None:
+                        sin_identificar.append(ruta)
+                        continue
+                    plataforma, video_id, url = clave
+                    self.registrar(plataforma, video_id, ruta, urls=(url,), confirmar=False)
+                    registrados += 1
+
+        self.confirmar()
+        return registrados, sin_identificar
+
+
+def _leer_url_metadatos(ruta):
+    """Lee la URL de origen que --add-metadata guarda en el archivo (requiere ffprobe)"""
+    import shutil
+    import subprocess
+
+    if not shutil.which("ffprobe"):
+        return None
+    try:
+        resultado = subprocess.run(
+            ["ffprobe", "-v", "quiet", "-print_format", "json", "-show_format", str(ruta)],
+            capture_output=True, text=True, timeout=30
+        )
+        etiquetas = json.loads(resultado.stdout or "{}").get("format", {}).get("tags", {})
+    except (subprocess.SubprocessError, ValueError, OSError):
+        return None
+    etiquetas = {k.lower(): v for k, v in etiquetas.items()}
+    url = etiquetas.get("purl") or etiquetas.get("comment")
+    if url and url.startswith(("http://", "https://")):
+        return url
+    return None
+
+
+def identificar_archivo(ruta, cache=None):
+    """Devuelve (plataforma, id, url) de un archivo descargado o None"""
+    info_json = ruta.with_suffix(".info.json")
+    if info_json.exists():
+        try:
+            with open(info_json, 'r', encoding='utf-8') as f:
+                info = json.load(f)
+            if info.get('id'):
+                url = info.get('webpage_url')
+                return canonicalizar(url or '')[0], str(info['id']), url
+        except (OSError, ValueError):
+            pass
+
+    url = _leer_url_metadatos(ruta)
+    if url and cache is not None:
+        clave = cache.clave_de_url(url)
+        if clave:
+            return clave[0], clave[1], url
+    return None
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Índice de videos descargados")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_reconstruir = sub.add_parser("reconstruir", help="Recorre las carpetas y rehace el índice")
+    p_reconstruir.add_argument("directorios", nargs="*", help="Carpetas a recorrer")
+    p_reconstruir.add_argument("--indice", help="Ruta del índice (por defecto ~/Descargas)")
+
+    p_buscar = sub.add_parser("buscar",
+                              help="Comprueba si una URL (o un id de video) ya está descargada")
+    p_buscar.add_argument("url", help="URL o id del video")
+    p_buscar.add_argument("--indice", help="Ruta del índice (por defecto ~/Descargas)")
+
+    args = parser.parse_args(argv)
+    from catalogo import CatalogoMetadatos
+
+    archivo = ArchivoDescargas(args.indice, catalogo=CatalogoMetadatos())
+
+    if args.comando == "reconstruir":
+        from cache_extraccion import CacheExtraccion
+
+        directorios = args.directorios or directorios_por_defecto()
+        print(formatear_titulo_seccion("🗂️  RECONSTRUYENDO ÍNDICE"))
+        inicio = time.perf_counter()
+        registrados, sin_identificar = archivo.reconstruir(directorios, CacheExtraccion())
+        print(f"✅ {registrados} videos registrados en {time.perf_counter() - inicio:.1f}s")
+        if sin_identificar:
+            print(f"⚠️  {len(sin_identificar)} archivos sin identificar:")
+            for ruta in sin_identificar[:10]:
+                print(f"   {ruta}")
+        print(f"📁 Índice: {archivo.ruta} ({len(archivo)} entradas)")
+        return 0
+
+    if not args.url.startswith(("http://", "https://")):
+        entradas = archivo.buscar_id(args.url)
+        for entrada in entradas:
+            print(f"✓ Ya descargado ({entrada['plataforma']}): {entrada['ruta']}")
+        if entradas:
+            return 0
+    else:
+        entrada = archivo.buscar_url(args.url)
+        if entrada:
+            print(f"✓ Ya descargado: {entrada['ruta']}")
+            return 0
+    print("✗ No está en el índice")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+autoajuste.py - Tamaño de trozo y fragmentos simultáneos ajustados por sitio
+Mide la velocidad real de cada descarga con la configuración de transferencia
+usada (--http-chunk-size, --concurrent-fragments) y, para cada sitio, se
+queda con la que más rinde. De vez en cuando prueba una configuración vecina
+de la mejor (un trozo más grande o más pequeño, un fragmento más o menos), así
+que va subiendo hacia el óptimo y se readapta si la red cambia. Las
+mediciones pierden peso con el tiempo y se guardan entre ejecuciones.
+
+    ajuste = AutoAjusteTransferencia()
+    with transferencia_ajustada(ajuste, url, perfil.opciones) as opciones:
+        ejecutar_comando_ytdlp(["yt-dlp", *opciones, url])
+
+Si hay un límite de ancho de banda activo (--limite-banda) no se registra
+nada: la velocidad la marcaría el límite, no la configuración.
+"""
+
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from estadisticas_metodos import clave_dominio
+from eventos_progreso import BUS_PROGRESO, FIN, ERROR, INICIO, PROGRESO
+
+
+# Configuraciones posibles: (tamaño de trozo o None = sin trocear, fragmentos)
+TROZOS = (None, "1M", "4M", "10M", "20M")
+FRAGMENTOS = (1, 2, 4, 8)
+PREDETERMINADA = (None, 1)
+
+EXPLORACION_POR_DEFECTO = 0.2
+VIDA_MEDIA_POR_DEFECTO = 3 * 24 * 3600
+BYTES_MINIMOS = 1024 * 1024     # transferencias más pequeñas no dicen nada de la velocidad
+
+# Opciones de yt-dlp que controla el ajuste (se sustituyen las que haya)
+_OPCIONES_AJUSTADAS = {"--http-chunk-size": 1, "--concurrent-fragments": 1, "-N": 1}
+
+
+def ruta_autoajuste_por_defecto():
+    return Path.home() / "Descargas" / ".autoajuste.sqlite3"
+
+
+def nombre_configuracion(configuracion):
+    trozo, fragmentos = configuracion
+    return f"{trozo or 'entero'}x{fragmentos}"
+
+
+def leer_configuracion(nombre):
+    trozo, _, fragmentos = nombre.rpartition("x")
+    return (None if trozo == "entero" else trozo, int(fragmentos))
+
+
+def configuracion_de_opciones(opciones):
+    """Configuración que ya fijan unas opciones (p. ej. las de un perfil)"""
+    trozo, fragmentos = PREDETERMINADA
+    opciones = list(opciones)
+    for i, opcion in enumerate(opciones[:-1]):
+        if opcion == "--http-chunk-size":
+            trozo = opciones[i + 1]
+        elif opcion in ("--concurrent-fragments", "-N"):
+            fragmentos = int(opciones[i + 1])
+    return trozo, fragmentos
+
+
+def aplicar_configuracion(opciones, configuracion):
+    """Devuelve las opciones con la configuración de transferencia indicada"""
+    resultado = []
+    opciones = list(opciones)
+    i = 0
+    while i < len(opciones):
+        saltar = _OPCIONES_AJUSTADAS.get(opciones[i])
+        if saltar is not None:
+            i += 1 + saltar
+            continue
+        resultado.append(opciones[i])
+        i += 1
+    trozo, fragmentos = configuracion
+    if trozo:
+        resultado += ["--http-chunk-size", trozo]
+    if fragmentos > 1:
+        resultado += ["--concurrent-fragments", str(fragmentos)]
+    return resultado
+
+
+def vecinas(configuracion):
+    """Configuraciones a un paso en la rejilla TROZOS x FRAGMENTOS"""
+    trozo, fragmentos = configuracion
+    resultado = []
+    if trozo in TROZOS:
+        i = TROZOS.index(trozo)
+        resultado += [(TROZOS[j], fragmentos) for j in (i - 1, i + 1) if 0 <= j < len(TROZOS)]
+    if fragmentos in FRAGMENTOS:
+        i = FRAGMENTOS.index(fragmentos)
+        resultado += [(trozo, FRAGMENTOS[j]) for j in (i - 1, i + 1) if 0 <= j < len(FRAGMENTOS)]
+    return resultado
+
+
+class _Medicion:
+    """Bytes y segundos de transferencia (sin extracción ni postproceso) de un comando"""
+
+    def __init__(self):
+        self.bytes = 0
+        self.segundos = 0.0
+        self._desde = None          # (momento, bytes) del primer progreso del archivo
+        self._ultimo = None         # (momento, bytes) del último progreso visto
+
+    def observar(self, evento):
+        if evento.tipo != PROGRESO:
+            return
+        if evento.estado == 'finished':
+            self._cerrar_archivo(evento.momento, evento.descargados)
+        elif self._desde is None:
+            self._desde = self._ultimo = (evento.momento, evento.descargados)
+        else:
+            self._ultimo = (evento.momento, evento.descargados)
+
+    def _cerrar_archivo(self, momento=None, descargados=None):
+        if self._desde is None:
+            return
+        if momento is None:
+            momento, descargados = self._ultimo
+        inicio, base = self._desde
+        # Lo que ya estaba en el .part al reanudar no cuenta como transferido
+        self.bytes += max(0, descargados - base)
+        self.segundos += max(0.0, momento - inicio)
+        self._desde = self._ultimo = None
+
+    def terminar(self):
+        self._cerrar_archivo()
+
+
+class AutoAjusteTransferencia:
+    """Velocidad media por (sitio, configuración) con decaimiento exponencial
+
+    elegir() devuelve la configuración con más velocidad medida (o la
+    predeterminada si aún no hay datos) y, con probabilidad `exploracion`,
+    una vecina de esa con pocas mediciones. medir() registra lo que rinda
+    el comando que se ejecute dentro del contexto.
+    """
+
+    def __init__(self, ruta=None, vida_media=VIDA_MEDIA_POR_DEFECTO,
+                 exploracion=EXPLORACION_POR_DEFECTO, aleatorio=None):
+        self.ruta = Path(ruta or ruta_autoajuste_por_defecto()).expanduser()
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        self.vida_media = vida_media
+        self.exploracion = exploracion
+        self.aleatorio = aleatorio or random.Random()
+        self._cerrojo = threading.Lock()
+        self._conexion = sqlite3.connect(str(self.ruta), check_same_thread=False, timeout=30)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("""
+            CREATE TABLE IF NOT EXISTS rendimiento (
+                sitio TEXT NOT NULL,
+                configuracion TEXT NOT NULL,
+                bytes REAL NOT NULL,
+                segundos REAL NOT NULL,
+                muestras REAL NOT NULL,
+                actualizado REAL NOT NULL,
+                PRIMARY KEY (sitio, configuracion)
+            ) WITHOUT ROWID
+        """)
+        self._conexion.commit()
+        # Mediciones en curso: hilo que lanza el comando y trabajo de yt-dlp
+        self._por_hilo = {}
+        self._por_trabajo = {}
+        BUS_PROGRESO.suscribir(self._al_evento)
+
+    def cerrar(self):
+        BUS_PROGRESO.desuscribir(self._al_evento)
+        with self._cerrojo:
+            self._conexion.close()
+
+    def _factor(self, actualizado, ahora):
+        return 0.5 ** (max(0.0, ahora - actualizado) / self.vida_media)
+
+    def registrar(self, sitio, configuracion, bytes_transferidos, segundos):
+        """Anota una transferencia medida"""
+        if bytes_transferidos < BYTES_MINIMOS or segundos <= 0:
+            return
+        nombre = nombre_configuracion(configuracion)
+        ahora = time.time()
+        with self._cerrojo:
+            fila = self._conexion.execute(
+                "SELECT bytes, segundos, muestras, actualizado FROM rendimiento "
+                "WHERE sitio = ? AND configuracion = ?", (sitio, nombre)
+            ).fetchone()
+            acumulado = (0.0, 0.0, 0.0)
+            if fila is not None:
+                factor = self._factor(fila[3], ahora)
+                acumulado = tuple(v * factor for v in fila[:3])
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO rendimiento VALUES (?, ?, ?, ?, ?, ?)",
+                (sitio, nombre, acumulado[0] + bytes_transferidos,
+                 acumulado[1] + segundos, acumulado[2] + 1.0, ahora)
+            )
+            self._conexion.commit()
+
+    def rendimientos(self, sitio):
+        """{configuración: (bytes/s, muestras)} del sitio"""
+        ahora = time.time()
+        with self._cerrojo:
+            filas = self._conexion.execute(
+                "SELECT configuracion, bytes, segundos, muestras, actualizado "
+                "FROM rendimiento WHERE sitio = ?", (sitio,)
+            ).fetchall()
+        resultado = {}
+        for nombre, cantidad, segundos, muestras, actualizado in filas:
+            factor = self._factor(actualizado, ahora)
+            resultado[leer_configuracion(nombre)] = (cantidad / segundos, muestras * factor)
+        return resultado
+
+    def mejor(self, url, predeterminada=PREDETERMINADA):
+        """Configuración más rápida medida para el sitio de la URL"""
+        rendimientos = self.rendimientos(clave_dominio(url))
+        if not rendimientos:
+            return predeterminada
+        return max(rendimientos, key=lambda c: rendimientos[c][0])
+
+    def elegir(self, url, predeterminada=PREDETERMINADA):
+        """Configuración para la próxima descarga de la URL"""
+        mejor = self.mejor(url, predeterminada)
+        if self.aleatorio.random() >= self.exploracion:
+            return mejor
+        rendimientos = self.rendimientos(clave_dominio(url))
+        candidatas = vecinas(mejor)
+        if not candidatas:
+            return mejor
+        # Primero las que menos se han probado
+        menos = min(rendimientos.get(c, (0, 0.0))[1] for c in candidatas)
+        candidatas = [c for c in candidatas if rendimientos.get(c, (0, 0.0))[1] == menos]
+        return self.aleatorio.choice(candidatas)
+
+    @contextmanager
+    def medir(self, url, configuracion):
+        """Registra la velocidad de los comandos de yt-dlp lanzados en el contexto"""
+        medicion = _Medicion()
+        hilo = threading.get_ident()
+        anterior = self._por_hilo.get(hilo)
+        self._por_hilo[hilo] = medicion
+        try:
+            yield medicion
+        finally:
+            if anterior is None:
+                self._por_hilo.pop(hilo, None)
+            else:
+                self._por_hilo[hilo] = anterior
+            for trabajo in [t for t, m in self._por_trabajo.items() if m is medicion]:
+                self._por_trabajo.pop(trabajo, None)
+            medicion.terminar()
+            from core import gestor_ancho_banda_activo
+            if gestor_ancho_banda_activo() is None:
+                self.registrar(clave_dominio(url), configuracion, medicion.bytes, medicion.segundos)
+
+    def _al_evento(self, evento):
+        # El inicio se publica en el hilo que lanza el comando; el resto puede
+        # llegar desde los hilos de fragmentos de yt-dlp (modo en proceso)
+        if evento.tipo == INICIO:
+            medicion = self._por_hilo.get(threading.get_ident())
+            if medicion is not None:
+                self._por_trabajo[evento.trabajo] = medicion
+            return
+        medicion = self._por_trabajo.get(evento.trabajo)
+        if medicion is None:
+            return
+        if evento.tipo in (FIN, ERROR):
+            medicion.terminar()
+            self._por_trabajo.pop(evento.trabajo, None)
+        else:
+            medicion.observar(evento)
+
+
+@contextmanager
+def transferencia_ajustada(ajuste, url, opciones):
+    """Opciones con el trozo y los fragmentos elegidos para el sitio, midiendo el resultado
+
+    Las opciones recibidas fijan la configuración de partida del sitio.
+    Con ajuste=None las devuelve tal cual.
+    """
+    opciones = list(opciones)
+    if ajuste is None:
+        yield opciones
+        return
+    inicial = configuracion_de_opciones(opciones)
+    configuracion = ajuste.elegir(url, inicial)
+    if configuracion != inicial:
+        trozo, fragmentos = configuracion
+        print(f"⚙️  Transferencia ajustada para {clave_dominio(url)}: "
+              f"trozos de {trozo or 'archivo entero'}, {fragmentos} fragmento(s) a la vez")
+    with ajuste.medir(url, configuracion):
+        yield aplicar_configuracion(opciones, configuracion)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark del reparto de ancho de banda entre descargas simultáneas
+
+Lanza varias descargas a la vez contra un servidor HTTP local (sin límite
+propio) con un presupuesto total y prioridades distintas, y compara la
+velocidad conseguida por cada una con la parte que le corresponde. Una
+descarga arranca más tarde y otra, corta, termina pronto: el reparto tiene
+que rehacerse a la baja y al alza.
+
+Uso:
+    python benchmarks/bench_ancho_banda.py [--total 2M] [--tamano 4] [--backend subproceso]
+"""
+
+import argparse
+import http.server
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ancho_banda import interpretar_tasa  # noqa: E402
+from core import (  # noqa: E402
+    BACKENDS_YTDLP,
+    capturar_salida_hilo,
+    configurar_ancho_banda,
+    configurar_backend_ytdlp,
+    ejecutar_comando_ytdlp,
+    prioridad_hilo,
+)
+from eventos_progreso import BUS_PROGRESO, PROGRESO, formatear_bytes  # noqa: E402
+
+BLOQUE = b"\x00" * 65536
+
+
+class ManejadorArchivo(http.server.BaseHTTPRequestHandler):
+    tamano = 0
+    fracciones = {}   # /nombre.mp4 -> fracción de `tamano`
+
+    def do_HEAD(self):
+        self._cabeceras()
+
+    def do_GET(self):
+        self._cabeceras()
+        restante = self._tamano()
+        try:
+            while restante > 0:
+                parte = BLOQUE[:min(len(BLOQUE), restante)]
+                self.wfile.write(parte)
+                restante -= len(parte)
+        except ConnectionError:
+            pass   # el extractor genérico corta la primera petición
+
+    def _cabeceras(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(self._tamano()))
+        self.end_headers()
+
+    def _tamano(self):
+        return int(self.tamano * self.fracciones.get(self.path, 1.0))
+
+    def log_message(self, *args):
+        pass
+
+
+class Medidor:
+    """Primer y último momento con progreso y bytes de cada URL"""
+
+    def __init__(self):
+        self.por_url = {}
+        self.muestras = []   # (momento, bytes nuevos) de todas las descargas
+        self._url_de_trabajo = {}
+        self._cerrojo = threading.Lock()
+
+    def __call__(self, evento):
+        with self._cerrojo:
+            if evento.tipo == "inicio":
+                self._url_de_trabajo[evento.trabajo] = evento.url
+            elif evento.tipo == PROGRESO:
+                url = self._url_de_trabajo.get(evento.trabajo)
+                inicio, _, anterior = self.por_url.get(url, (time.monotonic(), 0, 0))
+                self.por_url[url] = (inicio, time.monotonic(), evento.descargados)
+                self.muestras.append((time.monotonic(), evento.descargados - anterior))
+
+
+def pico(muestras, ventana):
+    """Mayor velocidad conjunta en cualquier intervalo de `ventana` segundos"""
+    muestras = sorted(muestras)
+    mejor = suma = desde = 0
+    for momento, cantidad in muestras:
+        suma += cantidad
+        while muestras[desde][0] <= momento - ventana:
+            suma -= muestras[desde][1]
+            desde += 1
+        mejor = max(mejor, suma)
+    return mejor / ventana
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--total", default="2M", help="Presupuesto total (por defecto 2M)")
+    parser.add_argument("--tamano", type=float, default=4, help="MB por descarga")
+    parser.add_argument("--backend", choices=BACKENDS_YTDLP, default="subproceso")
+    args = parser.parse_args()
+
+    ManejadorArchivo.tamano = int(args.tamano * 2**20)
+    servidor = http.server.ThreadingHTTPServer(("127.0.0.1", 0), ManejadorArchivo)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{servidor.server_address[1]}"
+
+    configurar_backend_ytdlp(args.backend)
+    configurar_ancho_banda(args.total)
+    medidor = BUS_PROGRESO.suscribir(Medidor())
+    directorio = tempfile.mkdtemp()
+
+    # (nombre, prioridad, retraso de arranque, fracción del tamaño)
+    trabajos = [("a", 1.0, 0.0, 1.0), ("b", 1.0, 0.0, 1.0), ("c", 2.0, 2.0, 1.0),
+                ("d", 1.0, 0.0, 0.25)]
+    ManejadorArchivo.fracciones = {f"/{t[0]}.mp4": t[3] for t in trabajos}
+
+    def descargar(nombre, prioridad, retraso, _):
+        time.sleep(retraso)
+        comando = ["yt-dlp", "-o", f"{directorio}/%(id)s.%(ext)s", f"{base}/{nombre}.mp4"]
+        with capturar_salida_hilo(), prioridad_hilo(prioridad):
+            ejecutar_comando_ytdlp(comando)
+
+    inicio = time.monotonic()
+    hilos = [threading.Thread(target=descargar, args=t) for t in trabajos]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    duracion = time.monotonic() - inicio
+    BUS_PROGRESO.desuscribir(medidor)
+    shutil.rmtree(directorio, ignore_errors=True)
+
+    total = interpretar_tasa(args.total)
+    print(f"Presupuesto: {formatear_bytes(total)}/s  backend: {args.backend}")
+    print(f"{'descarga':>9} {'prioridad':>10} {'bytes':>10} {'segundos':>9} {'velocidad':>12}")
+    descargado = 0
+    for nombre, prioridad, _, _ in trabajos:
+        inicio_url, fin_url, cantidad = medidor.por_url.get(f"{base}/{nombre}.mp4", (0, 0, 0))
+        segundos = max(fin_url - inicio_url, 1e-9)
+        descargado += cantidad
+        print(f"{nombre:>9} {prioridad:>10g} {formatear_bytes(cantidad):>10} "
+              f"{segundos:>9.1f} {formatear_bytes(cantidad / segundos) + '/s':>12}")
+    print(f"Total: {formatear_bytes(descargado)} en {duracion:.1f}s = "
+          f"{formatear_bytes(descargado / duracion)}/s "
+          f"(mínimo teórico {descargado / total:.1f}s)")
+    # El búfer del socket sigue recibiendo durante una pausa y yt-dlp lo lee
+    # de golpe al reanudar: el pico se mide en ventanas de 3 s
+    print(f"Pico en 3 s: {formatear_bytes(pico(medidor.muestras, 3.0))}/s")
+
+
+if __name__ == "__main__":
+    main()
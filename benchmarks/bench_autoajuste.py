@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark del ajuste automático de trozo y fragmentos (autoajuste.py)
+
+Levanta un servidor HTTP local que imita a un CDN:
+- cada petición tarda --latencia segundos en empezar a responder
+- cada conexión va como mucho a --banda bytes/s
+- a partir de --tope bytes de una misma respuesta, la conexión baja a la
+  cuarta parte (como los CDN que frenan las respuestas largas)
+y sirve un mp4 (con Range, en 127.0.0.1) y una lista HLS con sus segmentos
+(en 127.0.0.2, para que el ajuste los trate como sitios distintos).
+
+Para cada uno descarga --rondas veces con la configuración fija de siempre
+(trozos de 10M, un fragmento) y otras tantas con el ajuste automático, y
+muestra la velocidad de transferencia de cada ronda y la media de las
+últimas. Usa un HOME temporal: no toca las mediciones reales.
+
+Uso:
+    python benchmarks/bench_autoajuste.py [--rondas 15] [--latencia 0.1]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+FIJA = ("10M", 1)
+BLOQUE = 64 * 1024
+
+
+def crear_servidor(latencia, banda, tope, tamano_video, segmentos, tamano_segmento):
+    datos_video = os.urandom(tamano_video)
+    datos_segmento = os.urandom(tamano_segmento)
+    lista = "#EXTM3U\n#EXT-X-VERSION:3\n#EXT-X-TARGETDURATION:2\n#EXT-X-MEDIA-SEQUENCE:0\n"
+    lista += "".join(f"#EXTINF:2.0,\nsegmento{i}.ts\n" for i in range(segmentos))
+    lista += "#EXT-X-ENDLIST\n"
+
+    class Manejador(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_HEAD(self):
+            self.do_GET(cuerpo=False)
+
+        def do_GET(self, cuerpo=True):
+            time.sleep(latencia)
+            if self.path == "/video.mp4":
+                datos, tipo = datos_video, "video/mp4"
+            elif self.path == "/lista.m3u8":
+                datos, tipo = lista.encode(), "application/vnd.apple.mpegurl"
+            elif self.path.startswith("/segmento"):
+                datos, tipo = datos_segmento, "video/mp2t"
+            else:
+                self.send_error(404)
+                return
+            inicio, fin = 0, len(datos) - 1
+            rango = self.headers.get("Range", "")
+            if rango.startswith("bytes="):
+                desde, _, hasta = rango[6:].partition("-")
+                inicio = int(desde or 0)
+                fin = min(int(hasta), fin) if hasta else fin
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {inicio}-{fin}/{len(datos)}")
+            else:
+                self.send_response(200)
+            self.send_header("Content-Type", tipo)
+            self.send_header("Content-Length", str(fin - inicio + 1))
+            self.send_header("Accept-Ranges", "bytes")
+            self.end_headers()
+            if cuerpo:
+                self._enviar(datos[inicio:fin + 1])
+
+        def _enviar(self, datos):
+            reloj = time.monotonic()
+            enviados = 0
+            try:
+                while enviados < len(datos):
+                    bloque = datos[enviados:enviados + BLOQUE]
+                    self.wfile.write(bloque)
+                    enviados += len(bloque)
+                    tasa = banda if enviados <= tope else banda / 4
+                    reloj += len(bloque) / tasa
+                    espera = reloj - time.monotonic()
+                    if espera > 0:
+                        time.sleep(espera)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    servidor = ThreadingHTTPServer(("", 0), Manejador)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def ronda(url, configuracion, ajuste, directorio):
+    from autoajuste import aplicar_configuracion
+    from core import ejecutar_comando_ytdlp
+
+    opciones = aplicar_configuracion(
+        ["--no-warnings", "--no-part", "-o", str(directorio / "%(id)s-%(epoch)s.%(ext)s")],
+        configuracion
+    )
+    with ajuste.medir(url, configuracion) as medicion:
+        exito, salida = ejecutar_comando_ytdlp(["yt-dlp", *opciones, url], capturar_salida=True)
+    if not exito:
+        raise SystemExit(f"Falló la descarga de {url}:\n{salida}")
+    for archivo in directorio.iterdir():
+        archivo.unlink()
+    return medicion.bytes / medicion.segundos if medicion.segundos else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rondas", type=int, default=15)
+    parser.add_argument("--latencia", type=float, default=0.1, help="segundos por petición")
+    parser.add_argument("--banda", type=float, default=8.0, help="MB/s por conexión")
+    parser.add_argument("--tope", type=float, default=2.0,
+                        help="MB de cada respuesta a velocidad completa")
+    parser.add_argument("--exploracion", type=float, default=0.5,
+                        help="probabilidad de probar una vecina (más alta que la real "
+                             "para converger en pocas rondas)")
+    parser.add_argument("--semilla", type=int, default=1)
+    args = parser.parse_args()
+
+    os.environ["HOME"] = tempfile.mkdtemp(prefix="bench-autoajuste-")
+    from autoajuste import AutoAjusteTransferencia, nombre_configuracion
+    from eventos_progreso import BUS_PROGRESO, RENDERIZADOR_CONSOLA, formatear_bytes
+
+    BUS_PROGRESO.desuscribir(RENDERIZADOR_CONSOLA)
+    mega = 1024 * 1024
+    servidor = crear_servidor(args.latencia, args.banda * mega, args.tope * mega,
+                              tamano_video=16 * mega, segmentos=40, tamano_segmento=256 * 1024)
+    puerto = servidor.server_address[1]
+    escenarios = [
+        ("mp4 con Range", f"http://127.0.0.1:{puerto}/video.mp4"),
+        ("HLS, 40 segmentos", f"http://127.0.0.2:{puerto}/lista.m3u8"),
+    ]
+    directorio = Path(os.environ["HOME"]) / "salida"
+    directorio.mkdir()
+    fija = AutoAjusteTransferencia(ruta=directorio.parent / "fija.sqlite3", exploracion=0)
+    ajuste = AutoAjusteTransferencia(exploracion=args.exploracion,
+                                     aleatorio=random.Random(args.semilla))
+    ultimas = max(1, args.rondas // 3)
+
+    for nombre, url in escenarios:
+        print(f"\n== {nombre} ==")
+        velocidades_fija = [ronda(url, FIJA, fija, directorio) for _ in range(ultimas)]
+        print(f"fija {nombre_configuracion(FIJA):<10} {formatear_bytes(statistics.mean(velocidades_fija))}/s")
+        velocidades = []
+        for i in range(1, args.rondas + 1):
+            configuracion = ajuste.elegir(url, FIJA)
+            velocidades.append(ronda(url, configuracion, ajuste, directorio))
+            print(f"ronda {i:>2} {nombre_configuracion(configuracion):<10} "
+                  f"{formatear_bytes(velocidades[-1])}/s")
+        media = statistics.mean(velocidades[-ultimas:])
+        print(f"mejor: {nombre_configuracion(ajuste.mejor(url))}; últimas {ultimas} rondas "
+              f"{formatear_bytes(media)}/s ({media / statistics.mean(velocidades_fija):.1f}x la fija)")
+
+    servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
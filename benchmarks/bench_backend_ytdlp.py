@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de backends de yt-dlp: subproceso frente a en proceso
+
+Mide el coste de arranque (import + extractores) y la latencia por intento
+extrayendo información de un video servido por un servidor HTTP local, de
+modo que la red no influye en la comparación.
+
+Uso:
+    python benchmarks/bench_backend_ytdlp.py [--intentos 10]
+"""
+
+import argparse
+import http.server
+import shutil
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core import (  # noqa: E402
+    BACKEND_EN_PROCESO,
+    BACKEND_SUBPROCESO,
+    configurar_backend_ytdlp,
+    ejecutar_comando_ytdlp,
+)
+
+CONTENIDO_VIDEO = b"\x00\x00\x00\x18ftypmp42" + b"\x00" * 4096
+
+
+class ManejadorVideo(http.server.BaseHTTPRequestHandler):
+    def do_HEAD(self):
+        self._cabeceras()
+
+    def do_GET(self):
+        self._cabeceras()
+        self.wfile.write(CONTENIDO_VIDEO)
+
+    def _cabeceras(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(len(CONTENIDO_VIDEO)))
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def iniciar_servidor():
+    servidor = http.server.ThreadingHTTPServer(("127.0.0.1", 0), ManejadorVideo)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def medir(funcion, intentos):
+    tiempos = []
+    for _ in range(intentos):
+        inicio = time.perf_counter()
+        exito, _ = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+        assert exito, "el comando de yt-dlp falló"
+    return tiempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--intentos", type=int, default=10)
+    args = parser.parse_args()
+
+    if not shutil.which("yt-dlp"):
+        print("❌ Este benchmark necesita el ejecutable yt-dlp en el PATH")
+        sys.exit(1)
+
+    servidor = iniciar_servidor()
+    url = f"http://127.0.0.1:{servidor.server_address[1]}/video.mp4"
+    comando = ["yt-dlp", "--dump-json", "--no-warnings", url]
+
+    inicio = time.perf_counter()
+    subprocess.run(["yt-dlp", "--version"], capture_output=True, check=True)
+    arranque_subproceso = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    configurar_backend_ytdlp(BACKEND_EN_PROCESO)
+    from ytdlp_en_proceso import precargar
+    precargar()
+    arranque_en_proceso = time.perf_counter() - inicio
+
+    resultados = {}
+    for backend in (BACKEND_SUBPROCESO, BACKEND_EN_PROCESO):
+        configurar_backend_ytdlp(backend)
+        resultados[backend] = medir(
+            lambda: ejecutar_comando_ytdlp(comando, capturar_salida=True),
+            args.intentos
+        )
+
+    servidor.shutdown()
+
+    print(f"Arranque subproceso (yt-dlp --version): {arranque_subproceso * 1000:8.1f} ms")
+    print(f"Arranque en proceso (import + precarga): {arranque_en_proceso * 1000:7.1f} ms")
+    print()
+    print(f"{'backend':>12} {'media ms':>10} {'mediana ms':>11} {'mín ms':>8}")
+    for backend, tiempos in resultados.items():
+        print(f"{backend:>12} {statistics.mean(tiempos) * 1000:>10.1f} "
+              f"{statistics.median(tiempos) * 1000:>11.1f} {min(tiempos) * 1000:>8.1f}")
+
+    aceleracion = statistics.mean(resultados[BACKEND_SUBPROCESO]) / \
+        statistics.mean(resultados[BACKEND_EN_PROCESO])
+    print(f"\nEn proceso es {aceleracion:.1f}x más rápido por intento")
+
+
+if __name__ == "__main__":
+    main()
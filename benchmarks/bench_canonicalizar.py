@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark de canonicalizar: URLs por segundo y por minuto
+
+Mezcla variantes reales de URLs de todas las plataformas (con parámetros de
+rastreo, subdominios móviles, URLs cortas y sitios genéricos) y mide
+canonicalizar() en un solo hilo.
+
+Uso:
+    python benchmarks/bench_canonicalizar.py [--urls 200000] [--repeticiones 3]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from canonicalizar import CORPUS_CONFORMIDAD, canonicalizar  # noqa: E402
+from core import detectar_plataforma  # noqa: E402
+
+PLANTILLAS = [
+    "https://www.youtube.com/watch?v={yt}&t={n}s",
+    "https://youtu.be/{yt}?si=abc{n}",
+    "https://m.youtube.com/shorts/{yt}?feature=share",
+    "https://www.facebook.com/watch/?v={n}&mibextid=abc",
+    "https://m.facebook.com/pagina/videos/{n}/",
+    "https://www.instagram.com/reel/C{n}x/?igsh=MTc4MmM1",
+    "https://www.tiktok.com/@usuario/video/7{n}?is_from_webapp=1",
+    "https://twitter.com/usuario/status/1{n}?s=20",
+    "https://x.com/i/web/status/1{n}",
+    "https://vimeo.com/{n}?utm_source=newsletter",
+]
+
+
+def generar_urls(cantidad):
+    random.seed(1)
+    alfabeto = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_-"
+    urls = []
+    for i in range(cantidad):
+        yt = "".join(random.choice(alfabeto) for _ in range(11))
+        urls.append(random.choice(PLANTILLAS).format(yt=yt, n=100000 + i))
+    return urls
+
+
+def medir(funcion, urls, repeticiones):
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        for url in urls:
+            funcion(url)
+        duracion = time.perf_counter() - inicio
+        mejor = duracion if mejor is None else min(mejor, duracion)
+    return mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--urls", type=int, default=200_000)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    urls = generar_urls(args.urls)
+    print(f"Corpus de conformidad: {len(CORPUS_CONFORMIDAD)} URLs")
+    print(f"{'función':>22} {'µs/URL':>8} {'URLs/s':>12} {'millones/min':>13}")
+    for nombre, funcion in (("detectar_plataforma", detectar_plataforma),
+                            ("canonicalizar", canonicalizar)):
+        duracion = medir(funcion, urls, args.repeticiones)
+        por_segundo = len(urls) / duracion
+        print(f"{nombre:>22} {duracion / len(urls) * 1e6:>8.2f} {por_segundo:>12,.0f} "
+              f"{por_segundo * 60 / 1e6:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de las consultas del catálogo de metadatos (catalogo.py)
+
+Llena un catálogo temporal con --videos info dicts sintéticos repartidos
+entre varias plataformas (una parte descargados) y mide las consultas
+típicas: GB por plataforma, pendientes de más de 10 minutos, por autor y
+por texto del título.
+
+Uso:
+    python benchmarks/bench_catalogo.py [--videos 200000]
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+SITIOS = {
+    'youtube': "https://www.youtube.com/watch?v={}",
+    'facebook': "https://www.facebook.com/watch/?v={}",
+    'tiktok': "https://www.tiktok.com/@autor/video/{}",
+    'instagram': "https://www.instagram.com/reel/{}/",
+}
+
+
+def info_sintetico(aleatorio, i):
+    plataforma = aleatorio.choice(list(SITIOS))
+    video_id = f"{i:011d}"
+    return plataforma, {
+        'id': video_id,
+        'title': f"Video {i} {aleatorio.choice(['receta', 'gol', 'tutorial', 'música'])}",
+        'uploader': f"autor{aleatorio.randrange(2000)}",
+        'duration': aleatorio.randrange(5, 3 * 3600),
+        'webpage_url': SITIOS[plataforma].format(video_id),
+        'formats': [{'format_id': str(h), 'ext': 'mp4', 'height': h} for h in (360, 720, 1080)],
+    }
+
+
+def medir(nombre, funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    print(f"{nombre:<40} {statistics.median(tiempos):8.2f} ms  ({len(resultado)} filas)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--videos", type=int, default=200000)
+    parser.add_argument("--descargados", type=float, default=0.3, help="fracción descargada")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    from catalogo import CatalogoMetadatos
+
+    aleatorio = random.Random(1)
+    catalogo = CatalogoMetadatos(Path(tempfile.mkdtemp(prefix="bench-catalogo-")) / "c.sqlite3")
+    inicio = time.perf_counter()
+    for i in range(args.videos):
+        plataforma, info = info_sintetico(aleatorio, i)
+        catalogo.registrar_info(None, info, confirmar=False)
+        if aleatorio.random() < args.descargados:
+            catalogo.registrar_descarga(plataforma, info['id'], f"/videos/{info['id']}.mp4",
+                                        aleatorio.randrange(1, 500) * 1024 * 1024,
+                                        confirmar=False)
+    catalogo.confirmar()
+    print(f"{args.videos} videos cargados en {time.perf_counter() - inicio:.1f}s\n")
+
+    medir("GB por plataforma", catalogo.resumen, args.repeticiones)
+    medir("pendientes > 10 min (50 más largos)",
+          lambda: catalogo.listar(min_duracion=600, descargados=False), args.repeticiones)
+    medir("pendientes > 10 min (todos)",
+          lambda: catalogo.listar(min_duracion=600, descargados=False, limite=0),
+          args.repeticiones)
+    medir("por autor", lambda: catalogo.listar(autor="autor42", limite=0), args.repeticiones)
+    medir("título contiene 'receta' (50)",
+          lambda: catalogo.listar(titulo="receta", orden='titulo'), args.repeticiones)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la extracción masiva de metadatos (extraccion_masiva.py)
+
+Sirve --urls archivos pequeños desde un servidor HTTP local y obtiene su
+info dict de dos formas:
+- un `yt-dlp --dump-json` por URL (lo que hace obtener_info_video)
+- extraccion_masiva.py con --trabajadores hilos en un solo proceso
+y muestra el tiempo total y las URLs por segundo de cada una.
+
+Usa un HOME temporal y --sin-cache, para que las dos midan extracciones.
+
+Uso:
+    python benchmarks/bench_extraccion_masiva.py [--urls 40] [--trabajadores 8]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+
+def crear_servidor():
+    class Manejador(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_HEAD(self):
+            self.do_GET(cuerpo=False)
+
+        def do_GET(self, cuerpo=True):
+            datos = b"\0" * 1024
+            self.send_response(200)
+            self.send_header("Content-Type", "video/mp4")
+            self.send_header("Content-Length", str(len(datos)))
+            self.end_headers()
+            if cuerpo:
+                self.wfile.write(datos)
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--urls", type=int, default=40)
+    parser.add_argument("--trabajadores", type=int, default=8)
+    args = parser.parse_args()
+
+    base = Path(tempfile.mkdtemp(prefix="bench-extraccion-"))
+    servidor = crear_servidor()
+    urls = [f"http://127.0.0.1:{servidor.server_address[1]}/video{i}.mp4"
+            for i in range(args.urls)]
+    lista = base / "urls.txt"
+    lista.write_text("".join(url + "\n" for url in urls))
+    entorno = dict(os.environ, HOME=str(base))
+    print(f"{args.urls} URLs, {args.trabajadores} a la vez, {os.cpu_count()} núcleos\n")
+
+    def dump_json(url):
+        return subprocess.run([sys.executable, "-m", "yt_dlp", "--dump-json", "--no-warnings",
+                               url], env=entorno, stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL).returncode == 0
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(args.trabajadores) as pool:
+        exitosas = sum(pool.map(dump_json, urls))
+    total = time.perf_counter() - inicio
+    print(f"{'un yt-dlp --dump-json por URL':<36} {total:6.1f}s  "
+          f"{args.urls / total:6.1f} URLs/s  ({exitosas} bien)")
+
+    inicio = time.perf_counter()
+    resultado = subprocess.run(
+        [sys.executable, "extraccion_masiva.py", str(lista), "-j", str(args.trabajadores),
+         "--sin-cache", "--sin-catalogo", "--campos", "id,title"],
+        cwd=RAIZ, env=entorno, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+    total = time.perf_counter() - inicio
+    exitosas = sum('"error"' not in linea for linea in resultado.stdout.splitlines())
+    print(f"{'extraccion_masiva.py':<36} {total:6.1f}s  "
+          f"{args.urls / total:6.1f} URLs/s  ({exitosas} bien)")
+
+    servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
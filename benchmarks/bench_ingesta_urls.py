@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la ingesta de URLs: lista completa frente a streaming
+
+Mide el tiempo hasta la primera URL, el tiempo total y el pico de memoria
+de leer_urls_de_archivo (lista entera) y de iterar_urls (generador con
+filtro de duplicados acotado) sobre un archivo sintético.
+
+Uso:
+    python benchmarks/bench_ingesta_urls.py [--lineas 1000000] [--gz]
+"""
+
+import argparse
+import contextlib
+import gzip
+import io
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core import leer_urls_de_archivo  # noqa: E402
+from ingesta_urls import iterar_urls  # noqa: E402
+
+
+def generar_archivo(directorio, lineas, comprimir):
+    ruta = Path(directorio) / ("urls.txt.gz" if comprimir else "urls.txt")
+    abrir = gzip.open if comprimir else open
+    with abrir(ruta, 'wt', encoding='utf-8') as f:
+        for i in range(lineas):
+            if i % 100 == 0:
+                f.write("# comentario\n")
+            elif i % 97 == 0:
+                f.write("no-es-una-url\n")
+            else:
+                # ~5% de repetidas
+                f.write(f"https://www.youtube.com/watch?v=v{i - i % 20 if i % 20 == 1 else i}\n")
+    return ruta
+
+
+def recorrer(funcion):
+    """Consume las URLs y devuelve (segundos hasta la primera, segundos en total, cantidad)"""
+    inicio = time.perf_counter()
+    primera = None
+    cantidad = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in funcion():
+            if primera is None:
+                primera = time.perf_counter() - inicio
+            cantidad += 1
+    return primera, time.perf_counter() - inicio, cantidad
+
+
+def medir(nombre, funcion):
+    primera, total, cantidad = recorrer(funcion)
+    # La memoria se mide en otra pasada: tracemalloc ralentiza mucho
+    tracemalloc.start()
+    recorrer(funcion)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{nombre:>12} {primera * 1000:>14.2f} {total:>10.2f} "
+          f"{pico / 2**20:>10.1f} {cantidad:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lineas", type=int, default=1_000_000)
+    parser.add_argument("--gz", action="store_true", help="Usar un archivo .gz")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = generar_archivo(directorio, args.lineas, args.gz)
+        print(f"{'modo':>12} {'1ª URL (ms)':>14} {'total (s)':>10} "
+              f"{'pico (MB)':>10} {'urls':>10}")
+        medir("lista", lambda: leer_urls_de_archivo(str(ruta)))
+        medir("streaming", lambda: iterar_urls(str(ruta)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark del motor concurrente: throughput según el número de trabajadores
+
+Cada "descarga" es un subproceso que espera una latencia de red simulada,
+igual que yt-dlp pasa la mayor parte del tiempo esperando a la red.
+
+Uso:
+    python benchmarks/bench_motor_concurrente.py [--urls 48] [--latencia 0.25]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core import ejecutar_comando_ytdlp  # noqa: E402
+from motor_concurrente import MotorDescargas  # noqa: E402
+
+PLATAFORMAS = [
+    "https://www.youtube.com/watch?v=",
+    "https://www.facebook.com/watch/?v=",
+    "https://www.tiktok.com/@user/video/",
+    "https://vimeo.com/",
+]
+
+
+def descarga_simulada(latencia):
+    def descargar(url):
+        espera = latencia * random.uniform(0.5, 1.5)
+        comando = [sys.executable, "-c",
+                   f"import time; time.sleep({espera}); print('[download] 100%')"]
+        exito, _ = ejecutar_comando_ytdlp(comando)
+        return exito
+    return descargar
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--urls", type=int, default=48)
+    parser.add_argument("--latencia", type=float, default=0.25)
+    parser.add_argument("--trabajadores", default="1,2,4,8,16")
+    args = parser.parse_args()
+
+    random.seed(1)
+    urls = [f"{PLATAFORMAS[i % len(PLATAFORMAS)]}{i}" for i in range(args.urls)]
+    funcion = descarga_simulada(args.latencia)
+
+    print(f"{'trabajadores':>12} {'segundos':>10} {'urls/s':>8} {'aceleración':>12}")
+    base = None
+    for n in (int(x) for x in args.trabajadores.split(",")):
+        motor = MotorDescargas(funcion, trabajadores=n)
+        inicio = time.perf_counter()
+        resultados = motor.ejecutar(urls)
+        duracion = time.perf_counter() - inicio
+        assert all(r.exito for r in resultados)
+        base = base or duracion
+        print(f"{n:>12} {duracion:>10.2f} {len(urls) / duracion:>8.1f} "
+              f"{base / duracion:>11.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de clasificación de URLs por plataforma
+
+Compara el registro de plataformas (host extraído una vez y buscado en un
+diccionario) con el escaneo de subcadenas que usaba detectar_plataforma,
+y cuenta los falsos positivos del escaneo (p. ej. 'netflix.com' -> twitter).
+
+Uso:
+    python benchmarks/bench_plataformas.py [--urls 200000] [--sitios 0,50,500]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from plataformas import PerfilPlataforma, RegistroPlataformas, REGISTRO  # noqa: E402
+
+URLS_EJEMPLO = [
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://m.facebook.com/watch/?v=123456789",
+    "https://www.instagram.com/p/ABC123xyz/",
+    "https://www.tiktok.com/@usuario/video/7106594312292453675",
+    "https://x.com/usuario/status/1234567890123456789",
+    "https://vimeo.com/123456",
+    "https://www.netflix.com/watch/81234567",             # contiene "x.com"
+    "https://www.dailymotion.com/video/x8abc?from=youtube.com",
+    "https://ejemplo.org/redir?u=https://facebook.com/",
+]
+
+
+def escaneo_subcadenas(sitios):
+    """Versión anterior de detectar_plataforma"""
+    def detectar(url):
+        url_lower = url.lower()
+        for plataforma, dominios in sitios.items():
+            if any(dominio in url_lower for dominio in dominios):
+                return plataforma
+        return 'generico'
+    return detectar
+
+
+def registro_con_extra(extra):
+    """Copia del registro global con `extra` sitios ficticios añadidos"""
+    registro = RegistroPlataformas()
+    for nombre in REGISTRO.nombres():
+        registro.registrar(REGISTRO.perfil(nombre))
+    for i in range(extra):
+        registro.registrar(PerfilPlataforma(f"sitio{i}", dominios=(f"sitio{i}.com",)))
+    return registro
+
+
+def medir(funcion, urls):
+    inicio = time.perf_counter()
+    for url in urls:
+        funcion(url)
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--urls", type=int, default=200_000)
+    parser.add_argument("--sitios", default="0,50,500",
+                        help="Sitios extra registrados en cada ronda")
+    args = parser.parse_args()
+
+    random.seed(1)
+    urls = [random.choice(URLS_EJEMPLO) for _ in range(args.urls)]
+
+    print(f"{'sitios':>7} {'método':>10} {'µs/URL':>8} {'URLs/s':>12} {'falsos +':>9}")
+    for extra in (int(x) for x in args.sitios.split(",")):
+        registro = registro_con_extra(extra)
+        sitios = registro.dominios_por_plataforma()
+        correcto = {url: registro.clasificar(url) for url in URLS_EJEMPLO}
+        for nombre, funcion in (("subcadena", escaneo_subcadenas(sitios)),
+                                ("registro", registro.clasificar)):
+            duracion = medir(funcion, urls)
+            errores = sum(1 for url in URLS_EJEMPLO if funcion(url) != correcto[url])
+            print(f"{len(sitios):>7} {nombre:>10} {duracion / len(urls) * 1e6:>8.2f} "
+                  f"{len(urls) / duracion:>12,.0f} {errores:>9}")
+
+
+if __name__ == "__main__":
+    main()
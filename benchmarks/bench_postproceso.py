@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la tubería de postproceso (postproceso.py)
+
+Genera un clip con ffmpeg, lo sirve desde un servidor HTTP local con un
+tope de ancho de banda por conexión y descarga --videos copias (con
+nombres distintos) con descargar_videos.py -j --trabajadores, dos veces:
+- postproceso dentro de cada descarga (--procesos-postproceso 0)
+- postproceso en el pool de procesos aparte (por defecto)
+y muestra el tiempo total de cada modo y el resumen por etapas.
+
+Necesita ffmpeg en el PATH. Usa un HOME temporal.
+
+Uso:
+    python benchmarks/bench_postproceso.py [--videos 8] [--trabajadores 2]
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+BLOQUE = 64 * 1024
+
+
+def crear_clip(ruta, segundos):
+    subprocess.run(
+        ["ffmpeg", "-y", "-loglevel", "error",
+         "-f", "lavfi", "-i", "testsrc2=size=1280x720:rate=30",
+         "-f", "lavfi", "-i", "sine=frequency=440",
+         "-t", str(segundos), "-c:v", "libx264", "-preset", "ultrafast",
+         "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest", str(ruta)],
+        check=True
+    )
+    return ruta.read_bytes()
+
+
+def crear_servidor(datos, banda):
+    class Manejador(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_HEAD(self):
+            self.do_GET(cuerpo=False)
+
+        def do_GET(self, cuerpo=True):
+            self.send_response(200)
+            self.send_header("Content-Type", "video/mp4")
+            self.send_header("Content-Length", str(len(datos)))
+            self.end_headers()
+            if not cuerpo:
+                return
+            reloj = time.monotonic()
+            try:
+                for inicio in range(0, len(datos), BLOQUE):
+                    self.wfile.write(datos[inicio:inicio + BLOQUE])
+                    reloj += BLOQUE / banda
+                    espera = reloj - time.monotonic()
+                    if espera > 0:
+                        time.sleep(espera)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--videos", type=int, default=8)
+    parser.add_argument("--trabajadores", type=int, default=2)
+    parser.add_argument("--segundos", type=int, default=20, help="duración del clip")
+    parser.add_argument("--banda", type=float, default=4.0, help="MB/s por conexión")
+    args = parser.parse_args()
+
+    if shutil.which("ffmpeg") is None:
+        raise SystemExit("Este benchmark necesita ffmpeg en el PATH")
+
+    base = Path(tempfile.mkdtemp(prefix="bench-postproceso-"))
+    datos = crear_clip(base / "clip.mp4", args.segundos)
+    servidor = crear_servidor(datos, args.banda * 1024 * 1024)
+    lista = base / "urls.txt"
+    lista.write_text("".join(
+        f"http://127.0.0.1:{servidor.server_address[1]}/clip{i}.mp4\n"
+        for i in range(args.videos)
+    ))
+    print(f"{args.videos} videos de {len(datos) / 1024 / 1024:.1f} MB, "
+          f"{args.trabajadores} descargas a la vez, {os.cpu_count()} núcleos")
+
+    for nombre, procesos in (("postproceso en cada descarga", "0"),
+                             ("tubería de postproceso", None)):
+        home = base / f"home-{procesos or 'tuberia'}"
+        comando = [sys.executable, "descargar_videos.py", str(lista), "-j", str(args.trabajadores),
+                   "--sin-cache", "--sin-archivo", "-d", str(home / "salida")]
+        if procesos is not None:
+            comando += ["--procesos-postproceso", procesos]
+        inicio = time.perf_counter()
+        resultado = subprocess.run(comando, cwd=RAIZ, env=dict(os.environ, HOME=str(home)),
+                                   stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        total = time.perf_counter() - inicio
+        print(f"\n== {nombre}: {total:.1f}s (código {resultado.returncode}) ==")
+        for linea in resultado.stdout.splitlines():
+            if linea.startswith(("⏱️", "   Las descargas", "✅ Exitosas")):
+                print(linea)
+
+    servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+cache_extraccion.py - Caché persistente de extracciones de yt-dlp
+Guarda los info dicts en SQLite por (plataforma, id de video) para no volver
+a extraer la página en cada consulta o descarga
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+from canonicalizar import canonicalizar
+
+
+TTL_METADATOS_POR_DEFECTO = 7 * 24 * 3600   # título, duración, formatos...
+TTL_URLS_POR_DEFECTO = 3600                  # URLs firmadas de los formatos
+TAMANO_MAXIMO_POR_DEFECTO = 256 * 1024 * 1024
+MARGEN_EXPIRACION = 120                      # no usar URLs a punto de caducar
+
+# Campos que contienen URLs firmadas de corta duración
+CAMPOS_URL = ('url', 'manifest_url', 'fragment_base_url', 'fragments')
+
+# Parámetros con los que los CDN indican cuándo caduca una URL firmada
+PARAMETROS_EXPIRACION = {
+    'expire': 10,      # YouTube (googlevideo)
+    'x-expires': 10,   # TikTok
+    'expires': 10,     # CloudFront y otros
+    'oe': 16,          # Facebook / Instagram (hexadecimal)
+}
+
+
+def directorio_cache_por_defecto():
+    """Carpeta de caché compartida por todos los descargadores"""
+    return Path.home() / "Descargas" / ".cache_extraccion"
+
+
+def expiracion_de_url(url):
+    """Devuelve el instante (epoch) en que caduca una URL firmada, o None"""
+    try:
+        parametros = parse_qs(urlparse(url).query)
+    except ValueError:
+        return None
+
+    for nombre, valores in parametros.items():
+        base = PARAMETROS_EXPIRACION.get(nombre.lower())
+        if base is None:
+            continue
+        try:
+            return int(valores[0], base)
+        except ValueError:
+            continue
+    return None
+
+
+def separar_urls(info):
+    """Separa un info dict en metadatos estables y URLs de corta duración"""
+    metadatos = dict(info)
+    urls = {'info': {c: metadatos.pop(c) for c in CAMPOS_URL if c in metadatos}}
+
+    formatos = []
+    urls_formatos = []
+    for formato in info.get('formats') or []:
+        formato = dict(formato)
+        urls_formatos.append({c: formato.pop(c) for c in CAMPOS_URL if c in formato})
+        formatos.append(formato)
+    if 'formats' in info:
+        metadatos['formats'] = formatos
+        urls['formats'] = urls_formatos
+
+    # requested_formats y similares se recalculan al cargar el info dict
+    for campo in ('requested_formats', 'requested_downloads'):
+        metadatos.pop(campo, None)
+
+    return metadatos, urls
+
+
+def unir_urls(metadatos, urls):
+    """Operación inversa de separar_urls"""
+    info = dict(metadatos)
+    info.update(urls.get('info', {}))
+    if 'formats' in metadatos:
+        info['formats'] = [
+            dict(formato, **extra)
+            for formato, extra in zip(metadatos['formats'], urls.get('formats', []))
+        ]
+    return info
+
+
+class CacheExtraccion:
+    """Caché LRU en SQLite de info dicts, con TTL distinto para metadatos y URLs
+
+    - Clave: (plataforma, id de video). Si la URL ya lleva el id (ver
+      canonicalizar) la clave se obtiene sin consultar nada; si no, las URLs
+      vistas se guardan como alias, en forma canónica, para encontrar la
+      entrada antes de tocar la red.
+    - Las URLs firmadas caducan por separado: al vencer se borran y la
+      entrada sigue sirviendo para consultas de información.
+    - Al superar el tamaño máximo se expulsan las entradas menos usadas.
+    """
+
+    def __init__(self, directorio=None, ttl_metadatos=TTL_METADATOS_POR_DEFECTO,
+                 ttl_urls=TTL_URLS_POR_DEFECTO, tamano_maximo=TAMANO_MAXIMO_POR_DEFECTO,
+                 catalogo=None):
+        self.directorio = Path(directorio or directorio_cache_por_defecto()).expanduser()
+        # Cada info dict guardado se anota también en el catálogo (ver catalogo.py)
+        self.catalogo = catalogo
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        self.ttl_metadatos = ttl_metadatos
+        self.ttl_urls = ttl_urls
+        self.tamano_maximo = tamano_maximo
+
+        self._cerrojo = threading.Lock()
+        self._conexion = sqlite3.connect(
+            str(self.directorio / "extracciones.sqlite3"),
+            check_same_thread=False,
+            timeout=30
+        )
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.executescript("""
+            CREATE TABLE IF NOT EXISTS info (
+                plataforma TEXT NOT NULL,
+                video_id TEXT NOT NULL,
+                metadatos TEXT NOT NULL,
+                urls TEXT,
+                creado REAL NOT NULL,
+                urls_expiran REAL,
+                ultimo_acceso REAL NOT NULL,
+                tamano INTEGER NOT NULL,
+                PRIMARY KEY (plataforma, video_id)
+            );
+            CREATE INDEX IF NOT EXISTS info_ultimo_acceso ON info (ultimo_acceso);
+            CREATE TABLE IF NOT EXISTS alias (
+                url TEXT PRIMARY KEY,
+                plataforma TEXT NOT NULL,
+                video_id TEXT NOT NULL
+            );
+        """)
+        self._conexion.commit()
+
+    def cerrar(self):
+        with self._cerrojo:
+            self._conexion.close()
+
+    def clave_de_url(self, url):
+        """Devuelve (plataforma, id de video) de una URL, sin red
+
+        Funciona con cualquier variante de una URL que lleve el id del
+        video; las demás (fb.watch, vm.tiktok.com...) solo si ya se vieron.
+        """
+        plataforma, video_id, canonica = canonicalizar(url)
+        if video_id is not None:
+            return plataforma, video_id
+        with self._cerrojo:
+            return self._clave_de_alias(canonica)
+
+    def _clave_de_alias(self, canonica):
+        fila = self._conexion.execute(
+            "SELECT plataforma, video_id FROM alias WHERE url = ?", (canonica,)
+        ).fetchone()
+        return fila
+
+    def obtener(self, plataforma, video_id, requiere_urls=False):
+        """Devuelve el info dict en caché o None si no existe o ha caducado
+
+        Con requiere_urls=True solo se devuelve si las URLs firmadas siguen
+        vigentes (necesario para descargar sin volver a extraer).
+        """
+        ahora = time.time()
+        with self._cerrojo:
+            fila = self._conexion.execute(
+                "SELECT metadatos, urls, creado, urls_expiran FROM info "
+                "WHERE plataforma = ? AND video_id = ?",
+                (plataforma, video_id)
+            ).fetchone()
+            if fila is None:
+                return None
+
+            metadatos, urls, creado, urls_expiran = fila
+            if ahora - creado > self.ttl_metadatos:
+                self._eliminar(plataforma, video_id)
+                self._conexion.commit()
+                return None
+
+            if urls is not None and urls_expiran is not None and ahora >= urls_expiran:
+                # Las URLs firmadas caducaron: se conservan solo los metadatos
+                self._conexion.execute(
+                    "UPDATE info SET urls = NULL, tamano = ? "
+                    "WHERE plataforma = ? AND video_id = ?",
+                    (len(metadatos), plataforma, video_id)
+                )
+                urls = None
+
+            if requiere_urls and urls is None:
+                self._conexion.commit()
+                return None
+
+            self._conexion.execute(
+                "UPDATE info SET ultimo_acceso = ? WHERE plataforma = ? AND video_id = ?",
+                (ahora, plataforma, video_id)
+            )
+            self._conexion.commit()
+
+        metadatos = json.loads(metadatos)
+        if urls is None:
+            return metadatos
+        return unir_urls(metadatos, json.loads(urls))
+
+    def buscar(self, url, requiere_urls=False):
+        """Busca por URL (sin red) a partir de su forma canónica"""
+        clave = self.clave_de_url(url)
+        if clave is None:
+            return None
+        return self.obtener(clave[0], clave[1], requiere_urls)
+
+    def guardar(self, url, info):
+        """Guarda un info dict y registra la URL como alias"""
+        video_id = info.get('id')
+        if not video_id:
+            return None
+
+        plataforma = canonicalizar(info.get('webpage_url') or url)[0]
+        metadatos, urls = separar_urls(info)
+        metadatos = json.dumps(metadatos, ensure_ascii=False)
+        urls = json.dumps(urls, ensure_ascii=False)
+
+        ahora = time.time()
+        expiraciones = [
+            expiracion_de_url(formato.get('url', ''))
+            for formato in [info] + list(info.get('formats') or [])
+            if formato.get('url')
+        ]
+        urls_expiran = min([ahora + self.ttl_urls] +
+                           [e - MARGEN_EXPIRACION for e in expiraciones if e])
+
+        with self._cerrojo:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO info VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (plataforma, str(video_id), metadatos, urls, ahora, urls_expiran,
+                 ahora, len(metadatos) + len(urls))
+            )
+            for alias in {url, info.get('webpage_url'), info.get('original_url')}:
+                if alias:
+                    self._conexion.execute(
+                        "INSERT OR REPLACE INTO alias VALUES (?, ?, ?)",
+                        (canonicalizar(alias)[2], plataforma, str(video_id))
+                    )
+            self._expulsar()
+            self._conexion.commit()
+
+        if self.catalogo is not None:
+            self.catalogo.registrar_info(url, info)
+        return plataforma, str(video_id)
+
+    def infos(self):
+        """(plataforma, id, metadatos) de todas las entradas, sin URLs firmadas"""
+        with self._cerrojo:
+            filas = self._conexion.execute(
+                "SELECT plataforma, video_id, metadatos FROM info"
+            ).fetchall()
+        for plataforma, video_id, metadatos in filas:
+            yield plataforma, video_id, json.loads(metadatos)
+
+    def _expulsar(self):
+        """Expulsa las entradas menos usadas hasta quedar bajo el tamaño máximo"""
+        total = self._conexion.execute("SELECT COALESCE(SUM(tamano), 0) FROM info").fetchone()[0]
+        if total <= self.tamano_maximo:
+            return
+
+        objetivo = self.tamano_maximo * 0.9
+        filas = self._conexion.execute(
+            "SELECT plataforma, video_id, tamano FROM info ORDER BY ultimo_acceso"
+        ).fetchall()
+        for plataforma, video_id, tamano in filas:
+            if total <= objetivo:
+                break
+            self._eliminar(plataforma, video_id)
+            total -= tamano
+
+    def _eliminar(self, plataforma, video_id):
+        """Borra una entrada y sus alias (sin commit: va en la transacción del llamador)"""
+        self._conexion.execute(
+            "DELETE FROM info WHERE plataforma = ? AND video_id = ?",
+            (plataforma, video_id)
+        )
+        self._conexion.execute(
+            "DELETE FROM alias WHERE plataforma = ? AND video_id = ?",
+            (plataforma, video_id)
+        )
+
+    def exportar_info(self, info, directorio):
+        """Escribe un info dict en disco para usarlo con --load-info-json"""
+        ruta = Path(directorio) / "info.json"
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump(info, f, ensure_ascii=False)
+        return ruta
+
+    def importar_directorio(self, directorio, url):
+        """Guarda en caché los .info.json que yt-dlp haya escrito en un directorio"""
+        for ruta in Path(directorio).rglob("*.info.json"):
+            try:
+                with open(ruta, 'r', encoding='utf-8') as f:
+                    self.guardar(url, json.load(f))
+            except (OSError, ValueError):
+                continue
+
+    @contextmanager
+    def objetivo_ytdlp(self, url, directorio_info=None):
+        """Argumentos de destino para un comando de yt-dlp
+
+        Si hay un info dict fresco en caché se descarga desde él con
+        --load-info-json (sin extraer la página). Si no, se pide a yt-dlp
+        que vuelque el info dict, que se guarda en caché al terminar.
+        Con directorio_info, el .info.json va donde diga la plantilla
+        'infojson:' del comando (dentro de ese directorio) y se lee de ahí.
+        """
+        import shutil
+        import tempfile
+
+        temporal = tempfile.mkdtemp(prefix="tmp-", dir=str(self.directorio))
+        try:
+            info = self.buscar(url, requiere_urls=True)
+            if info is not None:
+                yield ["--load-info-json", str(self.exportar_info(info, temporal))]
+            elif directorio_info is not None:
+                yield ["--write-info-json", url]
+                self.importar_directorio(directorio_info, url)
+            else:
+                yield [
+                    "--write-info-json",
+                    "-o", "infojson:" + str(Path(temporal) / "%(id)s"),
+                    url
+                ]
+                self.importar_directorio(temporal, url)
+        finally:
+            shutil.rmtree(temporal, ignore_errors=True)
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+canonicalizar.py - Forma canónica de las URLs de video
+Reduce las variantes de una misma URL (youtu.be, /shorts/, parámetros de
+rastreo, twitter.com / x.com, m.facebook.com...) a una sola, para usarla
+como clave de caché, de índice y de deduplicación
+
+Uso como comando (comprueba el corpus de conformidad):
+    python canonicalizar.py
+"""
+
+import re
+import sys
+from urllib.parse import quote
+
+from plataformas import GENERICO, REGISTRO
+
+
+# Parámetros de rastreo que se quitan de cualquier URL. En las plataformas
+# conocidas se va más lejos: solo se conservan los parámetros útiles.
+PARAMETROS_RASTREO = re.compile(r'^(?:utm_\w+|fbclid|gclid|dclid|msclkid|igshid|igsh|mibextid)$')
+
+_PARTES_URL = re.compile(r'^(?:([A-Za-z][A-Za-z0-9+.-]*):)?//([^/?#]*)([^?#]*)(?:\?([^#]*))?(#.*)?$')
+_PUERTO = re.compile(r':(\d+)$')
+_PUERTOS_POR_DEFECTO = {'http': '80', 'https': '443'}
+
+# Subdominios que no cambian el contenido (m.facebook.com == facebook.com)
+_PREFIJOS_HOST = ('www.', 'm.', 'mobile.', 'web.', 'mbasic.', 'music.')
+
+
+# Por plataforma: reglas (ruta -> id) en orden de prioridad. Cada regla es
+# (expresión sobre la ruta, parámetro de la query con el id o None,
+# plantilla de URL canónica). Los dominios salen del registro de plataformas.
+_ID_YOUTUBE = r'(?P<id>[A-Za-z0-9_-]{11})'
+_ID_FACEBOOK = r'(?P<id>pfbid[A-Za-z0-9]+|\d+)'
+
+REGLAS = {
+    'youtube': {
+        'reglas': [
+            (re.compile(r'^/watch/?$'), 'v', 'https://www.youtube.com/watch?v={id}'),
+            (re.compile(r'^/(?:shorts|embed|live|v|e)/' + _ID_YOUTUBE + r'(?:[/?]|$)'), None,
+             'https://www.youtube.com/watch?v={id}'),
+            (re.compile(r'^/' + _ID_YOUTUBE + r'/?$'), None,            # youtu.be/ID
+             'https://www.youtube.com/watch?v={id}'),
+        ],
+        'validar_id': re.compile(r'^[A-Za-z0-9_-]{11}$'),
+        'conservar': ('list',),
+    },
+    'facebook': {
+        'reglas': [
+            (re.compile(r'^/(?:watch(?:/live)?/?|video\.php|video/video\.php|video/embed)$'), 'v',
+             'https://www.facebook.com/watch/?v={id}'),
+            (re.compile(r'^/(?:reel|watch)/' + _ID_FACEBOOK + r'/?$'), None,
+             'https://www.facebook.com/watch/?v={id}'),
+            (re.compile(r'^/[^/]+/videos/(?:[^/]+/)?' + _ID_FACEBOOK + r'/?$'), None,
+             'https://www.facebook.com/watch/?v={id}'),
+        ],
+        'validar_id': re.compile(r'^(?:pfbid[A-Za-z0-9]+|\d+)$'),
+        'conservar': ('story_fbid', 'id', 'fbid'),
+    },
+    'instagram': {
+        'reglas': [
+            (re.compile(r'^(?:/[^/]+)?/(?:p|tv|reels?)/(?P<id>[A-Za-z0-9_-]+)/?$'), None,
+             'https://www.instagram.com/p/{id}/'),
+        ],
+        'conservar': (),
+    },
+    'tiktok': {
+        'reglas': [
+            (re.compile(r'^/(?:@[\w.-]*/video|share/video|embed(?:/v2)?|v)/(?P<id>\d+)(?:\.html)?/?$'), None,
+             'https://www.tiktok.com/@/video/{id}'),
+        ],
+        'conservar': (),
+    },
+    'twitter': {
+        'reglas': [
+            (re.compile(r'^/(?:i/web|[^/]+)/status(?:es)?/(?P<id>\d+)(?:/(?:video|photo)/\d+)?/?$'), None,
+             'https://x.com/i/status/{id}'),
+        ],
+        'conservar': (),
+    },
+}
+
+# Plataformas registradas sin reglas propias: solo se normaliza la URL
+_SIN_REGLAS = {'reglas': [], 'conservar': None}
+
+
+def _parametros(query):
+    """Lista (nombre, valor) de una query sin decodificar"""
+    if not query:
+        return []
+    parametros = []
+    for par in query.split('&'):
+        if not par:
+            continue
+        nombre, _, valor = par.partition('=')
+        parametros.append((nombre, valor))
+    return parametros
+
+
+def _limpiar_query(parametros, conservar=None):
+    """Quita los parámetros de rastreo o, con `conservar`, todos menos esos"""
+    if conservar is not None:
+        elegidos = [(n, v) for n, v in parametros if n in conservar]
+    else:
+        elegidos = [(n, v) for n, v in parametros if not PARAMETROS_RASTREO.match(n.lower())]
+    return '&'.join(f"{n}={v}" if v else n for n, v in elegidos)
+
+
+def canonicalizar(url):
+    """Devuelve (plataforma, id de video o None, URL canónica)
+
+    - Si la URL apunta a un video concreto de una plataforma conocida, la
+      URL canónica es la misma para todas sus variantes y el id coincide
+      con el que usa yt-dlp.
+    - Si no (URLs cortas como fb.watch o vm.tiktok.com, perfiles, listas,
+      otros sitios) el id es None y la URL solo se normaliza: esquema y
+      host en minúsculas y sin parámetros de rastreo. En las plataformas
+      conocidas también se quitan el fragmento y los parámetros que no
+      están en su lista de útiles.
+    """
+    url = url.strip()
+    partes = _PARTES_URL.match(url)
+    if partes is None:
+        return 'generico', None, url
+
+    esquema, host, ruta, query, fragmento = partes.groups()
+    esquema = (esquema or 'https').lower()
+    host = host.lower()
+    puerto = _PUERTO.search(host)
+    if puerto is not None and puerto.group(1) == _PUERTOS_POR_DEFECTO.get(esquema):
+        host = host[:puerto.start()]
+    plataforma = REGISTRO.perfil_de_host(_PUERTO.sub('', host.rpartition('@')[2])).nombre
+    parametros = _parametros(query)
+
+    if plataforma == GENERICO:
+        query = _limpiar_query(parametros)
+        return plataforma, None, (f"{esquema}://{host}{ruta}" +
+                                  (f"?{query}" if query else "") + (fragmento or ""))
+    host = _PUERTO.sub('', host.rpartition('@')[2])
+
+    datos = REGLAS.get(plataforma, _SIN_REGLAS)
+    for patron, parametro, plantilla in datos['reglas']:
+        coincidencia = patron.match(ruta)
+        if coincidencia is None:
+            continue
+        if parametro is None:
+            video_id = coincidencia.group('id')
+        else:
+            video_id = next((v for n, v in parametros if n == parametro), None)
+            validar = datos.get('validar_id')
+            if not video_id or (validar is not None and not validar.match(video_id)):
+                continue
+        return plataforma, video_id, plantilla.format(id=quote(video_id, safe=''))
+
+    # URL de la plataforma sin id reconocible: normalizar sin perder lo útil
+    for prefijo in _PREFIJOS_HOST:
+        if host.startswith(prefijo):
+            host = 'www.' + host[len(prefijo):]
+            break
+    query = _limpiar_query(parametros, datos['conservar'])
+    return plataforma, None, f"https://{host}{ruta}" + (f"?{query}" if query else "")
+
+
+def clave_canonica(url):
+    """URL canónica para usar como clave de caché o de deduplicación"""
+    return canonicalizar(url)[2]
+
+
+# Corpus de conformidad: (URL, plataforma, id, URL canónica)
+CORPUS_CONFORMIDAD = [
+    # YouTube
+    ("https://www.youtube.com/watch?v=dQw4w9WgXcQ", 'youtube', 'dQw4w9WgXcQ',
+     "https://www.youtube.com/watch?v=dQw4w9WgXcQ"),
+    ("https://youtu.be/dQw4w9WgXcQ", 'youtube', 'dQw4w9WgXcQ',
+     "https://www.youtube.com/watch?v=dQw4w9WgXcQ"),
+    ("https://youtu.be/dQw4w9WgXcQ?si=AbCdEf&t=42", 'youtube', 'dQw4w9WgXcQ',
+     "https://www.youtube.com/watch?v=dQw4w9WgXcQ"),
+    ("https://m.youtube.com/watch?feature=share&v=dQw4w9WgXcQ&t=30s", 'youtube', 'dQw4w9WgXcQ',
+     "https://www.youtube.com/watch?v=dQw4w9WgXcQ"),
+    ("HTTPS://WWW.YOUTUBE.COM/watch?v=dQw4w9WgXcQ&list=PL123&index=2", 'youtube', 'dQw4w9WgXcQ',
+     "https://www.youtube.com/watch?v=dQw4w9WgXcQ"),
+    ("https://www.youtube.com/shorts/abcdefghijk?feature=share", 'youtube', 'abcdefghijk',
+     "https://www.youtube.com/watch?v=abcdefghijk"),
+    ("https://www.youtube.com/embed/dQw4w9WgXcQ", 'youtube', 'dQw4w9WgXcQ',
+     "https://www.youtube.com/watch?v=dQw4w9WgXcQ"),
+    ("https://www.youtube.com/live/dQw4w9WgXcQ?si=x", 'youtube', 'dQw4w9WgXcQ',
+     "https://www.youtube.com/watch?v=dQw4w9WgXcQ"),
+    ("https://music.youtube.com/watch?v=dQw4w9WgXcQ&feature=share", 'youtube', 'dQw4w9WgXcQ',
+     "https://www.youtube.com/watch?v=dQw4w9WgXcQ"),
+    ("https://www.youtube-nocookie.com/embed/dQw4w9WgXcQ", 'youtube', 'dQw4w9WgXcQ',
+     "https://www.youtube.com/watch?v=dQw4w9WgXcQ"),
+    ("https://www.youtube.com/playlist?list=PL123&si=abc", 'youtube', None,
+     "https://www.youtube.com/playlist?list=PL123"),
+    ("https://www.youtube.com/@canal/videos", 'youtube', None,
+     "https://www.youtube.com/@canal/videos"),
+    # Facebook
+    ("https://www.facebook.com/watch/?v=123456789", 'facebook', '123456789',
+     "https://www.facebook.com/watch/?v=123456789"),
+    ("https://m.facebook.com/watch?v=123456789&mibextid=abc&app=fbl", 'facebook', '123456789',
+     "https://www.facebook.com/watch/?v=123456789"),
+    ("https://web.facebook.com/video.php?v=123456789", 'facebook', '123456789',
+     "https://www.facebook.com/watch/?v=123456789"),
+    ("https://www.facebook.com/reel/987654321?mibextid=rS40aB7S9Ucbxw6v", 'facebook', '987654321',
+     "https://www.facebook.com/watch/?v=987654321"),
+    ("https://www.facebook.com/pagina/videos/titulo-del-video/123456789/", 'facebook', '123456789',
+     "https://www.facebook.com/watch/?v=123456789"),
+    ("https://www.facebook.com/pagina/videos/123456789", 'facebook', '123456789',
+     "https://www.facebook.com/watch/?v=123456789"),
+    ("https://fb.watch/abcDEF123/?mibextid=xyz", 'facebook', None,
+     "https://fb.watch/abcDEF123/"),
+    ("https://www.facebook.com/story.php?story_fbid=111&id=222&mibextid=x", 'facebook', None,
+     "https://www.facebook.com/story.php?story_fbid=111&id=222"),
+    # Instagram
+    ("https://www.instagram.com/p/ABC123xyz/", 'instagram', 'ABC123xyz',
+     "https://www.instagram.com/p/ABC123xyz/"),
+    ("https://instagram.com/reel/ABC123xyz?igsh=MTc4MmM1YmI2Ng==", 'instagram', 'ABC123xyz',
+     "https://www.instagram.com/p/ABC123xyz/"),
+    ("https://www.instagram.com/reels/ABC123xyz/?utm_source=ig_web_copy_link", 'instagram', 'ABC123xyz',
+     "https://www.instagram.com/p/ABC123xyz/"),
+    ("https://www.instagram.com/usuario/p/ABC123xyz/", 'instagram', 'ABC123xyz',
+     "https://www.instagram.com/p/ABC123xyz/"),
+    ("https://www.instagram.com/tv/ABC123xyz", 'instagram', 'ABC123xyz',
+     "https://www.instagram.com/p/ABC123xyz/"),
+    # TikTok
+    ("https://www.tiktok.com/@usuario/video/7106594312292453675", 'tiktok', '7106594312292453675',
+     "https://www.tiktok.com/@/video/7106594312292453675"),
+    ("https://www.tiktok.com/@otro.nombre/video/7106594312292453675?is_from_webapp=1&sender_device=pc",
+     'tiktok', '7106594312292453675', "https://www.tiktok.com/@/video/7106594312292453675"),
+    ("https://m.tiktok.com/v/7106594312292453675.html", 'tiktok', '7106594312292453675',
+     "https://www.tiktok.com/@/video/7106594312292453675"),
+    ("https://www.tiktok.com/embed/v2/7106594312292453675", 'tiktok', '7106594312292453675',
+     "https://www.tiktok.com/@/video/7106594312292453675"),
+    ("https://vm.tiktok.com/ZMabc123/", 'tiktok', None, "https://vm.tiktok.com/ZMabc123/"),
+    # Twitter / X
+    ("https://twitter.com/usuario/status/1234567890123456789", 'twitter', '1234567890123456789',
+     "https://x.com/i/status/1234567890123456789"),
+    ("https://x.com/usuario/status/1234567890123456789?s=20&t=abc", 'twitter', '1234567890123456789',
+     "https://x.com/i/status/1234567890123456789"),
+    ("https://mobile.twitter.com/i/web/status/1234567890123456789", 'twitter', '1234567890123456789',
+     "https://x.com/i/status/1234567890123456789"),
+    ("https://x.com/usuario/status/1234567890123456789/video/1", 'twitter', '1234567890123456789',
+     "https://x.com/i/status/1234567890123456789"),
+    # Genéricos: sin falsos positivos por subcadena
+    ("https://www.netflix.com/watch/123", 'generico', None, "https://www.netflix.com/watch/123"),
+    ("https://box.com/v/youtube.com/video", 'generico', None, "https://box.com/v/youtube.com/video"),
+    ("https://Vimeo.com/123456?utm_source=x&h=abc#t=10", 'generico', None,
+     "https://vimeo.com/123456?h=abc#t=10"),
+    ("https://ejemplo.com/buscar?s=gato&fbclid=IwAR0abc", 'generico', None,
+     "https://ejemplo.com/buscar?s=gato"),
+    ("http://127.0.0.1:8000/video.mp4", 'generico', None, "http://127.0.0.1:8000/video.mp4"),
+    ("https://ejemplo.com:443/video.mp4", 'generico', None, "https://ejemplo.com/video.mp4"),
+]
+
+
+def verificar_corpus():
+    """Comprueba el corpus de conformidad; devuelve la lista de fallos"""
+    fallos = []
+    for url, plataforma, video_id, canonica in CORPUS_CONFORMIDAD:
+        esperado = (plataforma, video_id, canonica)
+        obtenido = canonicalizar(url)
+        if obtenido != esperado:
+            fallos.append((url, esperado, obtenido))
+    return fallos
+
+
+def main():
+    fallos = verificar_corpus()
+    for url, esperado, obtenido in fallos:
+        print(f"❌ {url}\n   esperado: {esperado}\n   obtenido: {obtenido}")
+    print(f"{'✅' if not fallos else '❌'} {len(CORPUS_CONFORMIDAD) - len(fallos)}/"
+          f"{len(CORPUS_CONFORMIDAD)} URLs del corpus correctas")
+    return 1 if fallos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+carrera.py - Modo carrera para los métodos de respaldo
+Lanza varias estrategias de descarga a la vez; la primera que termina gana
+"""
+
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+from archivo_descargas import EXTENSIONES_MEDIA
+from core import (
+    capturar_salida_hilo,
+    cancelacion_hilo,
+    evento_cancelacion_actual,
+    trabajo_hilo,
+    trabajo_hilo_actual,
+)
+
+
+class Estrategia:
+    """Forma de descargar un video en el directorio que se le indique
+
+    descargar(directorio) debe devolver True si la descarga terminó bien.
+    """
+
+    def __init__(self, nombre, descargar):
+        self.nombre = nombre
+        self.descargar = descargar
+
+
+class _Corredor:
+    """Estado de una estrategia en marcha dentro de la carrera"""
+
+    def __init__(self, estrategia, directorio):
+        self.estrategia = estrategia
+        self.directorio = directorio
+        self.cancelar = threading.Event()
+        self.decidido = threading.Event()
+        self.hilo = None
+        self.inicio = None
+        # Último total de bytes visto y cuándo creció por última vez
+        self.bytes_vistos = 0
+        self.ultimo_avance = None
+
+    def bytes_descargados(self):
+        """Bytes de video y audio en el directorio, terminados o a medias
+
+        Miniaturas, subtítulos y .info.json no cuentan: se escriben al
+        principio aunque el video no avance.
+        """
+        total = 0
+        for raiz, _, archivos in os.walk(self.directorio):
+            for nombre in archivos:
+                if ".part" not in nombre and \
+                        os.path.splitext(nombre)[1].lower() not in EXTENSIONES_MEDIA:
+                    continue
+                try:
+                    total += os.path.getsize(os.path.join(raiz, nombre))
+                except OSError:
+                    pass
+        return total
+
+    def sin_progreso_desde(self, ahora):
+        """Segundos desde que el corredor descargó algo nuevo por última vez"""
+        total = self.bytes_descargados()
+        if total > self.bytes_vistos:
+            self.bytes_vistos = total
+            self.ultimo_avance = ahora
+        return ahora - self.ultimo_avance
+
+
+def ruta_promovida(ruta):
+    """Ruta final de un archivo descargado dentro de un directorio de carrera"""
+    partes = [p for p in Path(ruta).parts if not p.startswith(".carrera-")]
+    return str(Path(*partes))
+
+
+def _promover(origen, destino):
+    """Mueve los archivos terminados del directorio temporal al definitivo"""
+    movidos = []
+    for raiz, _, archivos in os.walk(origen):
+        for nombre in archivos:
+            if nombre.endswith(('.part', '.ytdl')):
+                continue
+            relativa = Path(raiz, nombre).relative_to(origen)
+            final = Path(destino) / relativa
+            final.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(os.path.join(raiz, nombre), final)
+            movidos.append(final)
+    return movidos
+
+
+def correr_carrera(estrategias, directorio_final, max_paralelo=3,
+                   retraso_cobertura=0.0, intervalo=0.5, al_terminar=None):
+    """Ejecuta las estrategias en paralelo y se queda con la primera que tenga éxito
+
+    - Cada estrategia descarga en su propio directorio temporal dentro de
+      directorio_final, así la promoción es un simple rename.
+    - Con retraso_cobertura > 0 las estrategias extra solo arrancan si
+      ninguna de las que están en marcha ha avanzado (bytes de video o
+      audio) en los últimos retraso_cobertura segundos.
+    - Cuando una falla, arranca la siguiente de la lista.
+    - al_terminar(nombre, exito, segundos) se llama por cada estrategia que
+      termina por sí misma (no por las que se cancelan al haber ganador).
+
+    - Si el hilo llamador tiene un evento de cancelación (cancelacion_hilo)
+      y se activa, la carrera entera se detiene.
+
+    Devuelve el nombre de la estrategia ganadora o None si todas fallan.
+    """
+    directorio_final = Path(directorio_final)
+    pendientes = deque(estrategias)
+    # Los corredores heredan el trabajo y la cancelación del llamador
+    cancelar_todo = evento_cancelacion_actual()
+    trabajo_llamador = trabajo_hilo_actual()
+    activos = []
+    resultados = queue.Queue()
+    ganador = None
+
+    def lanzar():
+        estrategia = pendientes.popleft()
+        directorio = Path(tempfile.mkdtemp(prefix=".carrera-", dir=str(directorio_final)))
+        corredor = _Corredor(estrategia, directorio)
+        corredor.inicio = corredor.ultimo_avance = time.monotonic()
+
+        def trabajo():
+            try:
+                with capturar_salida_hilo() as buffer, cancelacion_hilo(corredor.cancelar), \
+                        trabajo_hilo(trabajo_llamador):
+                    try:
+                        exito = bool(estrategia.descargar(directorio))
+                    except Exception as e:
+                        print(f"❌ Error en {estrategia.nombre}: {e}")
+                        exito = False
+                resultados.put((corredor, exito, buffer.getvalue()))
+                # Esperar a que el coordinador promueva (o descarte) los archivos
+                corredor.decidido.wait()
+            finally:
+                shutil.rmtree(directorio, ignore_errors=True)
+
+        corredor.hilo = threading.Thread(target=trabajo, daemon=True,
+                                         name=f"carrera-{estrategia.nombre}")
+        activos.append(corredor)
+        corredor.hilo.start()
+        print(f"🏁 Arrancando: {estrategia.nombre}")
+
+    # Sin cobertura arrancan todas a la vez; con cobertura, solo la primera
+    cupo_inicial = max_paralelo if retraso_cobertura <= 0 else 1
+    while pendientes and len(activos) < cupo_inicial:
+        lanzar()
+
+    while activos:
+        if cancelar_todo is not None and cancelar_todo.is_set():
+            print("⏹️  Carrera cancelada")
+            break
+        try:
+            corredor, exito, salida = resultados.get(timeout=intervalo)
+        except queue.Empty:
+            ahora = time.monotonic()
+            # Se miran todos (sin cortocircuito) para anotar el avance de cada uno
+            if (pendientes and len(activos) < max_paralelo and
+                    all([c.sin_progreso_desde(ahora) >= retraso_cobertura for c in activos])):
+                print(f"⏳ Sin progreso en {retraso_cobertura:g}s, cubriendo con otra estrategia")
+                lanzar()
+            continue
+
+        activos.remove(corredor)
+        if al_terminar:
+            al_terminar(corredor.estrategia.nombre, exito, time.monotonic() - corredor.inicio)
+        if exito:
+            ganador = corredor
+            _promover(corredor.directorio, directorio_final)
+            corredor.decidido.set()
+            print(salida, end="")
+            break
+
+        print(f"⚠️  {corredor.estrategia.nombre} falló")
+        corredor.decidido.set()
+        while pendientes and len(activos) < cupo_inicial:
+            lanzar()
+        if pendientes and not activos:
+            lanzar()
+
+    for corredor in activos:
+        corredor.cancelar.set()
+        corredor.decidido.set()
+
+    return ganador.estrategia.nombre if ganador else None
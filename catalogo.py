@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+catalogo.py - Catálogo local de metadatos de lo extraído y lo descargado
+Cada extracción (la caché de extracciones le pasa el info dict) y cada
+descarga (el índice de descargas le pasa la ruta) deja una fila
+normalizada: plataforma, id, título, autor, duración, tamaño, resumen de
+formatos y ruta local. Las consultas van contra SQLite con índices, sin
+red y sin recorrer carpetas.
+
+Uso como comando:
+    python catalogo.py resumen                       # videos y GB por plataforma
+    python catalogo.py listar --pendientes --min-duracion 10m
+    python catalogo.py listar --titulo receta --plataforma youtube --json
+    python catalogo.py importar                      # desde la caché y el índice
+"""
+
+import json
+import re
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+from canonicalizar import canonicalizar
+
+
+COLUMNAS = ('plataforma', 'video_id', 'titulo', 'autor', 'duracion', 'tamano_estimado',
+            'formatos', 'altura_maxima', 'extensiones', 'url', 'fecha_subida', 'extraido',
+            'ruta', 'tamano', 'descargado')
+
+ORDENES = {
+    'duracion': "duracion DESC",
+    'tamano': "COALESCE(tamano, tamano_estimado) DESC",
+    'titulo': "titulo COLLATE NOCASE",
+    'reciente': "COALESCE(descargado, extraido) DESC",
+}
+
+
+def ruta_catalogo_por_defecto():
+    """Catálogo compartido por descargar_videos.py y facebook_descargador.py"""
+    return Path.home() / "Descargas" / ".catalogo.sqlite3"
+
+
+def leer_duracion(texto):
+    """'90', '10m', '1h30m', '1:30:00' -> segundos"""
+    texto = str(texto).strip().lower()
+    if ":" in texto:
+        segundos = 0
+        for parte in texto.split(":"):
+            segundos = segundos * 60 + float(parte)
+        return segundos
+    partes = re.fullmatch(r'(?:(\d+(?:\.\d+)?)h)?(?:(\d+(?:\.\d+)?)m)?(?:(\d+(?:\.\d+)?)s?)?', texto)
+    if not texto or partes is None:
+        raise ValueError(f"duración no válida: {texto!r}")
+    horas, minutos, segundos = (float(p or 0) for p in partes.groups())
+    return horas * 3600 + minutos * 60 + segundos
+
+
+def normalizar(info, url=None):
+    """Fila del catálogo (sin ruta) a partir de un info dict de yt-dlp"""
+    formatos = info.get('formats') or []
+    alturas = [f.get('height') for f in formatos if isinstance(f.get('height'), int)]
+    extensiones = sorted({f['ext'] for f in formatos if f.get('ext')})
+    tamano = info.get('filesize') or info.get('filesize_approx')
+    if not tamano and info.get('requested_formats'):
+        tamano = sum(f.get('filesize') or f.get('filesize_approx') or 0
+                     for f in info['requested_formats']) or None
+    return {
+        'plataforma': canonicalizar(info.get('webpage_url') or url or '')[0],
+        'video_id': str(info['id']),
+        'titulo': info.get('title'),
+        'autor': info.get('uploader') or info.get('channel') or info.get('creator'),
+        'duracion': info.get('duration'),
+        'tamano_estimado': int(tamano) if tamano else None,
+        'formatos': len(formatos) or None,
+        'altura_maxima': max(alturas) if alturas else info.get('height'),
+        'extensiones': ",".join(extensiones) or info.get('ext'),
+        'url': info.get('webpage_url') or url,
+        'fecha_subida': info.get('upload_date'),
+    }
+
+
+class CatalogoMetadatos:
+    """Tabla videos (plataforma, id) con índices para las consultas habituales
+
+    registrar_info() y registrar_descarga() actualizan solo sus columnas,
+    así que da igual qué llegue primero.
+    """
+
+    def __init__(self, ruta=None):
+        self.ruta = Path(ruta or ruta_catalogo_por_defecto()).expanduser()
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        self._cerrojo = threading.Lock()
+        self._conexion = sqlite3.connect(str(self.ruta), check_same_thread=False, timeout=30)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.executescript("""
+            CREATE TABLE IF NOT EXISTS videos (
+                plataforma TEXT NOT NULL,
+                video_id TEXT NOT NULL,
+                titulo TEXT,
+                autor TEXT,
+                duracion REAL,
+                tamano_estimado INTEGER,
+                formatos INTEGER,
+                altura_maxima INTEGER,
+                extensiones TEXT,
+                url TEXT,
+                fecha_subida TEXT,
+                extraido REAL,
+                ruta TEXT,
+                tamano INTEGER,
+                descargado REAL,
+                PRIMARY KEY (plataforma, video_id)
+            ) WITHOUT ROWID;
+            -- GB por plataforma sin leer la tabla entera
+            CREATE INDEX IF NOT EXISTS videos_plataforma ON videos (plataforma, descargado, tamano);
+            CREATE INDEX IF NOT EXISTS videos_duracion ON videos (duracion);
+            CREATE INDEX IF NOT EXISTS videos_pendientes ON videos (duracion) WHERE ruta IS NULL;
+            CREATE INDEX IF NOT EXISTS videos_autor ON videos (autor COLLATE NOCASE);
+        """)
+        self._conexion.commit()
+
+    def cerrar(self):
+        with self._cerrojo:
+            self._conexion.close()
+
+    def registrar_info(self, url, info, confirmar=True):
+        """Anota los metadatos de una extracción; devuelve (plataforma, id) o None"""
+        if not info.get('id'):
+            return None
+        fila = normalizar(info, url)
+        campos = [c for c in fila if c not in ('plataforma', 'video_id')]
+        with self._cerrojo:
+            self._conexion.execute(
+                f"INSERT INTO videos (plataforma, video_id, {', '.join(campos)}, extraido) "
+                f"VALUES (?, ?, {', '.join('?' * len(campos))}, ?) "
+                f"ON CONFLICT (plataforma, video_id) DO UPDATE SET "
+                + ", ".join(f"{c} = COALESCE(excluded.{c}, {c})" for c in campos)
+                + ", extraido = excluded.extraido",
+                (fila['plataforma'], fila['video_id'], *(fila[c] for c in campos), time.time())
+            )
+            if confirmar:
+                self._conexion.commit()
+        return fila['plataforma'], fila['video_id']
+
+    def registrar_descarga(self, plataforma, video_id, ruta, tamano, fecha=None, confirmar=True):
+        """Anota dónde quedó un video descargado"""
+        with self._cerrojo:
+            self._conexion.execute(
+                "INSERT INTO videos (plataforma, video_id, ruta, tamano, descargado) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT (plataforma, video_id) DO UPDATE SET "
+                "ruta = excluded.ruta, tamano = excluded.tamano, descargado = excluded.descargado",
+                (plataforma, str(video_id), str(ruta), tamano, fecha or time.time())
+            )
+            if confirmar:
+                self._conexion.commit()
+
+    def olvidar_descarga(self, plataforma, video_id):
+        """El archivo ya no está: el video vuelve a contar como pendiente"""
+        with self._cerrojo:
+            self._conexion.execute(
+                "UPDATE videos SET ruta = NULL, tamano = NULL, descargado = NULL "
+                "WHERE plataforma = ? AND video_id = ?", (plataforma, str(video_id))
+            )
+            self._conexion.commit()
+
+    def confirmar(self):
+        with self._cerrojo:
+            self._conexion.commit()
+
+    def resumen(self):
+        """[(plataforma, videos, descargados, bytes en disco)] de mayor a menor"""
+        with self._cerrojo:
+            return self._conexion.execute(
+                "SELECT plataforma, COUNT(*), COUNT(descargado), COALESCE(SUM(tamano), 0) "
+                "FROM videos GROUP BY plataforma ORDER BY 4 DESC, 2 DESC"
+            ).fetchall()
+
+    def listar(self, plataforma=None, autor=None, titulo=None, min_duracion=None,
+               max_duracion=None, descargados=None, orden='duracion', limite=50):
+        """Filas (dicts) que cumplen los filtros; descargados=False = pendientes"""
+        condiciones = []
+        parametros = []
+        if plataforma:
+            condiciones.append("plataforma = ?")
+            parametros.append(plataforma)
+        if autor:
+            condiciones.append("autor = ? COLLATE NOCASE")
+            parametros.append(autor)
+        if titulo:
+            condiciones.append("titulo LIKE ?")
+            parametros.append(f"%{titulo}%")
+        if min_duracion is not None:
+            condiciones.append("duracion >= ?")
+            parametros.append(min_duracion)
+        if max_duracion is not None:
+            condiciones.append("duracion <= ?")
+            parametros.append(max_duracion)
+        if descargados is not None:
+            condiciones.append("ruta IS NOT NULL" if descargados else "ruta IS NULL")
+        consulta = f"SELECT {', '.join(COLUMNAS)} FROM videos"
+        if condiciones:
+            consulta += " WHERE " + " AND ".join(condiciones)
+        consulta += f" ORDER BY {ORDENES[orden]}"
+        if limite:
+            consulta += " LIMIT ?"
+            parametros.append(limite)
+        with self._cerrojo:
+            filas = self._conexion.execute(consulta, parametros).fetchall()
+        return [dict(zip(COLUMNAS, fila)) for fila in filas]
+
+    def importar(self, cache=None, archivo=None):
+        """Rellena el catálogo con lo que ya saben la caché y el índice de descargas"""
+        infos = descargas = 0
+        if cache is not None:
+            for _, _, info in cache.infos():
+                infos += self.registrar_info(None, info, confirmar=False) is not None
+        if archivo is not None:
+            for plataforma, video_id, ruta, tamano, fecha in archivo.entradas():
+                self.registrar_descarga(plataforma, video_id, ruta, tamano, fecha, confirmar=False)
+                descargas += 1
+        self.confirmar()
+        return infos, descargas
+
+
+def main(argv=None):
+    import argparse
+
+    from core import formatear_titulo_seccion
+    from eventos_progreso import formatear_bytes, formatear_duracion
+
+    parser = argparse.ArgumentParser(description="Catálogo de videos extraídos y descargados")
+    parser.add_argument("--catalogo", help="Ruta del catálogo (por defecto ~/Descargas)")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    sub.add_parser("resumen", help="Videos y espacio en disco por plataforma")
+
+    p_listar = sub.add_parser("listar", help="Videos que cumplen unos filtros")
+    estado = p_listar.add_mutually_exclusive_group()
+    estado.add_argument("--pendientes", action="store_true", help="Solo los no descargados")
+    estado.add_argument("--descargados", action="store_true", help="Solo los descargados")
+    p_listar.add_argument("--plataforma")
+    p_listar.add_argument("--autor")
+    p_listar.add_argument("--titulo", help="Texto contenido en el título")
+    p_listar.add_argument("--min-duracion", type=leer_duracion, metavar="DUR",
+                          help="p. ej. 10m, 1h30m, 90")
+    p_listar.add_argument("--max-duracion", type=leer_duracion, metavar="DUR")
+    p_listar.add_argument("--orden", choices=sorted(ORDENES), default='duracion')
+    p_listar.add_argument("--limite", type=int, default=50, help="0 = sin límite")
+    p_listar.add_argument("--json", action="store_true", help="Una línea JSON por video")
+
+    sub.add_parser("importar", help="Rellena el catálogo desde la caché y el índice de descargas")
+
+    args = parser.parse_args(argv)
+    catalogo = CatalogoMetadatos(args.catalogo)
+    inicio = time.perf_counter()
+
+    if args.comando == "importar":
+        from archivo_descargas import ArchivoDescargas
+        from cache_extraccion import CacheExtraccion
+
+        infos, descargas = catalogo.importar(CacheExtraccion(), ArchivoDescargas())
+        print(f"✅ {infos} extracciones y {descargas} descargas importadas "
+              f"en {time.perf_counter() - inicio:.1f}s")
+        return 0
+
+    if args.comando == "resumen":
+        filas = catalogo.resumen()
+        milisegundos = (time.perf_counter() - inicio) * 1000
+        print(formatear_titulo_seccion("📚 CATÁLOGO POR PLATAFORMA"))
+        print(f"{'Plataforma':<16}{'Videos':>8}{'Descargados':>13}{'En disco':>12}")
+        for plataforma, videos, descargados, bytes_disco in filas:
+            print(f"{plataforma:<16}{videos:>8}{descargados:>13}{formatear_bytes(bytes_disco):>12}")
+        total = sum(f[3] for f in filas)
+        print(f"\nTotal: {sum(f[1] for f in filas)} videos, {formatear_bytes(total)} "
+              f"({milisegundos:.1f} ms)")
+        return 0
+
+    descargados = True if args.descargados else False if args.pendientes else None
+    filas = catalogo.listar(args.plataforma, args.autor, args.titulo, args.min_duracion,
+                            args.max_duracion, descargados, args.orden, args.limite)
+    milisegundos = (time.perf_counter() - inicio) * 1000
+    if args.json:
+        for fila in filas:
+            print(json.dumps(fila, ensure_ascii=False))
+        return 0
+    for fila in filas:
+        estado = "✓" if fila['ruta'] else "·"
+        tamano = formatear_bytes(fila['tamano'] or fila['tamano_estimado'])
+        print(f"{estado} [{fila['plataforma']}] {formatear_duracion(fila['duracion']):>8} "
+              f"{tamano:>9}  {fila['titulo'] or fila['video_id']}")
+        print(f"    {fila['ruta'] or fila['url'] or ''}")
+    print(f"\n{len(filas)} videos ({milisegundos:.1f} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
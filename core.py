@@ -7,9 +7,21 @@ Descargador de Videos - Funciones reutilizables
 
 import os
 import sys
+import io
+import json
+import time
+import queue
+import threading
 import subprocess
+from contextlib import contextmanager
 from pathlib import Path
 
+from ancho_banda import GestorAnchoBanda, ReguladorProceso
+from cortesia import LIMITADOR_SITIOS, es_aviso_de_limite
+from eventos_progreso import ARGUMENTOS_PROGRESO, BUS_PROGRESO, AnalizadorProgreso
+from vigilancia import VigilanteDescarga
+from plataformas import REGISTRO as REGISTRO_PLATAFORMAS
+
 
 class ValidacionError(Exception):
     """Error personalizado para validaciones"""
@@ -32,8 +44,73 @@ def verificar_python_version():
     return True
 
 
-def verificar_ytdlp_instalado():
-    """Verifica si yt-dlp está instalado"""
+def ruta_cache_dependencias():
+    return Path.home() / "Descargas" / ".dependencias.json"
+
+
+def huella_ytdlp():
+    """Identifica la instalación de yt-dlp sin ejecutarlo, o None si no está en el PATH
+    
+    Ruta real del ejecutable con su fecha y tamaño, más la fecha del
+    version.py del paquete (un pip install --upgrade cambia alguno de ellos).
+    """
+    import shutil
+    ejecutable = shutil.which("yt-dlp")
+    if ejecutable is None:
+        return None
+    try:
+        ruta = os.path.realpath(ejecutable)
+        datos = os.stat(ruta)
+    except OSError:
+        return None
+    huella = [ruta, datos.st_mtime_ns, datos.st_size]
+    try:
+        from importlib.util import find_spec
+        paquete = find_spec("yt_dlp")
+        if paquete is not None and paquete.origin:
+            huella.append(os.stat(Path(paquete.origin).parent / "version.py").st_mtime_ns)
+    except (ImportError, ValueError, OSError):
+        pass
+    return huella
+
+
+def _version_en_cache(huella):
+    try:
+        with open(ruta_cache_dependencias(), 'r', encoding='utf-8') as f:
+            guardado = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if guardado.get("huella") == huella:
+        return guardado.get("version")
+    return None
+
+
+def _guardar_version_en_cache(huella, version):
+    ruta = ruta_cache_dependencias()
+    try:
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        temporal = ruta.with_name(ruta.name + ".tmp")
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump({"huella": huella, "version": version, "fecha": time.time()}, f)
+        os.replace(temporal, ruta)
+    except OSError:
+        pass   # sin caché solo se pierde velocidad en el próximo arranque
+
+
+def verificar_ytdlp_instalado(usar_cache=True):
+    """Verifica si yt-dlp está instalado
+    
+    Ejecutar yt-dlp --version cuesta cientos de milisegundos: el resultado se
+    guarda junto a la huella de la instalación (ver huella_ytdlp) y solo se
+    vuelve a ejecutar cuando esta cambia.
+    """
+    huella = huella_ytdlp()
+    if huella is None:
+        return False, None
+    if usar_cache:
+        version = _version_en_cache(huella)
+        if version:
+            return True, version
     try:
         resultado = subprocess.run(
             ["yt-dlp", "--version"],
@@ -42,9 +119,10 @@ def verificar_ytdlp_instalado():
             timeout=5
         )
         version = resultado.stdout.decode().strip()
-        return True, version
     except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired):
         return False, None
+    _guardar_version_en_cache(huella, version)
+    return True, version
 
 
 def instalar_ytdlp():
@@ -67,8 +145,12 @@ def instalar_ytdlp():
         raise DependenciaError("No se pudo instalar yt-dlp") from e
 
 
-def verificar_dependencias():
-    """Verifica e instala todas las dependencias necesarias"""
+def verificar_dependencias(instalar=True):
+    """Verifica e instala todas las dependencias necesarias
+    
+    Con instalar=False (modo sin menú) no se intenta el pip install: se
+    indica cómo instalar yt-dlp y se devuelve False.
+    """
     # Verificar Python
     try:
         verificar_python_version()
@@ -82,6 +164,10 @@ def verificar_dependencias():
     if instalado:
         print(f"✓ yt-dlp {version} encontrado")
         return True
+    elif not instalar:
+        print("❌ yt-dlp no está instalado")
+        print(f"💡 Instálalo con: {sys.executable} -m pip install yt-dlp")
+        return False
     else:
         try:
             instalar_ytdlp()
@@ -169,74 +255,425 @@ def crear_directorio_seguro(ruta):
 
 
 def leer_urls_de_archivo(archivo):
-    """Lee URLs desde un archivo de texto"""
+    """Lee todas las URLs de un archivo de texto
+    
+    Para listas grandes usa ingesta_urls.iterar_urls, que no carga el
+    archivo entero en memoria.
+    """
+    from ingesta_urls import EstadisticasIngesta, iterar_urls
+    
+    estadisticas = EstadisticasIngesta()
+    urls = list(iterar_urls(archivo, estadisticas))
+    
+    if not urls:
+        raise ValidacionError(
+            "❌ No se encontraron URLs válidas en el archivo\n"
+            "   Las URLs deben:\n"
+            "   - Comenzar con http:// o https://\n"
+            "   - No estar comentadas con #\n"
+            "   - No estar vacías"
+        )
+    
+    estadisticas.mostrar_resumen()
+    return urls
+
+
+class _SalidaPorHilo(io.TextIOBase):
+    """Proxy de sys.stdout que desvía la salida de cada hilo a su propio buffer"""
+    
+    def __init__(self, original):
+        self.original = original
+        self._local = threading.local()
+    
+    @property
+    def buffer_actual(self):
+        return getattr(self._local, 'buffer', None)
+    
+    @buffer_actual.setter
+    def buffer_actual(self, buffer):
+        self._local.buffer = buffer
+    
+    def write(self, texto):
+        destino = self.buffer_actual
+        if destino is None:
+            destino = self.original
+        return destino.write(texto)
+    
+    def flush(self):
+        if self.buffer_actual is None:
+            self.original.flush()
+    
+    def isatty(self):
+        return self.buffer_actual is None and self.original.isatty()
+
+
+_instalacion_salida = threading.Lock()
+
+
+@contextmanager
+def capturar_salida_hilo():
+    """Captura todo lo que imprime el hilo actual (incluido yt-dlp) en un buffer
+    
+    Evita que la salida de descargas simultáneas se mezcle en la consola:
+    cada trabajador escribe en su buffer y el llamador lo imprime de una vez.
+    """
+    with _instalacion_salida:
+        if not isinstance(sys.stdout, _SalidaPorHilo):
+            sys.stdout = _SalidaPorHilo(sys.stdout)
+        proxy = sys.stdout
+    
+    anterior = proxy.buffer_actual
+    buffer = io.StringIO()
+    proxy.buffer_actual = buffer
     try:
-        ruta_absoluta = validar_archivo_existe(archivo, "archivo de URLs")
-        
-        with open(ruta_absoluta, 'r', encoding='utf-8') as f:
-            urls = []
-            linea_num = 0
-            
-            for linea in f:
-                linea_num += 1
-                linea = linea.strip()
-                
-                # Ignorar líneas vacías y comentarios
-                if not linea or linea.startswith('#'):
-                    continue
-                
-                try:
-                    url_valida = validar_url(linea)
-                    urls.append(url_valida)
-                except ValidacionError as e:
-                    print(f"⚠️  Línea {linea_num} ignorada: {e}")
-                    continue
-            
-            if not urls:
-                raise ValidacionError(
-                    "❌ No se encontraron URLs válidas en el archivo\n"
-                    "   Las URLs deben:\n"
-                    "   - Comenzar con http:// o https://\n"
-                    "   - No estar comentadas con #\n"
-                    "   - No estar vacías"
-                )
-            
-            print(f"✓ {len(urls)} URLs válidas encontradas")
-            return urls
-            
-    except UnicodeDecodeError:
+        yield buffer
+    finally:
+        proxy.buffer_actual = anterior
+
+
+def salida_capturada_actual():
+    """Devuelve el buffer de captura del hilo actual o None si no hay captura"""
+    if isinstance(sys.stdout, _SalidaPorHilo):
+        return sys.stdout.buffer_actual
+    return None
+
+
+# Backends para ejecutar yt-dlp:
+#   subproceso - lanza el ejecutable yt-dlp en cada intento (por defecto)
+#   en_proceso - usa la API de Python en este mismo proceso (ytdlp_en_proceso.py)
+BACKEND_SUBPROCESO = "subproceso"
+BACKEND_EN_PROCESO = "en_proceso"
+BACKENDS_YTDLP = (BACKEND_SUBPROCESO, BACKEND_EN_PROCESO)
+
+_backend_ytdlp = {"nombre": BACKEND_SUBPROCESO}
+
+
+def configurar_backend_ytdlp(nombre):
+    """Selecciona cómo se ejecutan los comandos de yt-dlp"""
+    if nombre not in BACKENDS_YTDLP:
         raise ValidacionError(
-            "❌ Error de codificación en el archivo\n"
-            "   Guarda el archivo con codificación UTF-8"
+            f"❌ Backend desconocido: {nombre}\n"
+            f"   Opciones válidas: {', '.join(BACKENDS_YTDLP)}"
         )
+    
+    if nombre == BACKEND_EN_PROCESO:
+        from ytdlp_en_proceso import cargar_ytdlp
+        cargar_ytdlp()
+    
+    _backend_ytdlp["nombre"] = nombre
+    return nombre
 
 
-def ejecutar_comando_ytdlp(comando, capturar_salida=False):
-    """Ejecuta un comando de yt-dlp de forma segura"""
+def backend_ytdlp_activo():
+    """Devuelve el nombre del backend de yt-dlp en uso"""
+    return _backend_ytdlp["nombre"]
+
+
+_estado_hilo = threading.local()
+
+
+@contextmanager
+def cancelacion_hilo(evento):
+    """Asocia un threading.Event al hilo actual para cancelar sus comandos de yt-dlp
+    
+    Mientras dure el contexto, cualquier ejecutar_comando_ytdlp del hilo se
+    interrumpe en cuanto el evento se activa.
+    """
+    anterior = getattr(_estado_hilo, 'cancelar', None)
+    _estado_hilo.cancelar = evento
+    try:
+        yield evento
+    finally:
+        _estado_hilo.cancelar = anterior
+
+
+def evento_cancelacion_actual():
+    """Devuelve el evento de cancelación del hilo actual o None"""
+    return getattr(_estado_hilo, 'cancelar', None)
+
+
+@contextmanager
+def trabajo_hilo(identificador):
+    """Asocia las descargas del hilo a un trabajo externo (p. ej. del servicio)
+    
+    Los suscriptores de BUS_PROGRESO lo consultan con trabajo_hilo_actual()
+    al recibir el evento de inicio, que se publica en el hilo que descarga.
+    """
+    anterior = getattr(_estado_hilo, 'trabajo', None)
+    _estado_hilo.trabajo = identificador
     try:
-        if capturar_salida:
-            resultado = subprocess.run(
-                comando,
-                check=True,
-                capture_output=True,
-                text=True,
-                timeout=300  # 5 minutos timeout
+        yield identificador
+    finally:
+        _estado_hilo.trabajo = anterior
+
+
+def trabajo_hilo_actual():
+    """Devuelve el trabajo asociado al hilo actual o None"""
+    return getattr(_estado_hilo, 'trabajo', None)
+
+
+@contextmanager
+def postproceso_diferido_hilo(continuar):
+    """Las descargas del hilo no esperan a su postproceso (ver postproceso.py)
+
+    Quien encola un postproceso lo anota en la lista que se devuelve y
+    llamará a continuar(exito) cuando termine; si la lista queda vacía,
+    no había nada que esperar.
+    """
+    anterior = getattr(_estado_hilo, 'postproceso', None)
+    diferidos = []
+    _estado_hilo.postproceso = (continuar, diferidos)
+    try:
+        yield diferidos
+    finally:
+        _estado_hilo.postproceso = anterior
+
+
+def postproceso_diferido_actual():
+    """(continuar, diferidos) de postproceso_diferido_hilo o None"""
+    return getattr(_estado_hilo, 'postproceso', None)
+
+
+_vigilancia = {}
+
+
+def configurar_vigilancia(ventana_estancamiento=None, velocidad_minima=None,
+                          plazo_base=None, ritmo_plazo=None):
+    """Ajusta cuándo se considera atascada una descarga (ver vigilancia.py)
+    
+    Los parámetros que se dejan en None conservan su valor actual.
+    """
+    nuevos = {
+        'ventana_estancamiento': ventana_estancamiento,
+        'velocidad_minima': velocidad_minima,
+        'plazo_base': plazo_base,
+        'ritmo_plazo': ritmo_plazo,
+    }
+    for nombre, valor in nuevos.items():
+        if valor is None:
+            continue
+        minimo_excluido = nombre != 'velocidad_minima'
+        if valor < 0 or (minimo_excluido and valor == 0):
+            raise ValidacionError(
+                f"❌ Valor no válido para {nombre}: {valor}\n"
+                f"   Debe ser un número {'mayor que' if minimo_excluido else 'mayor o igual que'} 0"
             )
-            return True, resultado.stdout
-        else:
-            subprocess.run(comando, check=True, timeout=300)
-            return True, None
-            
+        _vigilancia[nombre] = valor
+    return dict(_vigilancia)
+
+
+def crear_vigilante():
+    """Vigilante de estancamiento con la configuración actual"""
+    return VigilanteDescarga(**_vigilancia)
+
+
+_ancho_banda = {"gestor": None}
+
+
+def configurar_ancho_banda(total, pesos=None):
+    """Limita el ancho de banda conjunto de todas las descargas (ver ancho_banda.py)
+    
+    total: bytes/s o texto como '500K' o '4M'; None quita el límite.
+    pesos: {plataforma: peso} para repartir el total (1 por defecto).
+    """
+    if total is None:
+        _ancho_banda["gestor"] = None
+        return None
+    try:
+        gestor = GestorAnchoBanda(total, pesos)
+    except ValueError as e:
+        raise ValidacionError(f"❌ {e}")
+    _ancho_banda["gestor"] = gestor
+    return gestor
+
+
+def gestor_ancho_banda_activo():
+    """Devuelve el GestorAnchoBanda en uso o None si no hay límite"""
+    return _ancho_banda["gestor"]
+
+
+@contextmanager
+def prioridad_hilo(prioridad):
+    """Multiplica el peso en el reparto de ancho de banda de las descargas del hilo"""
+    anterior = getattr(_estado_hilo, 'prioridad', 1.0)
+    _estado_hilo.prioridad = prioridad
+    try:
+        yield prioridad
+    finally:
+        _estado_hilo.prioridad = anterior
+
+
+def registrar_cuota_banda(url, al_cambiar=None):
+    """Cuota de ancho de banda para una descarga de `url`, o None sin límite"""
+    gestor = _ancho_banda["gestor"]
+    if gestor is None:
+        return None
+    plataforma = detectar_plataforma(url) if url else None
+    return gestor.registrar(plataforma, getattr(_estado_hilo, 'prioridad', 1.0), al_cambiar)
+
+
+def _leer_lineas(flujo, nombre, cola):
+    """Pasa las líneas de un pipe a la cola; None indica que se cerró"""
+    try:
+        for linea in iter(flujo.readline, ''):
+            cola.put((nombre, linea))
+    finally:
+        cola.put((nombre, None))
+
+
+def _detener(proceso, regulador=None):
+    """Termina yt-dlp sin borrar nada: el .part queda para continuar después"""
+    if regulador is not None:
+        regulador.soltar()   # un proceso pausado no atiende a SIGTERM
+    proceso.terminate()
+    try:
+        proceso.wait(timeout=10)
     except subprocess.TimeoutExpired:
-        print("\n⏱️  Timeout: La descarga está tardando demasiado")
-        print("   Esto puede deberse a:")
-        print("   - Archivo muy grande")
-        print("   - Conexión lenta")
-        print("   - Servidor del sitio lento")
+        proceso.kill()
+
+
+# Opciones de yt-dlp que solo consultan información (no descargan el video)
+_OPCIONES_SOLO_INFORMACION = frozenset((
+    "--dump-json", "-j", "--dump-single-json", "-J", "--get-url", "-g",
+    "--simulate", "-s", "--skip-download",
+))
+
+
+def _url_del_comando(comando):
+    """La URL va al final de los comandos de yt-dlp (salvo --load-info-json)"""
+    ultimo = comando[-1] if len(comando) > 1 else ""
+    return ultimo if "://" in ultimo else None
+
+
+def ejecutar_comando_ytdlp(comando, capturar_salida=False):
+    """Ejecuta un comando de yt-dlp de forma segura
+    
+    La salida se lee línea a línea: las de progreso se convierten en
+    eventos del BUS_PROGRESO (ver eventos_progreso.py) y el resto se
+    muestra, o se devuelve si capturar_salida.
+    
+    No hay un tiempo límite fijo: el vigilante (ver vigilancia.py) solo
+    detiene la descarga si se atasca o supera un plazo proporcional a su
+    tamaño, y el archivo .part se conserva para continuar en otro intento.
+    """
+    if comando and comando[0] == "yt-dlp" and backend_ytdlp_activo() == BACKEND_EN_PROCESO:
+        from ytdlp_en_proceso import ejecutar_en_proceso
+        return ejecutar_en_proceso(comando[1:], capturar_salida)
+    
+    cancelar = evento_cancelacion_actual()
+    if cancelar is not None and cancelar.is_set():
         return False, None
+    vigilante = crear_vigilante()
+    analizador = cuota = url = None
+    if comando and comando[0] == "yt-dlp":
+        url = _url_del_comando(comando)
+        # Turno del sitio (compartido con los demás trabajadores)
+        if url is not None and not LIMITADOR_SITIOS.esperar_turno(url, cancelar):
+            return False, None
+        analizador = AnalizadorProgreso(url=url)
+        if _OPCIONES_SOLO_INFORMACION.isdisjoint(comando):
+            cuota = registrar_cuota_banda(url, al_cambiar=vigilante.ajustar_a_tasa)
+        limite_tasa = (("--limit-rate", str(int(cuota.limite_subproceso())))
+                       if cuota is not None else ())
+        comando = [comando[0], *ARGUMENTOS_PROGRESO, *limite_tasa, *comando[1:]]
+        if cuota is not None:
+            vigilante.ajustar_a_tasa(cuota.tasa)
+    
+    # Sin captura, stderr se mezcla con stdout para mostrarlo en orden
+    salida_err = subprocess.PIPE if capturar_salida else subprocess.STDOUT
+    
+    try:
+        proceso = subprocess.Popen(
+            comando, stdout=subprocess.PIPE, stderr=salida_err, text=True, errors='replace'
+        )
+    except OSError:
+        if cuota is not None:
+            cuota.liberar()
+        raise
+    regulador = None
+    if cuota is not None:
+        regulador = ReguladorProceso(proceso, cuota, al_reanudar=vigilante.descontar_pausa)
+    if analizador is not None:
+        BUS_PROGRESO.publicar(analizador.evento_inicio())
+    
+    cola = queue.Queue()
+    flujos = [("out", proceso.stdout)]
+    if capturar_salida:
+        flujos.append(("err", proceso.stderr))
+    for nombre, flujo in flujos:
+        threading.Thread(target=_leer_lineas, args=(flujo, nombre, cola), daemon=True).start()
+    
+    salida, errores = [], []
+    abiertos = len(flujos)
+    limitado = False
+    motivo_error = "Ejecución interrumpida"
+    try:
+        while abiertos:
+            if cancelar is not None and cancelar.is_set():
+                _detener(proceso, regulador)
+                motivo_error = "Descarga cancelada"
+                return False, None
+            pausa = regulador.atender() if regulador is not None else None
+            motivo_atasco = vigilante.revisar() if pausa is None else None
+            if motivo_atasco is not None:
+                _detener(proceso, regulador)
+                motivo_error = f"Descarga detenida: {motivo_atasco}"
+                print(f"\n⏱️  Descarga detenida: {motivo_atasco}")
+                print("   Esto puede deberse a:")
+                print("   - Conexión caída o muy lenta")
+                print("   - Servidor del sitio que dejó de responder")
+                print("   El archivo .part se conserva: al reintentar, continúa donde se quedó")
+                return False, None
+            
+            try:
+                nombre, linea = cola.get(timeout=min(0.5, pausa or 0.5))
+            except queue.Empty:
+                continue
+            if linea is None:
+                abiertos -= 1
+                continue
+            
+            if analizador is not None:
+                evento = analizador.procesar_linea(linea)
+                if evento is not None:
+                    antes = vigilante.bytes_descargados
+                    vigilante.observar(evento)
+                    if regulador is not None:
+                        regulador.contabilizar(vigilante.bytes_descargados - antes)
+                    BUS_PROGRESO.publicar(evento)
+                    continue
+            
+            if url is not None and not limitado and es_aviso_de_limite(linea):
+                limitado = True
+                LIMITADOR_SITIOS.registrar_limite(url)
+            
+            if nombre == "err":
+                errores.append(linea)
+            elif capturar_salida:
+                salida.append(linea)
+            else:
+                sys.stdout.write(linea)
+                sys.stdout.flush()
         
-    except subprocess.CalledProcessError as e:
-        return False, e.stderr if capturar_salida else None
+        proceso.wait()
+        exito = proceso.returncode == 0
+        if exito and url is not None and not limitado:
+            LIMITADOR_SITIOS.registrar_exito(url)
+        motivo_error = None if exito else (
+            (analizador is not None and analizador.ultimo_error)
+            or f"yt-dlp terminó con código {proceso.returncode}"
+        )
+        if not capturar_salida:
+            return exito, None
+        return exito, "".join(salida if exito else errores)
+    
+    finally:
+        if regulador is not None:
+            regulador.soltar()
+        if proceso.poll() is None:
+            proceso.wait()
+        if analizador is not None:
+            BUS_PROGRESO.publicar(analizador.evento_final(motivo_error is None, motivo_error))
 
 
 def formatear_titulo_seccion(titulo):
@@ -278,25 +715,87 @@ def pausar():
     input("\n⏸  Presiona Enter para continuar...")
 
 
-# Constantes útiles
-SITIOS_POPULARES = {
-    'facebook': ['facebook.com', 'fb.watch', 'fb.com'],
-    'instagram': ['instagram.com'],
-    'tiktok': ['tiktok.com'],
-    'youtube': ['youtube.com', 'youtu.be'],
-    'twitter': ['twitter.com', 'x.com'],
-}
+# Códigos de salida en modo línea de comandos (sin menú)
+SALIDA_EXITO = 0            # todas las descargas terminaron bien
+SALIDA_FALLOS = 1           # al menos una descarga falló
+SALIDA_USO = 2              # argumentos, archivos o URLs no válidos
+SALIDA_DEPENDENCIAS = 3     # falta yt-dlp (o el backend elegido)
+SALIDA_INTERRUMPIDA = 130   # Ctrl-C
+
+
+class EmisorJSON:
+    """Escribe resultados como líneas JSON en un flujo (por defecto stdout)
+
+    Seguro entre hilos: los trabajadores paralelos emiten cada uno su línea.
+    """
+
+    def __init__(self, flujo=None):
+        self.flujo = flujo or sys.stdout
+        self._cerrojo = threading.Lock()
+
+    def emitir(self, datos):
+        linea = json.dumps(datos, ensure_ascii=False)
+        with self._cerrojo:
+            self.flujo.write(linea + "\n")
+            self.flujo.flush()
+
+
+def agregar_opciones_comunes(parser, salida_json=True):
+    """Opciones de línea de comandos compartidas por los scripts de descarga"""
+    grupo = parser.add_argument_group("motor de descarga")
+    grupo.add_argument("--backend", choices=BACKENDS_YTDLP,
+                       help="Cómo ejecutar yt-dlp (por defecto subproceso)")
+    grupo.add_argument("--carrera", action="store_true",
+                       help="Los métodos de respaldo compiten en paralelo")
+    grupo.add_argument("--sin-cache", action="store_true",
+                       help="No reutilizar extracciones guardadas")
+    grupo.add_argument("--sin-archivo", action="store_true",
+                       help="No consultar ni actualizar el índice de descargas")
+    grupo.add_argument("--sin-catalogo", action="store_true",
+                       help="No anotar metadatos en el catálogo (ver catalogo.py)")
+    grupo.add_argument("--orden-fijo", action="store_true",
+                       help="Probar los métodos de respaldo siempre en el mismo orden")
+    grupo.add_argument("--sin-autoajuste", action="store_true",
+                       help="No ajustar el tamaño de trozo ni los fragmentos por sitio")
+    from disposicion import DISPOSICIONES
+    grupo.add_argument("--disposicion", choices=sorted(DISPOSICIONES),
+                       help="Reparto en carpetas: plana (todo junto) o particionada "
+                            "(plataforma/id); se recuerda por carpeta")
+    grupo.add_argument("--almacen", action="store_true",
+                       help="Guardar cada video idéntico una sola vez (enlaces duros "
+                            "a ~/Descargas/.almacen)")
+    grupo.add_argument("--limite-banda", metavar="TASA",
+                       help="Ancho de banda total, p. ej. 500K o 4M")
+    grupo.add_argument("--ventana-estancamiento", type=float, metavar="SEG",
+                       help="Segundos sin avance antes de detener una descarga")
+    grupo.add_argument("--registro-eventos", metavar="ARCHIVO",
+                       help="Guardar los eventos de progreso en un archivo JSONL")
+    if salida_json:
+        grupo.add_argument("--json", action="store_true",
+                           help="Resultados en JSON por stdout (el resto va a stderr)")
+
+
+def aplicar_opciones_comunes(args):
+    """Aplica las opciones de agregar_opciones_comunes; devuelve el RegistroJSONL o None"""
+    configurar_ancho_banda(args.limite_banda)
+    if args.ventana_estancamiento is not None:
+        configurar_vigilancia(ventana_estancamiento=args.ventana_estancamiento)
+    if not args.registro_eventos:
+        return None
+    from eventos_progreso import RegistroJSONL
+    try:
+        return BUS_PROGRESO.suscribir(RegistroJSONL(args.registro_eventos))
+    except OSError as e:
+        raise ValidacionError(f"❌ No se puede escribir el registro de eventos: {e}")
+
+
+# Constantes útiles (las plataformas se definen en plataformas.py)
+SITIOS_POPULARES = REGISTRO_PLATAFORMAS.dominios_por_plataforma()
 
 
 def detectar_plataforma(url):
-    """Detecta la plataforma de una URL"""
-    url_lower = url.lower()
-    
-    for plataforma, dominios in SITIOS_POPULARES.items():
-        if any(dominio in url_lower for dominio in dominios):
-            return plataforma
-    
-    return 'generico'
+    """Detecta la plataforma de una URL por su host ('generico' si no se conoce)"""
+    return REGISTRO_PLATAFORMAS.clasificar(url)
 
 
 # Mensajes de ayuda reutilizables
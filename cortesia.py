@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+cortesia.py - Ritmo de peticiones por sitio con espera ante límites de tasa
+Todas las descargas (también las de trabajadores paralelos) piden turno al
+mismo limitador antes de lanzar yt-dlp. Cada sitio tiene su intervalo
+mínimo entre ejecuciones (ver intervalo_minimo en plataformas.py) y, si el
+sitio responde con 429 o avisa de "rate limit", se le da una pausa
+exponencial con jitter. Las esperas son por sitio: que Facebook pida calma
+no frena las descargas de YouTube.
+"""
+
+import random
+import re
+import threading
+import time
+
+from estadisticas_metodos import clave_dominio
+from plataformas import REGISTRO
+
+
+ESPERA_BASE = 5.0          # primera pausa tras un límite de tasa (segundos)
+ESPERA_MAXIMA = 300.0      # tope de la pausa exponencial
+AVISO_ESPERA = 1.0         # las esperas más largas se anuncian en pantalla
+
+# Señales de límite de tasa en la salida de yt-dlp
+_LIMITE_DE_TASA = re.compile(
+    r"HTTP Error 429|Too Many Requests|rate[- ]?limit",
+    re.IGNORECASE,
+)
+
+
+# Prefijos de los diagnósticos de yt-dlp; el resto de la salida (títulos,
+# descripciones, --print) puede contener cualquier texto
+_PREFIJOS_DIAGNOSTICO = ("ERROR:", "WARNING:")
+
+
+def es_limite_de_tasa(texto):
+    """True si el mensaje de error de yt-dlp indica que el sitio nos está limitando"""
+    return bool(texto) and _LIMITE_DE_TASA.search(texto) is not None
+
+
+def es_aviso_de_limite(linea):
+    """True si una línea de la salida de yt-dlp es un ERROR:/WARNING: de límite de tasa"""
+    return linea.lstrip().startswith(_PREFIJOS_DIAGNOSTICO) and es_limite_de_tasa(linea)
+
+
+class _EstadoSitio:
+    def __init__(self, intervalo):
+        self.intervalo = intervalo
+        self.proximo_turno = 0.0      # primer momento en que se puede lanzar otra
+        self.limites_seguidos = 0
+
+
+class LimitadorSitios:
+    """Turnos por sitio compartidos entre hilos
+
+    esperar_turno(url) bloquea al hilo hasta que le toca a ese sitio;
+    registrar_limite(url) alarga la espera del sitio de forma exponencial
+    con jitter (mitad fija, mitad al azar, para que los trabajadores no
+    vuelvan todos a la vez) y registrar_exito(url) la reinicia.
+    """
+
+    def __init__(self, espera_base=ESPERA_BASE, espera_maxima=ESPERA_MAXIMA,
+                 aleatorio=None, reloj=time.monotonic):
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.aleatorio = aleatorio or random.Random()
+        self.reloj = reloj
+        self._cerrojo = threading.Lock()
+        self._sitios = {}
+
+    def _estado(self, sitio):
+        estado = self._sitios.get(sitio)
+        if estado is None:
+            intervalo = REGISTRO.perfil(sitio).intervalo_minimo
+            estado = self._sitios[sitio] = _EstadoSitio(intervalo)
+        return estado
+
+    def reservar_turno(self, url):
+        """Reserva el siguiente turno del sitio y devuelve cuántos segundos faltan"""
+        sitio = clave_dominio(url)
+        with self._cerrojo:
+            estado = self._estado(sitio)
+            ahora = self.reloj()
+            turno = max(ahora, estado.proximo_turno)
+            # Tras un límite de tasa, los que esperaban no salen todos a la vez
+            intervalo = estado.intervalo
+            if estado.limites_seguidos:
+                intervalo = max(intervalo, self.espera_base)
+            estado.proximo_turno = turno + intervalo
+            return turno - ahora
+
+    def esperar_turno(self, url, cancelar=None):
+        """Espera al turno del sitio; devuelve False si se canceló mientras tanto"""
+        espera = self.reservar_turno(url)
+        if espera <= 0:
+            return True
+        if espera >= AVISO_ESPERA:
+            print(f"⏳ Esperando {espera:.0f}s para no saturar {clave_dominio(url)}...")
+        if cancelar is not None:
+            return not cancelar.wait(espera)
+        time.sleep(espera)
+        return True
+
+    def registrar_limite(self, url):
+        """El sitio pidió bajar el ritmo: devuelve la pausa aplicada"""
+        sitio = clave_dominio(url)
+        with self._cerrojo:
+            estado = self._estado(sitio)
+            estado.limites_seguidos += 1
+            tope = min(self.espera_maxima,
+                       self.espera_base * 2 ** (estado.limites_seguidos - 1))
+            pausa = tope / 2 + self.aleatorio.uniform(0, tope / 2)
+            estado.proximo_turno = max(estado.proximo_turno, self.reloj() + pausa)
+        print(f"🐢 {sitio} está limitando las peticiones: pausa de {pausa:.0f}s para ese sitio")
+        return pausa
+
+    def registrar_exito(self, url):
+        sitio = clave_dominio(url)
+        with self._cerrojo:
+            estado = self._sitios.get(sitio)
+            if estado is not None:
+                estado.limites_seguidos = 0
+
+
+LIMITADOR_SITIOS = LimitadorSitios()
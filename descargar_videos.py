@@ -5,7 +5,12 @@ Script mejorado para descargar videos de múltiples plataformas
 Optimizado especialmente para Facebook, Instagram, TikTok, YouTube y más
 """
 
+import argparse
+import os
 import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext, redirect_stdout
 from pathlib import Path
 
 # Importar módulo core con manejo de errores
@@ -15,49 +20,147 @@ try:
         validar_url,
         validar_archivo_cookies,
         crear_directorio_seguro,
-        leer_urls_de_archivo,
+        validar_archivo_existe,
         ejecutar_comando_ytdlp,
-        detectar_plataforma,
+        configurar_backend_ytdlp,
         mostrar_error_con_ayuda,
         confirmar_accion,
         pausar,
         formatear_titulo_seccion,
+        salida_capturada_actual,
+        evento_cancelacion_actual,
+        postproceso_diferido_hilo,
+        postproceso_diferido_actual,
+        agregar_opciones_comunes,
+        aplicar_opciones_comunes,
+        EmisorJSON,
+        SALIDA_EXITO,
+        SALIDA_FALLOS,
+        SALIDA_USO,
+        SALIDA_DEPENDENCIAS,
+        SALIDA_INTERRUMPIDA,
         ValidacionError,
         DependenciaError,
         AYUDA_COOKIES,
-        AYUDA_ERRORES_COMUNES
+        AYUDA_ERRORES_COMUNES,
+        REGISTRO_PLATAFORMAS
     )
 except ImportError:
     print("❌ Error: No se encuentra el módulo 'core.py'")
     print("   Asegúrate de que core.py esté en el mismo directorio")
     sys.exit(1)
 
+from cache_extraccion import CacheExtraccion
+from canonicalizar import canonicalizar
+from estadisticas_metodos import EstadisticasMetodos, clave_dominio
+from archivo_descargas import ArchivoDescargas
+from eventos_progreso import BUS_PROGRESO, AgregadorMetricas, formatear_bytes
+from ingesta_urls import ENTRADA_ESTANDAR, EstadisticasIngesta, iterar_urls
+from diario_lotes import (
+    DiarioLote,
+    MAX_INTENTOS_POR_DEFECTO,
+    PENDIENTE,
+    EN_CURSO,
+    HECHO,
+    FALLIDO,
+    abrir_para_reanudar as abrir_diario_para_reanudar,
+    crear as crear_diario,
+)
+
+
+# Fallidas que se listan en pantalla al final de una descarga masiva
+MAX_FALLIDOS_EN_PANTALLA = 50
+
+PLANTILLA_POR_DEFECTO = "%(title)s.%(ext)s"  # = disposicion.NOMBRE_POR_DEFECTO
+
 
 class DescargadorVideos:
-    def __init__(self):
+    def __init__(self, backend=None, usar_cache=True, modo_carrera=False,
+                 carrera_paralelo=3, retraso_cobertura=0.0, usar_archivo=True,
+                 aprender_orden=True, directorio=None, plantilla=None, autoajustar=True,
+                 procesos_postproceso=None, almacen=False, disposicion=None,
+                 usar_catalogo=True):
         try:
             self.directorio_descargas = crear_directorio_seguro(
-                Path.home() / "Descargas" / "Videos"
+                directorio or Path.home() / "Descargas" / "Videos"
             )
+            # Nombre de los archivos, relativo a la carpeta de cada video
+            self.plantilla = plantilla or PLANTILLA_POR_DEFECTO
+            # Carpetas dentro de la de descarga (ver disposicion.py)
+            from disposicion import resolver_disposicion
+            self.disposicion = resolver_disposicion(self.directorio_descargas, disposicion)
             self.archivo_cookies = None
+            # Metadatos de lo extraído y lo descargado, para consultas (catalogo.py)
+            self.catalogo = None
+            if usar_catalogo:
+                from catalogo import CatalogoMetadatos
+                self.catalogo = CatalogoMetadatos()
+            self.cache = CacheExtraccion(catalogo=self.catalogo) if usar_cache else None
+            # Índice de videos ya descargados (se consulta antes de la red)
+            self.archivo = ArchivoDescargas(catalogo=self.catalogo) if usar_archivo else None
+            # Éxitos y tiempos de cada método de respaldo, para ordenarlos
+            self.estadisticas = EstadisticasMetodos() if aprender_orden else None
+            # Tamaño de trozo y fragmentos simultáneos que mejor rinden por sitio
+            self.autoajuste = None
+            if autoajustar:
+                from autoajuste import AutoAjusteTransferencia
+                self.autoajuste = AutoAjusteTransferencia()
+            # Cada archivo idéntico guardado una vez, enlazado desde su nombre
+            self.almacen = None
+            if almacen:
+                from almacen_contenido import AlmacenContenido
+                self.almacen = AlmacenContenido()
+            # Postproceso (ffmpeg) en un pool de procesos aparte de las descargas;
+            # procesos_postproceso=0 lo deja dentro de cada descarga, como antes
+            self.tuberia = None
+            if procesos_postproceso != 0:
+                from postproceso import TuberiaPostproceso, admite_plantilla
+                if admite_plantilla(self.plantilla):
+                    self.tuberia = TuberiaPostproceso(
+                        procesos_postproceso,
+                        almacen=self.almacen.raiz if self.almacen is not None else None
+                    )
+            # Modo carrera: las estrategias de respaldo compiten en paralelo
+            self.modo_carrera = modo_carrera
+            self.carrera_paralelo = carrera_paralelo
+            self.retraso_cobertura = retraso_cobertura
+            if backend:
+                configurar_backend_ytdlp(backend)
             print(f"📁 Directorio de descargas: {self.directorio_descargas}")
         except ValidacionError as e:
             print(str(e))
-            sys.exit(1)
+            sys.exit(SALIDA_USO)
+        except DependenciaError as e:
+            print(str(e))
+            sys.exit(SALIDA_DEPENDENCIAS)
     
-    def obtener_opciones_base(self):
-        """Opciones base optimizadas para todas las plataformas"""
+    def plantilla_salida(self, url, directorio=None):
+        """Plantilla de nombre de archivo para yt-dlp (-o) según la disposición"""
+        from disposicion import construir_plantilla
+        return construir_plantilla(directorio or self.directorio_descargas,
+                                   canonicalizar(url)[0], self.disposicion, self.plantilla)
+    
+    def obtener_opciones_base(self, url, directorio=None, crudo=None):
+        """Opciones base optimizadas para todas las plataformas
+        
+        Con crudo (carpeta de la tubería de postproceso) yt-dlp solo baja
+        los flujos y sus acompañantes; el postproceso se hace después.
+        """
         opciones = [
             "--no-warnings",
             "--no-check-certificate",
             "--prefer-free-formats",
-            "--add-metadata",
-            "--embed-thumbnail",
-            "--embed-subs",
-            "--sub-langs", "es,en",
-            "--convert-subs", "srt",
-            "-o", str(self.directorio_descargas / "%(title)s.%(ext)s"),
         ]
+        from postproceso import OPCIONES_POSTPROCESO, opciones_crudas
+        
+        if crudo is None:
+            postproceso = OPCIONES_POSTPROCESO
+            if self.almacen is not None:
+                # Título y URL incrustados harían distintas dos copias del mismo video
+                postproceso = [o for o in postproceso if o != "--add-metadata"]
+            opciones += [*postproceso, "-o", self.plantilla_salida(url, directorio)]
+        else:
+            opciones += opciones_crudas(self.plantilla_salida(url, crudo))
         
         # Agregar cookies si existen
         if self.archivo_cookies and os.path.exists(self.archivo_cookies):
@@ -65,79 +168,108 @@ class DescargadorVideos:
         
         return opciones
     
-    def obtener_opciones_facebook(self):
-        """Opciones específicas optimizadas para Facebook"""
-        return [
-            "--user-agent", "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "--referer", "https://www.facebook.com/",
-            "--format", "best",
-            "--http-chunk-size", "10M",
-            "--retries", "10",
-            "--fragment-retries", "10",
-            "--extractor-args", "facebook:api_version=v13.0",
-        ]
+    def obtener_opciones_plataforma(self, plataforma, url=None):
+        """Opciones específicas de la plataforma (ver plataformas.py)
+        
+        Con url, el tamaño de trozo y los fragmentos simultáneos son los que
+        mejor han rendido en ese sitio (ver autoajuste.py).
+        """
+        opciones = list(REGISTRO_PLATAFORMAS.perfil(plataforma).opciones)
+        if url is None or self.autoajuste is None:
+            return opciones
+        from autoajuste import aplicar_configuracion, configuracion_de_opciones
+        return aplicar_configuracion(
+            opciones, self.autoajuste.mejor(url, configuracion_de_opciones(opciones))
+        )
     
-    def obtener_opciones_instagram(self):
-        """Opciones específicas para Instagram"""
-        return [
-            "--format", "best",
-            "--user-agent", "Mozilla/5.0 (iPhone; CPU iPhone OS 16_0 like Mac OS X) AppleWebKit/605.1.15",
-        ]
+    def _transferencia(self, url, opciones):
+        """Opciones de transferencia ajustadas al sitio (ver autoajuste.py)"""
+        if self.autoajuste is None:
+            return nullcontext(list(opciones))
+        from autoajuste import transferencia_ajustada
+        return transferencia_ajustada(self.autoajuste, url, opciones)
     
-    def obtener_opciones_tiktok(self):
-        """Opciones específicas para TikTok"""
-        return [
-            "--format", "best",
-            "--extractor-args", "tiktok:api_hostname=api16-normal-c-useast1a.tiktokv.com",
-        ]
+    @contextmanager
+    def objetivo(self, url, crudo=None):
+        """Destino de yt-dlp: info dict en caché si está fresco, si no la URL
+        
+        Si hay índice de descargas, también pide a yt-dlp que informe de lo
+        descargado para registrarlo al terminar. Con crudo (ver
+        obtener_opciones_base) el registro se hace al acabar el postproceso.
+        Lo mismo con el almacén por contenido.
+        """
+        destino = (self.cache.objetivo_ytdlp(url, directorio_info=crudo)
+                   if self.cache is not None else nullcontext([url]))
+        registro = (self.archivo.registro_ytdlp(url)
+                    if self.archivo is not None and crudo is None else nullcontext([]))
+        almacen = (self.almacen.registro_ytdlp()
+                   if self.almacen is not None and crudo is None else nullcontext([]))
+        with destino as argumentos_destino, registro as argumentos_registro, \
+                almacen as argumentos_almacen:
+            yield argumentos_registro + argumentos_almacen + argumentos_destino
     
-    def obtener_opciones_youtube(self):
-        """Opciones específicas para YouTube"""
-        return [
-            "--format", "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best",
-            "--merge-output-format", "mp4",
-        ]
+    def buscar_descargado(self, url):
+        """Devuelve la entrada del índice si la URL ya se descargó (sin red)"""
+        if self.archivo is None:
+            return None
+        entrada = self.archivo.buscar_url(url)
+        if entrada is None and self.cache is not None:
+            clave = self.cache.clave_de_url(url)
+            if clave:
+                entrada = self.archivo.buscar(*clave)
+        return entrada
     
     def descargar_video(self, url):
         """Descarga el video con opciones optimizadas según la plataforma"""
         try:
             # Validar URL
             url = validar_url(url)
-            plataforma = detectar_plataforma(url)
+            perfil = REGISTRO_PLATAFORMAS.perfil_de_url(url)
+            plataforma = perfil.nombre
             
             print(formatear_titulo_seccion(f"🎯 Plataforma: {plataforma.upper()}"))
             
-            # Construir comando
-            comando = ["yt-dlp"] + self.obtener_opciones_base()
+            descargado = self.buscar_descargado(url)
+            if descargado:
+                print(f"⏭️  Ya descargado: {descargado['ruta']}")
+                return True
             
-            # Agregar opciones específicas de plataforma
-            if plataforma == "facebook":
-                comando.extend(self.obtener_opciones_facebook())
-            elif plataforma == "instagram":
-                comando.extend(self.obtener_opciones_instagram())
-            elif plataforma == "tiktok":
-                comando.extend(self.obtener_opciones_tiktok())
-            elif plataforma == "youtube":
-                comando.extend(self.obtener_opciones_youtube())
+            if self.modo_carrera:
+                return self._descargar_en_carrera(url, perfil)
             
-            comando.append(url)
+            # Construir comando (con tubería, solo la parte de red)
+            crudo = None
+            if self.tuberia is not None:
+                crudo = self.tuberia.directorio_crudo(self.directorio_descargas, url)
+            comando = ["yt-dlp"] + self.obtener_opciones_base(url, crudo=crudo)
             
             # Intentar descarga
             print(f"\n📥 Descargando video...")
             print(f"📁 Guardando en: {self.directorio_descargas}")
             
-            exito, _ = ejecutar_comando_ytdlp(comando)
+            # Opciones de la plataforma, con la transferencia ajustada al sitio
+            inicio = time.monotonic()
+            with self._transferencia(url, perfil.opciones) as opciones, \
+                    self.objetivo(url, crudo) as objetivo:
+                if crudo is not None:
+                    from postproceso import opciones_por_separado
+                    opciones = opciones_por_separado(opciones)
+                exito, _ = ejecutar_comando_ytdlp(comando + opciones + objetivo)
             
+            if exito and crudo is not None:
+                self.tuberia.registrar_red(time.monotonic() - inicio)
+                return self._postprocesar(url, crudo)
             if exito:
                 print("\n✅ ¡Video descargado exitosamente!")
                 return True
             else:
                 # Intentar métodos alternativos
                 print("\n⚠️  Descarga falló, intentando métodos alternativos...")
-                if plataforma == "facebook":
-                    return self.intentar_descarga_facebook_alternativa(url)
-                else:
-                    return self.intentar_descarga_genérica(url)
+                exito = self.intentar_metodos_alternativos(url, perfil)
+                if exito and crudo is not None:
+                    import shutil
+                    shutil.rmtree(crudo, ignore_errors=True)
+                return exito
                     
         except ValidacionError as e:
             mostrar_error_con_ayuda(
@@ -160,6 +292,64 @@ class DescargadorVideos:
             )
             return False
     
+    def _postprocesar(self, url, crudo):
+        """Pasa la carpeta cruda a la tubería de postproceso
+        
+        Si el hilo difiere el postproceso (postproceso_diferido_hilo) vuelve
+        en cuanto está encolado y el resultado llega a su continuación; si
+        no, espera al resultado.
+        """
+        from concurrent.futures import wait
+        
+        print("\n📦 Descarga terminada, pasando al postproceso...")
+        diferido = postproceso_diferido_actual()
+        cancelar = evento_cancelacion_actual()
+        if diferido is None:
+            futuro = self.tuberia.enviar(crudo, self.directorio_descargas, cancelar)
+            if futuro is None:
+                return False
+            wait([futuro])
+            return bool(self.terminar_postproceso(url, futuro))
+        
+        continuar, diferidos = diferido
+        futuro = self.tuberia.enviar(
+            crudo, self.directorio_descargas, cancelar,
+            al_terminar=lambda f: continuar(self.terminar_postproceso(url, f))
+        )
+        if futuro is None:
+            return False
+        diferidos.append(futuro)
+        return True
+    
+    def terminar_postproceso(self, url, futuro):
+        """Registra el resultado de un postproceso
+        
+        Devuelve True/False, o None si se canceló (Ctrl-C) y debe repetirse.
+        """
+        from concurrent.futures.process import BrokenProcessPool
+        
+        if futuro.cancelled():
+            return None
+        error = futuro.exception()
+        if isinstance(error, BrokenProcessPool):
+            return None
+        if error is not None:
+            print(f"❌ Falló el postproceso de {url}: {error}")
+            return False
+        resultado = futuro.result()
+        for aviso in resultado['avisos']:
+            print(f"⚠️  {aviso}")
+        for video_id, ruta, url_pagina in resultado['archivos']:
+            print(f"✅ Listo: {Path(ruta).name}")
+            if self.archivo is not None and video_id:
+                self.archivo.registrar(canonicalizar(url_pagina or url)[0], video_id, ruta,
+                                       urls=(url, url_pagina))
+        for ruta, ahorrado in resultado.get('ahorrado', ()):
+            if ahorrado:
+                print(f"♻️  Copia idéntica ya guardada: {Path(ruta).name} "
+                      f"({formatear_bytes(ahorrado)} ahorrados)")
+        return True
+    
     def configurar_cookies_facebook(self):
         """Configura el archivo de cookies para Facebook"""
         print(formatear_titulo_seccion("🍪 CONFIGURACIÓN DE COOKIES"))
@@ -181,101 +371,199 @@ class DescargadorVideos:
             print("\n💡 Revisa GUIA_COOKIES.md para ayuda detallada")
             self.archivo_cookies = None
     
-    def intentar_descarga_facebook_alternativa(self, url):
-        """Intenta métodos alternativos para Facebook"""
-        print("\n🔄 Intentando métodos alternativos para Facebook...")
-        
-        metodos = [
-            ("Mejor calidad disponible", ["yt-dlp", "--format", "best"]),
-            ("Calidad media", ["yt-dlp", "--format", "worst"]),
-            ("HD 720p", ["yt-dlp", "--format", "bestvideo[height<=720]+bestaudio/best"]),
-        ]
+    def ordenar_metodos(self, url, metodos, nombre=lambda metodo: metodo[0]):
+        """Ordena los métodos de respaldo según lo que mejor funciona en el dominio"""
+        if self.estadisticas is None:
+            return list(metodos)
+        return self.estadisticas.ordenar(clave_dominio(url), metodos, nombre)
+    
+    def registrar_intento(self, url, metodo, exito, segundos):
+        """Anota el resultado de un método de respaldo en las estadísticas"""
+        if self.estadisticas is not None:
+            self.estadisticas.registrar(clave_dominio(url), metodo, exito, segundos)
+    
+    def intentar_metodos_alternativos(self, url, perfil):
+        """Prueba los métodos de respaldo de la plataforma, los más eficaces primero"""
+        metodos = self.ordenar_metodos(url, perfil.escalera)
+        if len(metodos) > 1:
+            print(f"\n🔄 Intentando métodos alternativos para {perfil.nombre.capitalize()}...")
         
-        for i, (nombre, comando_base) in enumerate(metodos, 1):
-            print(f"\n⏳ Método {i}/3: {nombre}...")
-            comando = comando_base + [
-                "-o", str(self.directorio_descargas / "%(title)s.%(ext)s"),
-                url
-            ]
+        for i, (nombre, argumentos) in enumerate(metodos, 1):
+            if len(metodos) > 1:
+                print(f"\n⏳ Método {i}/{len(metodos)}: {nombre}...")
+            else:
+                print("\n🔄 Intentando descarga simplificada...")
+            comando = ["yt-dlp", *argumentos, "-o", self.plantilla_salida(url)]
             
-            exito, _ = ejecutar_comando_ytdlp(comando)
+            inicio = time.monotonic()
+            with self.objetivo(url) as objetivo:
+                exito, _ = ejecutar_comando_ytdlp(comando + objetivo)
+            self.registrar_intento(url, nombre, exito, time.monotonic() - inicio)
             if exito:
                 print(f"✅ ¡Descarga exitosa con: {nombre}!")
                 return True
         
         mostrar_error_con_ayuda(
-            "No se pudo descargar con ningún método alternativo",
-            [
-                "Verifica que la URL sea correcta",
-                "Intenta configurar cookies (opción 3 del menú)",
-                "Lee GUIA_COOKIES.md si es un video privado",
-                "Prueba facebook_descargador.py para más opciones"
-            ]
+            "No se pudo descargar con ningún método alternativo" if len(metodos) > 1
+            else "No se pudo descargar el video",
+            perfil.ayuda_fallo
         )
         return False
     
-    def intentar_descarga_genérica(self, url):
-        """Intenta descarga genérica simplificada"""
-        print("\n🔄 Intentando descarga simplificada...")
-        
-        comando = [
-            "yt-dlp",
-            "--format", "best",
-            "-o", str(self.directorio_descargas / "%(title)s.%(ext)s"),
-            url
-        ]
+    def _descargar_en_carrera(self, url, perfil):
+        """Lanza la descarga principal y las de respaldo en paralelo
         
-        exito, _ = ejecutar_comando_ytdlp(comando)
+        Cada estrategia escribe en su propio directorio temporal; la primera
+        que termina se mueve a la carpeta de descargas y las demás se cancelan.
+        """
+        from carrera import Estrategia, correr_carrera
         
-        if exito:
-            print("✅ ¡Video descargado exitosamente!")
-            return True
-        else:
-            mostrar_error_con_ayuda(
-                "No se pudo descargar el video",
-                [
-                    "Actualiza yt-dlp (opción 4 del menú)",
-                    "Verifica que el video esté disponible",
-                    "Prueba con otra URL",
-                    "Lee README.md para más ayuda"
-                ]
+        constructores = [(
+            "Opciones optimizadas",
+            lambda d: (["yt-dlp"] + self.obtener_opciones_base(url, d)
+                       + self.obtener_opciones_plataforma(perfil.nombre, url))
+        )]
+        for nombre, argumentos in self.ordenar_metodos(url, perfil.escalera):
+            constructores.append(
+                (nombre, lambda d, a=argumentos: ["yt-dlp", *a, "-o", self.plantilla_salida(url, d)])
             )
-            return False
+        
+        respaldo = {nombre for nombre, _ in perfil.escalera}
+        
+        def al_terminar(nombre, exito, segundos):
+            # La descarga principal no forma parte de la escalera
+            if nombre in respaldo:
+                self.registrar_intento(url, nombre, exito, segundos)
+        
+        print(f"\n🏎️  Modo carrera: hasta {self.carrera_paralelo} estrategias en paralelo")
+        print(f"📁 Guardando en: {self.directorio_descargas}")
+        
+        with self.objetivo(url) as objetivo:
+            estrategias = [
+                Estrategia(nombre, lambda d, c=constructor: ejecutar_comando_ytdlp(c(d) + objetivo)[0])
+                for nombre, constructor in constructores
+            ]
+            ganador = correr_carrera(
+                estrategias,
+                self.directorio_descargas,
+                max_paralelo=self.carrera_paralelo,
+                retraso_cobertura=self.retraso_cobertura,
+                al_terminar=al_terminar
+            )
+        
+        if ganador:
+            print(f"\n✅ ¡Video descargado exitosamente con: {ganador}!")
+            return True
+        
+        mostrar_error_con_ayuda("No se pudo descargar con ninguna estrategia", perfil.ayuda_fallo)
+        return False
     
-    def descargar_multiples(self, archivo_urls):
-        """Descarga múltiples videos desde un archivo"""
+    def descargar_multiples(self, archivo_urls, trabajadores=1, limites_plataforma=None,
+                            reanudar=True, max_intentos=MAX_INTENTOS_POR_DEFECTO,
+                            interactivo=True, al_terminar_video=None):
+        """Descarga múltiples videos desde un archivo
+        
+        El archivo se lee en streaming (también .gz, o '-' para la entrada
+        estándar): la primera descarga empieza en cuanto aparece la primera
+        URL válida y la memoria no depende del tamaño de la lista.
+        
+        Con trabajadores > 1 las descargas se ejecutan en paralelo, con un
+        tope de descargas simultáneas por plataforma (ver motor_concurrente).
+        
+        El progreso se guarda en un diario (ver diario_lotes): si el lote se
+        interrumpe, la siguiente ejecución con el mismo archivo continúa
+        donde se quedó y reintenta las fallidas hasta max_intentos veces.
+        
+        Con interactivo=False no se pregunta nada al terminar. al_terminar_video
+        (url, exito) se llama tras cada video. Devuelve el resumen
+        {'total', 'exitosas', 'fallidas'} o None si el archivo no es válido.
+        """
         try:
-            urls = leer_urls_de_archivo(archivo_urls)
+            desde_stdin = archivo_urls == ENTRADA_ESTANDAR
+            if not desde_stdin:
+                validar_archivo_existe(archivo_urls, "archivo de URLs")
             
-            total = len(urls)
-            exitosos = 0
-            fallidos = []
+            diario = None
+            if reanudar and not desde_stdin:
+                diario = abrir_diario_para_reanudar(self.directorio_descargas, archivo_urls)
             
-            print(formatear_titulo_seccion(f"📋 DESCARGA MASIVA: {total} videos"))
+            if diario is not None:
+                conteo = diario.resumen()
+                print(f"♻️  Reanudando lote anterior: {conteo[HECHO]} hechas, "
+                      f"{conteo[PENDIENTE] + conteo[EN_CURSO]} pendientes, "
+                      f"{conteo[FALLIDO]} fallidas")
+            elif desde_stdin:
+                # La entrada estándar no se puede releer: diario solo en memoria
+                diario = DiarioLote(None)
+            else:
+                diario = crear_diario(self.directorio_descargas, archivo_urls)
             
-            for i, url in enumerate(urls, 1):
-                print(f"\n{'='*60}")
-                print(f"📹 Video {i}/{total}")
-                print(f"{'='*60}")
-                print(f"🔗 {url[:70]}..." if len(url) > 70 else f"🔗 {url}")
+            origen = "entrada estándar" if desde_stdin else Path(archivo_urls).name
+            print(formatear_titulo_seccion(f"📋 DESCARGA MASIVA: {origen}"))
+            
+            estadisticas = EstadisticasIngesta()
+            metricas = BUS_PROGRESO.suscribir(AgregadorMetricas())
+            try:
+                trabajos = self._trabajos_del_lote(diario, archivo_urls, estadisticas,
+                                                   max_intentos)
+                descargar = self._descarga_con_diario(diario, al_terminar_video)
                 
-                if self.descargar_video(url):
-                    exitosos += 1
+                if trabajadores > 1:
+                    self._descargar_en_paralelo(
+                        trabajos, None, trabajadores, limites_plataforma, descargar
+                    )
                 else:
-                    fallidos.append((i, url))
+                    for i, url in trabajos:
+                        self._mostrar_cabecera_video(i, None, url)
+                        descargar(url)
+                self.esperar_postproceso()
+            except BaseException:
+                # Lo que no llegó a postprocesarse queda "en_curso" en el diario
+                self.esperar_postproceso(cancelar=True)
+                raise
+            finally:
+                diario.cerrar()
+                BUS_PROGRESO.desuscribir(metricas)
+            
+            total = diario.total
+            if total == 0:
+                raise ValidacionError(
+                    "❌ No se encontraron URLs válidas en el archivo\n"
+                    "   Las URLs deben:\n"
+                    "   - Comenzar con http:// o https://\n"
+                    "   - No estar comentadas con #\n"
+                    "   - No estar vacías"
+                )
+            
+            exitosos = diario.resumen()[HECHO]
+            fallidos = [(e.indice, e.url) for e in diario.fallidas()]
+            if diario.ruta is not None and not diario.por_hacer(max_intentos):
+                # Lote terminado: la próxima ejecución empieza de cero
+                diario.ruta.unlink()
             
             # Resumen final
             print(formatear_titulo_seccion("📊 RESUMEN DE DESCARGAS"))
+            if estadisticas.lineas:
+                estadisticas.mostrar_resumen()
+            metricas.mostrar_resumen()
+            if self.tuberia is not None:
+                self.tuberia.mostrar_resumen()
             print(f"✅ Exitosas: {exitosos}/{total}")
             print(f"❌ Fallidas: {len(fallidos)}/{total}")
             
             if fallidos:
                 print("\n❌ Videos que fallaron:")
-                for num, url_fallida in fallidos:
+                for num, url_fallida in fallidos[:MAX_FALLIDOS_EN_PANTALLA]:
                     print(f"   {num}. {url_fallida[:60]}...")
+                if len(fallidos) > MAX_FALLIDOS_EN_PANTALLA:
+                    print(f"   ... y {len(fallidos) - MAX_FALLIDOS_EN_PANTALLA} más")
                 
-                if confirmar_accion("\n¿Guardar lista de URLs fallidas?"):
+                # Con stdin no queda entrada de la que leer la respuesta
+                if (interactivo and not desde_stdin
+                        and confirmar_accion("\n¿Guardar lista de URLs fallidas?")):
                     self._guardar_urls_fallidas(fallidos)
+            
+            return {'total': total, 'exitosas': exitosos, 'fallidas': len(fallidos)}
                     
         except ValidacionError as e:
             mostrar_error_con_ayuda(
@@ -286,6 +574,111 @@ class DescargadorVideos:
                     "Revisa ejemplo_urls.txt como referencia"
                 ]
             )
+            return None
+    
+    def esperar_postproceso(self, cancelar=False):
+        """Espera a los postprocesos encolados (o descarta los que no empezaron)"""
+        if self.tuberia is None:
+            return
+        if cancelar:
+            self.tuberia.cerrar(cancelar_pendientes=True)
+        self.tuberia.esperar()
+    
+    def _mostrar_cabecera_video(self, i, total, url):
+        """Muestra la cabecera de un video dentro de una descarga masiva"""
+        print(f"\n{'='*60}")
+        print(f"📹 Video {i}/{total}" if total else f"📹 Video {i}")
+        print(f"{'='*60}")
+        print(f"🔗 {url[:70]}..." if len(url) > 70 else f"🔗 {url}")
+    
+    def _descargar_en_paralelo(self, trabajos, total, trabajadores, limites_plataforma=None,
+                               descargar=None):
+        """Descarga los pares (índice, url) con un pool de trabajadores
+        
+        La salida de cada video se imprime completa al terminar, para que
+        no se mezcle con la de las descargas simultáneas.
+        """
+        from motor_concurrente import MotorDescargas
+        
+        print(f"⚡ Modo paralelo: {trabajadores} descargas simultáneas")
+        
+        exitosos = 0
+        fallidos = []
+        
+        def al_terminar(resultado):
+            nonlocal exitosos
+            self._mostrar_cabecera_video(resultado.indice, total, resultado.url)
+            print(resultado.salida, end="")
+            if resultado.error:
+                print(f"\n❌ Error inesperado: {resultado.error}")
+            if resultado.exito:
+                exitosos += 1
+            else:
+                fallidos.append((resultado.indice, resultado.url))
+        
+        motor = MotorDescargas(
+            descargar or self.descargar_video,
+            trabajadores=trabajadores,
+            limites_plataforma=limites_plataforma
+        )
+        motor.ejecutar_trabajos(trabajos, al_terminar=al_terminar, guardar_resultados=False)
+        
+        fallidos.sort()
+        return exitosos, fallidos
+    
+    def _trabajos_del_lote(self, diario, archivo_urls, estadisticas, max_intentos):
+        """Pares (índice, url) por descargar: primero lo pendiente del diario,
+        después las URLs que aún no se habían leído del archivo
+        
+        Si el diario ya tiene todo el archivo no se vuelve a abrir; si la
+        lectura quedó a medias, sigue desde la posición guardada.
+        """
+        for entrada in diario.por_hacer(max_intentos):
+            yield entrada.indice, entrada.url
+        if diario.cargado:
+            return
+        
+        for url in iterar_urls(archivo_urls, estadisticas, desde=diario.lectura):
+            entrada = diario.agregar(url, (estadisticas.posicion, estadisticas.lineas))
+            yield entrada.indice, url
+        diario.terminar_carga()
+    
+    def _descarga_con_diario(self, diario, al_terminar_video=None):
+        """Envuelve descargar_video para anotar cada intento en el diario
+        
+        Si el video pasa a la tubería de postproceso, el hueco de descarga
+        queda libre y el diario se actualiza cuando termina el postproceso.
+        """
+        def terminar(url, exito, error=None):
+            if exito is None:
+                return  # postproceso cancelado: sigue "en_curso"
+            diario.marcar(url, HECHO if exito else FALLIDO, None if exito else error)
+            if al_terminar_video is not None:
+                al_terminar_video(url, exito)
+        
+        def descargar(url):
+            diario.marcar(url, EN_CURSO)
+            continuar = lambda exito: terminar(url, exito, "Falló el postproceso")
+            try:
+                with postproceso_diferido_hilo(continuar) as diferidos:
+                    exito = self.descargar_video(url)
+            except Exception as e:
+                terminar(url, False, str(e))
+                raise
+            # Un Ctrl-C deja la URL "en_curso" y se reintenta al reanudar
+            if not diferidos:
+                terminar(url, exito, self._ultimo_error())
+            return exito
+        return descargar
+    
+    def _ultimo_error(self):
+        """Última línea de error de yt-dlp en la salida capturada del hilo, si la hay"""
+        buffer = salida_capturada_actual()
+        if buffer is not None:
+            for linea in reversed(buffer.getvalue().splitlines()):
+                if "ERROR" in linea:
+                    return linea.strip()
+        return "La descarga falló"
     
     def _guardar_urls_fallidas(self, fallidos):
         """Guarda las URLs que fallaron en un archivo"""
@@ -302,6 +695,17 @@ class DescargadorVideos:
         except Exception as e:
             print(f"\n⚠️  No se pudieron guardar URLs fallidas: {e}")
     
+    def pedir_trabajadores(self):
+        """Pregunta cuántas descargas simultáneas usar en modo masivo"""
+        respuesta = input("⚡ Descargas simultáneas (Enter = 1): ").strip()
+        if not respuesta:
+            return 1
+        try:
+            return max(1, min(int(respuesta), 16))
+        except ValueError:
+            print("⚠️  Número no válido, se usará 1 descarga a la vez")
+            return 1
+    
     def menu_principal(self):
         """Muestra el menú principal"""
         print(formatear_titulo_seccion("🎬 DESCARGADOR DE VIDEOS"))
@@ -400,7 +804,7 @@ class DescargadorVideos:
                     print("   Revisa ejemplo_urls.txt como referencia\n")
                     archivo = input("📄 Ruta del archivo con URLs: ").strip()
                     if archivo:
-                        self.descargar_multiples(archivo)
+                        self.descargar_multiples(archivo, self.pedir_trabajadores())
                     else:
                         print("⚠️  No ingresaste ninguna ruta")
                 
@@ -431,3 +835,233 @@ class DescargadorVideos:
                     break
                 else:
                     continue
+    
+    def ejecutar_objetivos(self, objetivos, trabajadores=1, reanudar=True,
+                           max_intentos=MAX_INTENTOS_POR_DEFECTO, emisor=None):
+        """Descarga sin preguntas: URLs sueltas, archivos de URLs o '-' (stdin)
+        
+        Con un EmisorJSON se emite una línea por video y un resumen final.
+        Devuelve el código de salida del proceso (SALIDA_*).
+        """
+        urls = [o for o in objetivos if o.startswith(('http://', 'https://'))]
+        archivos = [o for o in objetivos if o not in urls]
+        resumen = {'total': 0, 'exitosas': 0, 'fallidas': 0}
+        # anotar se llama desde los trabajadores y desde el pool de postproceso
+        cerrojo = threading.Lock()
+        codigo = SALIDA_EXITO
+        
+        def anotar(url, exito):
+            with cerrojo:
+                resumen['total'] += 1
+                resumen['exitosas' if exito else 'fallidas'] += 1
+            if emisor is not None:
+                entrada = self.buscar_descargado(url) if exito else None
+                emisor.emitir({
+                    'tipo': 'resultado',
+                    'url': url,
+                    'exito': bool(exito),
+                    'ruta': entrada['ruta'] if entrada else None,
+                })
+        
+        def descargar(url):
+            exito = False
+            diferidos = []
+            try:
+                with postproceso_diferido_hilo(lambda e: anotar(url, bool(e))) as diferidos:
+                    exito = self.descargar_video(url)
+                return exito
+            finally:
+                # Con postproceso pendiente, anota su continuación al terminar
+                if not diferidos:
+                    anotar(url, exito)
+        
+        try:
+            if len(urls) > 1 and trabajadores > 1:
+                self._descargar_en_paralelo(enumerate(urls, 1), len(urls), trabajadores,
+                                            descargar=descargar)
+            else:
+                for i, url in enumerate(urls, 1):
+                    if len(urls) > 1:
+                        self._mostrar_cabecera_video(i, len(urls), url)
+                    descargar(url)
+            self.esperar_postproceso()
+        except BaseException:
+            self.esperar_postproceso(cancelar=True)
+            raise
+        if urls and self.tuberia is not None:
+            self.tuberia.mostrar_resumen()
+        
+        for archivo in archivos:
+            resultado = self.descargar_multiples(
+                archivo, trabajadores, reanudar=reanudar, max_intentos=max_intentos,
+                interactivo=False, al_terminar_video=anotar
+            )
+            if resultado is None:
+                codigo = SALIDA_USO
+        
+        if codigo == SALIDA_EXITO and resumen['fallidas']:
+            codigo = SALIDA_FALLOS
+        if emisor is not None:
+            emisor.emitir(dict(resumen, tipo='resumen', codigo=codigo))
+        return codigo
+
+    
+    def sincronizar_listas(self, objetivos, trabajadores=1, parar_tras=None, emisor=None):
+        """Descarga solo las entradas nuevas de listas de reproducción o canales
+        
+        objetivos son URLs de listas o archivos con una por línea. Cada lista
+        se recorre en plano hasta dar con parar_tras entradas seguidas que ya
+        están en el índice de descargas (ver sincronizar.py); las nuevas se
+        descargan con ejecutar_objetivos. Devuelve el código de salida.
+        """
+        from sincronizar import PARAR_TRAS_CONOCIDAS, nuevas_entradas
+        
+        if self.archivo is None:
+            raise ValidacionError("❌ --sincronizar necesita el índice de descargas "
+                                  "(quita --sin-archivo)")
+        if parar_tras is None:
+            parar_tras = PARAR_TRAS_CONOCIDAS
+        
+        def es_conocida(url, video_id):
+            if self.buscar_descargado(url) is not None:
+                return True
+            plataforma, id_de_url, _ = canonicalizar(url)
+            return bool(video_id and id_de_url is None
+                        and self.archivo.buscar(plataforma, video_id))
+        
+        listas = []
+        for objetivo in objetivos:
+            if objetivo.startswith(('http://', 'https://')):
+                listas.append(objetivo)
+            else:
+                listas.extend(iterar_urls(objetivo))
+        
+        nuevas = {}
+        fallo_al_listar = False
+        for lista in listas:
+            print(formatear_titulo_seccion(f"🔄 Sincronizando {lista}"))
+            inicio = time.perf_counter()
+            try:
+                entradas, resumen = nuevas_entradas(lista, es_conocida, parar_tras,
+                                                    self.archivo_cookies)
+            except DependenciaError as e:
+                print(str(e))
+                return SALIDA_DEPENDENCIAS
+            except RuntimeError as e:
+                print(f"❌ No se pudo listar: {e}")
+                fallo_al_listar = True
+                continue
+            motivo = ("lista completa" if resumen['completa'] else
+                      f"parada tras {parar_tras} ya descargadas seguidas")
+            print(f"📋 {resumen['revisadas']} entradas revisadas en "
+                  f"{time.perf_counter() - inicio:.1f}s ({motivo}): "
+                  f"{len(entradas)} nuevas, {resumen['conocidas']} ya descargadas")
+            if emisor is not None:
+                emisor.emitir(dict(resumen, tipo='lista', url=lista, nuevas=len(entradas)))
+            # Los canales listan de lo más reciente a lo más antiguo: se descarga
+            # al revés, así una sincronización cortada a medias no deja lo que
+            # falta detrás de una racha de entradas ya descargadas
+            for url, _, _ in reversed(entradas):
+                nuevas.setdefault(url, None)
+        
+        codigo = self.ejecutar_objetivos(list(nuevas), trabajadores, emisor=emisor)
+        if fallo_al_listar and codigo == SALIDA_EXITO:
+            codigo = SALIDA_FALLOS
+        return codigo
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(
+        prog="descargar_videos.py",
+        description="Descarga videos de Facebook, Instagram, TikTok, YouTube y +1000 sitios. "
+                    "Sin argumentos abre el menú interactivo.",
+        epilog="Códigos de salida: 0 todo bien, 1 alguna descarga falló, "
+               "2 argumentos o archivos no válidos, 3 falta yt-dlp, 130 interrumpido.",
+    )
+    parser.add_argument("objetivos", nargs="*", metavar="URL|ARCHIVO",
+                        help="URLs, archivos con una URL por línea (.txt o .gz) "
+                             "o '-' para leerlas de la entrada estándar")
+    parser.add_argument("-j", "--trabajadores", type=int, default=1,
+                        help="Descargas simultáneas (por defecto 1)")
+    parser.add_argument("-d", "--directorio",
+                        help="Carpeta de descarga (por defecto ~/Descargas/Videos)")
+    parser.add_argument("-o", "--plantilla",
+                        help=f"Nombre de archivo de yt-dlp relativo a la carpeta del video "
+                             f"(por defecto {PLANTILLA_POR_DEFECTO.replace('%', '%%')})")
+    parser.add_argument("-c", "--cookies", help="Archivo de cookies (formato Netscape)")
+    parser.add_argument("--procesos-postproceso", type=int, metavar="N",
+                        help="Procesos para mezclar e incrustar con ffmpeg aparte de las "
+                             "descargas (por defecto, los núcleos; 0 = dentro de cada descarga)")
+    parser.add_argument("--max-intentos", type=int, default=MAX_INTENTOS_POR_DEFECTO,
+                        help="Intentos por URL al reanudar un lote")
+    parser.add_argument("--sin-reanudar", action="store_true",
+                        help="Empezar los lotes de cero aunque haya un diario anterior")
+    parser.add_argument("--sincronizar", action="store_true",
+                        help="Las URLs son listas o canales: descargar solo las entradas "
+                             "que no estén en el índice de descargas")
+    parser.add_argument("--parar-tras", type=int, metavar="N",
+                        help="Con --sincronizar, dejar de listar tras N entradas seguidas "
+                             "ya descargadas (por defecto 20; 0 = recorrer la lista entera)")
+    agregar_opciones_comunes(parser)
+    return parser
+
+
+def main(argv=None):
+    """Punto de entrada: menú interactivo sin argumentos, descarga directa con ellos"""
+    args = crear_parser().parse_args(argv)
+    if not args.objetivos:
+        DescargadorVideos().ejecutar()
+        return SALIDA_EXITO
+    
+    # Con --json, stdout queda solo para los resultados; lo demás va a stderr
+    emisor = EmisorJSON(sys.stdout) if args.json else None
+    with redirect_stdout(sys.stderr) if args.json else nullcontext():
+        registro = None
+        try:
+            if args.trabajadores < 1:
+                raise ValidacionError("❌ --trabajadores debe ser 1 o más")
+            if args.procesos_postproceso is not None and args.procesos_postproceso < 0:
+                raise ValidacionError("❌ --procesos-postproceso debe ser 0 o más")
+            if args.parar_tras is not None and args.parar_tras < 0:
+                raise ValidacionError("❌ --parar-tras debe ser 0 o más")
+            registro = aplicar_opciones_comunes(args)
+            archivo_cookies = validar_archivo_cookies(args.cookies) if args.cookies else None
+            if not verificar_dependencias(instalar=False):
+                return SALIDA_DEPENDENCIAS
+            descargador = DescargadorVideos(
+                backend=args.backend,
+                usar_cache=not args.sin_cache,
+                modo_carrera=args.carrera,
+                usar_archivo=not args.sin_archivo,
+                aprender_orden=not args.orden_fijo,
+                directorio=args.directorio,
+                plantilla=args.plantilla,
+                autoajustar=not args.sin_autoajuste,
+                procesos_postproceso=args.procesos_postproceso,
+                almacen=args.almacen,
+                disposicion=args.disposicion,
+                usar_catalogo=not args.sin_catalogo,
+            )
+            descargador.archivo_cookies = archivo_cookies
+            if args.sincronizar:
+                return descargador.sincronizar_listas(
+                    args.objetivos, args.trabajadores, args.parar_tras, emisor=emisor
+                )
+            return descargador.ejecutar_objetivos(
+                args.objetivos, args.trabajadores, reanudar=not args.sin_reanudar,
+                max_intentos=args.max_intentos, emisor=emisor
+            )
+        except ValidacionError as e:
+            print(str(e))
+            return SALIDA_USO
+        except KeyboardInterrupt:
+            print("\n\n⚠️  Operación cancelada por el usuario")
+            return SALIDA_INTERRUMPIDA
+        finally:
+            if registro is not None:
+                BUS_PROGRESO.desuscribir(registro)
+                registro.cerrar()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+diario_lotes.py - Diario de trabajos para descargas masivas reanudables
+Registra en un archivo de solo-añadir el estado de cada URL del lote, para
+poder continuar donde se quedó tras un cierre inesperado o un Ctrl-C
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+
+PENDIENTE = "pendiente"
+EN_CURSO = "en_curso"
+HECHO = "hecho"
+FALLIDO = "fallido"
+
+MAX_INTENTOS_POR_DEFECTO = 3
+
+
+class EntradaDiario:
+    """Estado de una URL dentro del lote"""
+
+    __slots__ = ("indice", "url", "estado", "intentos", "error")
+
+    def __init__(self, indice, url, estado=PENDIENTE, intentos=0, error=None):
+        self.indice = indice
+        self.url = url
+        self.estado = estado
+        self.intentos = intentos
+        self.error = error
+
+
+class DiarioLote:
+    """Diario JSONL de solo-añadir con fsync por lotes
+
+    Cada línea es un cambio de estado. Las escrituras se sincronizan con el
+    disco cada `lote_fsync` registros o cada `intervalo_fsync` segundos, así
+    el coste de fsync no crece con el número de URLs. Al reabrirlo se
+    reproduce el diario; una última línea a medias (corte de luz) se ignora.
+
+    Las URLs se añaden a medida que se leen (agregar) y en memoria solo se
+    guardan las que no han terminado bien; las hechas solo se cuentan.
+    Cada URL añadida guarda también hasta dónde se había leído el archivo
+    (lectura), para seguir leyendo desde ahí sin volver a empezar.
+    Con ruta=None el diario vive solo en memoria (p. ej. para stdin).
+    """
+
+    def __init__(self, ruta, lote_fsync=64, intervalo_fsync=1.0):
+        self.ruta = Path(ruta) if ruta is not None else None
+        self.lote_fsync = lote_fsync
+        self.intervalo_fsync = intervalo_fsync
+        self.cabecera = None
+        self.cargado = False
+        self.lectura = None   # (byte, líneas) leídos del archivo tras la última URL
+        self.total = 0
+        self.hechas = 0
+        self.entradas = {}
+        self._por_indice = {}
+        self._cerrojo = threading.Lock()
+        self._sin_sincronizar = 0
+        self._ultimo_fsync = time.monotonic()
+        self._archivo = None
+
+        if self.ruta is not None:
+            if self.ruta.exists():
+                self._reproducir()
+            self.ruta.parent.mkdir(parents=True, exist_ok=True)
+            self._archivo = open(self.ruta, 'a', encoding='utf-8')
+
+    def _reproducir(self):
+        with open(self.ruta, 'r', encoding='utf-8') as f:
+            for linea in f:
+                try:
+                    registro = json.loads(linea)
+                except ValueError:
+                    break  # línea truncada al final del diario
+                self._aplicar(registro)
+
+    def _aplicar(self, registro):
+        if "lote" in registro:
+            self.cabecera = registro
+        elif "cargado" in registro:
+            self.cargado = True
+        elif "u" in registro:
+            self._registrar_entrada(EntradaDiario(registro["i"], registro["u"]))
+            if "p" in registro:
+                self.lectura = tuple(registro["p"])
+        else:
+            entrada = self._por_indice.get(registro.get("i"))
+            if entrada is not None:
+                entrada.estado = registro["e"]
+                entrada.intentos = registro.get("n", entrada.intentos)
+                entrada.error = registro.get("err")
+                if entrada.estado == HECHO:
+                    self._olvidar(entrada)
+
+    def _registrar_entrada(self, entrada):
+        self.entradas[entrada.url] = entrada
+        self._por_indice[entrada.indice] = entrada
+        self.total = max(self.total, entrada.indice)
+
+    def _olvidar(self, entrada):
+        del self.entradas[entrada.url]
+        del self._por_indice[entrada.indice]
+        self.hechas += 1
+
+    def _escribir(self, registro, forzar_fsync=False):
+        if self._archivo is None:
+            return
+        self._archivo.write(json.dumps(registro, ensure_ascii=False, separators=(',', ':')) + "\n")
+        self._sin_sincronizar += 1
+        if (forzar_fsync or self._sin_sincronizar >= self.lote_fsync or
+                time.monotonic() - self._ultimo_fsync >= self.intervalo_fsync):
+            self._sincronizar()
+
+    def _sincronizar(self):
+        self._archivo.flush()
+        os.fsync(self._archivo.fileno())
+        self._sin_sincronizar = 0
+        self._ultimo_fsync = time.monotonic()
+
+    def iniciar(self, cabecera):
+        """Escribe la cabecera de un lote nuevo"""
+        with self._cerrojo:
+            self.cabecera = dict(cabecera, lote=1, creado=time.time())
+            self._escribir(self.cabecera, forzar_fsync=True)
+
+    def agregar(self, url, lectura=None):
+        """Añade una URL recién leída como pendiente y devuelve su entrada
+
+        lectura=(byte, líneas) es la posición del archivo tras esa URL.
+        """
+        with self._cerrojo:
+            entrada = EntradaDiario(self.total + 1, url)
+            self._registrar_entrada(entrada)
+            registro = {"i": entrada.indice, "u": url}
+            if lectura is not None:
+                self.lectura = tuple(lectura)
+                registro["p"] = list(lectura)
+            self._escribir(registro)
+            return entrada
+
+    def terminar_carga(self):
+        """Marca que todas las URLs del archivo ya están en el diario"""
+        with self._cerrojo:
+            self._escribir({"cargado": self.total}, forzar_fsync=True)
+            self.cargado = True
+
+    def marcar(self, url, estado, error=None):
+        """Registra un cambio de estado de una URL"""
+        with self._cerrojo:
+            entrada = self.entradas[url]
+            if estado == EN_CURSO:
+                entrada.intentos += 1
+            entrada.estado = estado
+            entrada.error = error
+            registro = {"i": entrada.indice, "e": estado, "n": entrada.intentos}
+            if error:
+                registro["err"] = error[:500]
+            self._escribir(registro)
+            if estado == HECHO:
+                self._olvidar(entrada)
+
+    def por_hacer(self, max_intentos=MAX_INTENTOS_POR_DEFECTO):
+        """URLs que faltan: pendientes, interrumpidas y fallidas con intentos restantes"""
+        trabajo = []
+        for entrada in sorted(self.entradas.values(), key=lambda e: e.indice):
+            if entrada.estado in (PENDIENTE, EN_CURSO):
+                trabajo.append(entrada)
+            elif entrada.estado == FALLIDO and entrada.intentos < max_intentos:
+                trabajo.append(entrada)
+        return trabajo
+
+    def fallidas(self):
+        """URLs que fallaron, ordenadas por índice"""
+        return sorted((e for e in self.entradas.values() if e.estado == FALLIDO),
+                      key=lambda e: e.indice)
+
+    def resumen(self):
+        """Cuenta las URLs por estado"""
+        conteo = {PENDIENTE: 0, EN_CURSO: 0, HECHO: self.hechas, FALLIDO: 0}
+        for entrada in self.entradas.values():
+            conteo[entrada.estado] = conteo.get(entrada.estado, 0) + 1
+        return conteo
+
+    def cerrar(self):
+        with self._cerrojo:
+            if self._archivo is not None and not self._archivo.closed:
+                self._sincronizar()
+                self._archivo.close()
+
+
+def ruta_diario(directorio, archivo_urls):
+    """Ruta del diario asociado a un archivo de URLs"""
+    import hashlib
+    absoluta = str(Path(archivo_urls).expanduser().absolute())
+    huella = hashlib.sha1(absoluta.encode('utf-8')).hexdigest()[:12]
+    return Path(directorio) / ".lotes" / f"{Path(archivo_urls).stem}-{huella}.jsonl"
+
+
+def huella_archivo(archivo_urls):
+    """Identifica la versión del archivo de URLs (tamaño y fecha de modificación)"""
+    datos = os.stat(Path(archivo_urls).expanduser())
+    return {"origen": str(Path(archivo_urls).expanduser().absolute()),
+            "tamano": datos.st_size, "mtime": datos.st_mtime}
+
+
+def abrir_para_reanudar(directorio, archivo_urls):
+    """Abre el diario de un lote si se puede reanudar; si no, devuelve None
+
+    Solo se reanuda si el archivo de URLs no cambió desde que se creó el
+    diario. Si la lectura del archivo quedó a medias, el lote continúa
+    leyendo desde diario.lectura; si terminó (diario.cargado), el archivo
+    no se vuelve a abrir.
+    """
+    ruta = ruta_diario(directorio, archivo_urls)
+    if not ruta.exists():
+        return None
+
+    diario = DiarioLote(ruta)
+    try:
+        huella = huella_archivo(archivo_urls)
+    except OSError:
+        huella = {}
+    cabecera = diario.cabecera or {}
+    if (huella and cabecera.get("tamano") == huella["tamano"] and
+            cabecera.get("mtime") == huella["mtime"]):
+        return diario
+
+    diario.cerrar()
+    ruta.unlink()
+    return None
+
+
+def crear(directorio, archivo_urls):
+    """Crea un diario nuevo para un lote (sustituye al anterior si existía)"""
+    ruta = ruta_diario(directorio, archivo_urls)
+    if ruta.exists():
+        ruta.unlink()
+    diario = DiarioLote(ruta)
+    diario.iniciar(huella_archivo(archivo_urls))
+    return diario
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+disposicion.py - Cómo se reparten los videos en la carpeta de descarga
+Con decenas de miles de archivos en una sola carpeta, listarla y comprobar
+si algo existe se vuelve lento, y dos videos con el mismo título se pisan.
+La disposición 'particionada' guarda cada video en
+<plataforma>/<2 últimos caracteres del id>/<id>/<título>.<ext>; 'plana'
+es la de siempre, todo en la carpeta.
+
+Todos los comandos de yt-dlp de los descargadores sacan su -o de
+construir_plantilla(), y cada carpeta recuerda su disposición en un archivo
+.disposicion. El índice id -> ruta es el de archivo_descargas.py.
+
+Uso como comando:
+    python disposicion.py migrar [directorio ...] [--a particionada] [--simular]
+"""
+
+import os
+import sys
+from pathlib import Path
+
+
+NOMBRE_POR_DEFECTO = "%(title)s.%(ext)s"
+
+# Carpetas dentro de la de descarga ({plataforma} la pone construir_plantilla).
+# Se parte por el final del id: en los ids numéricos (Facebook, TikTok) los
+# primeros caracteres apenas cambian y todo caería en la misma carpeta.
+DISPOSICIONES = {
+    'plana': "",
+    'particionada': "{plataforma}/%(id.-2:)s/%(id)s",
+}
+DISPOSICION_POR_DEFECTO = 'plana'
+
+ARCHIVO_DISPOSICION = ".disposicion"
+
+
+def construir_plantilla(directorio, plataforma, disposicion=DISPOSICION_POR_DEFECTO,
+                        nombre=NOMBRE_POR_DEFECTO):
+    """Plantilla -o de yt-dlp: carpeta + carpetas de la disposición + nombre"""
+    carpetas = DISPOSICIONES[disposicion].format(plataforma=plataforma.replace("%", "%%"))
+    return str(Path(directorio, carpetas, nombre))
+
+
+def _componente(texto):
+    """Como sanea yt-dlp un campo usado en una ruta (lo justo para ids)"""
+    return str(texto).replace(os.sep, "⧸").replace("/", "⧸") or "_"
+
+
+def ruta_en_disposicion(directorio, plataforma, video_id, nombre,
+                        disposicion=DISPOSICION_POR_DEFECTO):
+    """Ruta que tendría el archivo `nombre` del video con la disposición dada"""
+    if disposicion == 'plana':
+        return Path(directorio) / nombre
+    video_id = _componente(video_id)
+    return Path(directorio, _componente(plataforma), video_id[-2:], video_id, nombre)
+
+
+def leer_disposicion(directorio):
+    """Disposición guardada en la carpeta, o None si no tiene"""
+    try:
+        nombre = (Path(directorio) / ARCHIVO_DISPOSICION).read_text(encoding='utf-8').strip()
+    except OSError:
+        return None
+    return nombre if nombre in DISPOSICIONES else None
+
+
+def guardar_disposicion(directorio, disposicion):
+    (Path(directorio) / ARCHIVO_DISPOSICION).write_text(disposicion + "\n", encoding='utf-8')
+
+
+def resolver_disposicion(directorio, pedida=None):
+    """La disposición pedida (que queda guardada) o la que ya tenga la carpeta"""
+    actual = leer_disposicion(directorio)
+    if pedida is None:
+        return actual or DISPOSICION_POR_DEFECTO
+    if pedida != (actual or DISPOSICION_POR_DEFECTO):
+        print(f"⚠️  {directorio} pasa a disposición '{pedida}'; para mover lo ya "
+              f"descargado: python disposicion.py migrar {directorio} --a {pedida}")
+    if pedida != actual:
+        guardar_disposicion(directorio, pedida)
+    return pedida
+
+
+def _acompanantes_por_base(nombres):
+    """{nombre base: [acompañantes]} de los archivos de una carpeta
+
+    Acompañantes son lo que yt-dlp deja junto al video: <base>.info.json,
+    <base>.<miniatura>, <base>.<subtítulo> y <base>.<idioma>.<subtítulo>.
+    """
+    from postproceso import EXTENSION_INFO, EXTENSIONES_MINIATURA, EXTENSIONES_SUBTITULOS
+
+    por_base = {}
+    for nombre in nombres:
+        base, sufijo = os.path.splitext(nombre)
+        sufijo = sufijo.lower()
+        if nombre.endswith(EXTENSION_INFO):
+            bases = [nombre[:-len(EXTENSION_INFO)]]
+        elif sufijo in EXTENSIONES_MINIATURA:
+            bases = [base]
+        elif sufijo in EXTENSIONES_SUBTITULOS:
+            bases = [base, os.path.splitext(base)[0]]
+        else:
+            continue
+        for candidata in bases:
+            por_base.setdefault(candidata, []).append(nombre)
+    return por_base
+
+
+def _borrar_vacias(carpeta, hasta):
+    """Borra carpetas vacías de carpeta hacia arriba, sin pasar de `hasta`"""
+    while carpeta != hasta and hasta in carpeta.parents:
+        try:
+            carpeta.rmdir()
+        except OSError:
+            return
+        carpeta = carpeta.parent
+
+
+def migrar(directorio, disposicion, archivo, cache=None, simular=False):
+    """Mueve los videos de la carpeta (y sus acompañantes) a la disposición dada
+
+    El id y la plataforma salen del índice de descargas o, si el archivo no
+    está, de su .info.json o sus metadatos (ver identificar_archivo); los
+    que no se identifican se quedan donde están. Actualiza el índice.
+    Devuelve {'movidos', 'ya_estaban', 'sin_identificar', 'conflictos'}.
+    """
+    from archivo_descargas import EXTENSIONES_MEDIA, identificar_archivo
+
+    directorio = Path(directorio).expanduser().absolute()
+    por_ruta = archivo.entradas_por_ruta()
+    resumen = {'movidos': 0, 'ya_estaban': 0, 'sin_identificar': [], 'conflictos': []}
+    videos = []
+    acompanantes = {}
+    for raiz, carpetas, nombres in os.walk(directorio):
+        carpetas[:] = [c for c in carpetas if not c.startswith('.')]
+        videos += [Path(raiz) / n for n in nombres
+                   if Path(n).suffix.lower() in EXTENSIONES_MEDIA]
+        acompanantes[raiz] = _acompanantes_por_base(nombres)
+
+    for ruta in videos:
+        clave = por_ruta.get(str(ruta))
+        if clave is None:
+            identificado = identificar_archivo(ruta, cache)
+            clave = identificado[:2] if identificado else None
+        if clave is None:
+            resumen['sin_identificar'].append(ruta)
+            continue
+        plataforma, video_id = clave
+        nueva = ruta_en_disposicion(directorio, plataforma, video_id, ruta.name, disposicion)
+        if nueva == ruta:
+            resumen['ya_estaban'] += 1
+            continue
+        if nueva.exists():
+            resumen['conflictos'].append(ruta)
+            continue
+        resumen['movidos'] += 1
+        if simular:
+            continue
+        nueva.parent.mkdir(parents=True, exist_ok=True)
+        for nombre in acompanantes[str(ruta.parent)].get(ruta.stem, ()):
+            origen, destino = ruta.parent / nombre, nueva.parent / nombre
+            if origen.exists() and not destino.exists():
+                os.replace(origen, destino)
+        os.replace(ruta, nueva)
+        archivo.mover(plataforma, video_id, ruta, nueva)
+        _borrar_vacias(ruta.parent, directorio)
+
+    if not simular:
+        archivo.confirmar()
+        guardar_disposicion(directorio, disposicion)
+    return resumen
+
+
+def main(argv=None):
+    import argparse
+    import time
+
+    from archivo_descargas import ArchivoDescargas, directorios_por_defecto
+    from cache_extraccion import CacheExtraccion
+    from catalogo import CatalogoMetadatos
+    from core import formatear_titulo_seccion
+
+    parser = argparse.ArgumentParser(description="Disposición de las carpetas de descarga")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_migrar = sub.add_parser("migrar", help="Mueve lo descargado a otra disposición")
+    p_migrar.add_argument("directorios", nargs="*", help="Carpetas a migrar")
+    p_migrar.add_argument("--a", dest="disposicion", choices=sorted(DISPOSICIONES),
+                          default='particionada', help="Disposición de destino")
+    p_migrar.add_argument("--simular", action="store_true",
+                          help="Solo contar lo que se movería")
+    p_migrar.add_argument("--indice", help="Ruta del índice (por defecto ~/Descargas)")
+
+    args = parser.parse_args(argv)
+    catalogo = CatalogoMetadatos()
+    archivo = ArchivoDescargas(args.indice, catalogo=catalogo)
+    cache = CacheExtraccion(catalogo=catalogo)
+    print("⚠️  No migres una carpeta mientras se descarga en ella")
+
+    for directorio in args.directorios or directorios_por_defecto():
+        if not Path(directorio).expanduser().is_dir():
+            continue
+        print(formatear_titulo_seccion(f"📦 {directorio} → {args.disposicion}"))
+        inicio = time.perf_counter()
+        resumen = migrar(directorio, args.disposicion, archivo, cache, simular=args.simular)
+        verbo = "se moverían" if args.simular else "movidos"
+        print(f"✅ {resumen['movidos']} videos {verbo}, {resumen['ya_estaban']} ya estaban "
+              f"en su sitio ({time.perf_counter() - inicio:.1f}s)")
+        if resumen['conflictos']:
+            print(f"⚠️  {len(resumen['conflictos'])} no se movieron porque el destino ya existe:")
+            for ruta in resumen['conflictos'][:10]:
+                print(f"   {ruta}")
+        if resumen['sin_identificar']:
+            print(f"⚠️  {len(resumen['sin_identificar'])} sin identificar (se quedan donde están):")
+            for ruta in resumen['sin_identificar'][:10]:
+                print(f"   {ruta}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+estadisticas_metodos.py - Orden aprendido de los métodos de respaldo
+Registra, por dominio y método, cuántas veces funciona cada método y cuánto
+tarda, y reordena la escalera para probar primero lo que más probablemente
+funcione por segundo invertido
+"""
+
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from plataformas import GENERICO, REGISTRO
+
+
+# Las observaciones pierden la mitad de su peso cada VIDA_MEDIA segundos,
+# así lo que funcionó hace un mes pesa poco frente a lo de esta semana
+VIDA_MEDIA_POR_DEFECTO = 3 * 24 * 3600
+EXPLORACION_POR_DEFECTO = 0.1
+
+# Prior para métodos sin historial: 1 éxito en 2 intentos, 30 s por intento
+EXITOS_PREVIOS = 1.0
+INTENTOS_PREVIOS = 2.0
+SEGUNDOS_PREVIOS = 30.0
+
+
+def ruta_estadisticas_por_defecto():
+    """Estadísticas compartidas por descargar_videos.py y facebook_descargador.py"""
+    return Path.home() / "Descargas" / ".estadisticas_metodos.sqlite3"
+
+
+def clave_dominio(url):
+    """Dominio con el que se agrupan las estadísticas de una URL
+
+    Para las plataformas conocidas es su nombre (facebook, youtube...); para
+    el resto, el host, porque cada sitio genérico se comporta distinto.
+    """
+    perfil = REGISTRO.perfil_de_url(url)
+    if perfil.nombre != GENERICO:
+        return perfil.nombre
+    host = url.split('//', 1)[-1].split('/', 1)[0].rpartition('@')[2]
+    return host.split(':', 1)[0].lower() or GENERICO
+
+
+class EstadisticasMetodos:
+    """Contadores con decaimiento exponencial por (dominio, método)
+
+    Para probar una escalera de métodos hasta que uno funcione, el orden que
+    minimiza el tiempo esperado es el de mayor p/t primero (p = probabilidad
+    de éxito, t = tiempo medio de un intento). Con probabilidad
+    `exploracion` se adelanta un método al azar, para que un método que
+    dejó de fallar pueda recuperar su puesto.
+    """
+
+    def __init__(self, ruta=None, vida_media=VIDA_MEDIA_POR_DEFECTO,
+                 exploracion=EXPLORACION_POR_DEFECTO, aleatorio=None):
+        self.ruta = Path(ruta or ruta_estadisticas_por_defecto()).expanduser()
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        self.vida_media = vida_media
+        self.exploracion = exploracion
+        self.aleatorio = aleatorio or random.Random()
+        self._cerrojo = threading.Lock()
+        self._conexion = sqlite3.connect(str(self.ruta), check_same_thread=False, timeout=30)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("""
+            CREATE TABLE IF NOT EXISTS metodos (
+                dominio TEXT NOT NULL,
+                metodo TEXT NOT NULL,
+                exitos REAL NOT NULL,
+                intentos REAL NOT NULL,
+                segundos REAL NOT NULL,
+                actualizado REAL NOT NULL,
+                PRIMARY KEY (dominio, metodo)
+            ) WITHOUT ROWID
+        """)
+        self._conexion.commit()
+
+    def cerrar(self):
+        with self._cerrojo:
+            self._conexion.close()
+
+    def _factor(self, actualizado, ahora):
+        return 0.5 ** (max(0.0, ahora - actualizado) / self.vida_media)
+
+    def registrar(self, dominio, metodo, exito, segundos):
+        """Anota el resultado de un intento"""
+        ahora = time.time()
+        with self._cerrojo:
+            fila = self._conexion.execute(
+                "SELECT exitos, intentos, segundos, actualizado FROM metodos "
+                "WHERE dominio = ? AND metodo = ?", (dominio, metodo)
+            ).fetchone()
+            exitos = intentos = total_segundos = 0.0
+            if fila is not None:
+                factor = self._factor(fila[3], ahora)
+                exitos, intentos, total_segundos = (v * factor for v in fila[:3])
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO metodos VALUES (?, ?, ?, ?, ?, ?)",
+                (dominio, metodo, exitos + (1.0 if exito else 0.0), intentos + 1.0,
+                 total_segundos + max(0.0, segundos), ahora)
+            )
+            self._conexion.commit()
+
+    def puntuaciones(self, dominio):
+        """{método: (probabilidad de éxito, segundos por intento)} del dominio"""
+        ahora = time.time()
+        with self._cerrojo:
+            filas = self._conexion.execute(
+                "SELECT metodo, exitos, intentos, segundos, actualizado FROM metodos "
+                "WHERE dominio = ?", (dominio,)
+            ).fetchall()
+        puntuaciones = {}
+        for metodo, exitos, intentos, segundos, actualizado in filas:
+            factor = self._factor(actualizado, ahora)
+            exitos, intentos, segundos = exitos * factor, intentos * factor, segundos * factor
+            puntuaciones[metodo] = (
+                (exitos + EXITOS_PREVIOS) / (intentos + INTENTOS_PREVIOS),
+                (segundos + SEGUNDOS_PREVIOS) / (intentos + 1.0),
+            )
+        return puntuaciones
+
+    def ordenar(self, dominio, metodos, nombre=lambda metodo: metodo[0]):
+        """Devuelve los métodos ordenados por p/t (los empates respetan el orden dado)"""
+        metodos = list(metodos)
+        if len(metodos) < 2:
+            return metodos
+
+        puntuaciones = self.puntuaciones(dominio)
+        previa = (EXITOS_PREVIOS / INTENTOS_PREVIOS, SEGUNDOS_PREVIOS)
+
+        def valor(metodo):
+            p, t = puntuaciones.get(nombre(metodo), previa)
+            return p / max(t, 0.001)
+
+        ordenados = sorted(metodos, key=valor, reverse=True)
+        if self.aleatorio.random() < self.exploracion:
+            explorado = ordenados.pop(self.aleatorio.randrange(1, len(ordenados)))
+            ordenados.insert(0, explorado)
+        return ordenados
@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+eventos_progreso.py - Progreso de yt-dlp como eventos
+yt-dlp se ejecuta con una plantilla de progreso legible por máquina; cada
+línea se convierte en un evento (inicio, progreso, postproceso, fin, error)
+y se entrega a los suscriptores del bus: la consola, un registro JSONL, un
+agregador de métricas o cualquier función que reciba un evento.
+
+    from eventos_progreso import BUS_PROGRESO, RegistroJSONL
+
+    BUS_PROGRESO.suscribir(RegistroJSONL("descargas.jsonl"))
+"""
+
+import itertools
+import json
+import sys
+import threading
+import time
+
+
+INICIO = "inicio"
+PROGRESO = "progreso"
+POSTPROCESO = "postproceso"
+FIN = "fin"
+ERROR = "error"
+
+# Las líneas de la plantilla empiezan por una marca que yt-dlp nunca escribe
+MARCA_DESCARGA = "@@progreso"
+MARCA_POSTPROCESO = "@@postproceso"
+
+PLANTILLA_DESCARGA = (
+    f"download:{MARCA_DESCARGA} %(progress.status)s|%(progress.downloaded_bytes)s|"
+    "%(progress.total_bytes)s|%(progress.total_bytes_estimate)s|%(progress.speed)s|"
+    "%(progress.eta)s|%(info.id)s|%(progress.filename)s"
+)
+PLANTILLA_POSTPROCESO = (
+    f"postprocess:{MARCA_POSTPROCESO} %(progress.status)s|%(progress.postprocessor)s|%(info.id)s"
+)
+
+# Se añaden a cada comando de yt-dlp (ver core.ejecutar_comando_ytdlp)
+ARGUMENTOS_PROGRESO = (
+    "--newline",
+    "--progress-template", PLANTILLA_DESCARGA,
+    "--progress-template", PLANTILLA_POSTPROCESO,
+)
+
+_contador_trabajos = itertools.count(1)
+
+
+def nuevo_trabajo():
+    """Identificador único de una ejecución de yt-dlp dentro del proceso"""
+    return next(_contador_trabajos)
+
+
+def formatear_bytes(cantidad):
+    """1536000 -> '1.5 MB'"""
+    if cantidad is None:
+        return "?"
+    for unidad in ("B", "KB", "MB", "GB"):
+        if abs(cantidad) < 1024 or unidad == "GB":
+            return f"{cantidad:.0f} {unidad}" if unidad == "B" else f"{cantidad:.1f} {unidad}"
+        cantidad /= 1024
+
+
+def formatear_duracion(segundos):
+    """95 -> '01:35'"""
+    if segundos is None:
+        return "--:--"
+    minutos, segundos = divmod(int(segundos), 60)
+    horas, minutos = divmod(minutos, 60)
+    return f"{horas}:{minutos:02d}:{segundos:02d}" if horas else f"{minutos:02d}:{segundos:02d}"
+
+
+class Evento:
+    """Base de los eventos: tipo, trabajo (ejecución de yt-dlp) y momento"""
+
+    tipo = None
+
+    def __init__(self, trabajo, momento=None):
+        self.trabajo = trabajo
+        self.momento = time.time() if momento is None else momento
+
+    def a_dict(self):
+        datos = {"tipo": self.tipo}
+        datos.update(vars(self))
+        return datos
+
+    def __repr__(self):
+        campos = ", ".join(f"{k}={v!r}" for k, v in vars(self).items())
+        return f"{type(self).__name__}({campos})"
+
+
+class EventoInicio(Evento):
+    tipo = INICIO
+
+    def __init__(self, trabajo, url=None, momento=None):
+        super().__init__(trabajo, momento)
+        self.url = url
+
+
+class EventoProgreso(Evento):
+    """Bytes de un archivo: total es None si el servidor no lo informa"""
+
+    tipo = PROGRESO
+
+    def __init__(self, trabajo, estado, descargados, total=None, velocidad=None,
+                 eta=None, video_id=None, archivo=None, momento=None):
+        super().__init__(trabajo, momento)
+        self.estado = estado          # 'downloading' o 'finished'
+        self.descargados = descargados
+        self.total = total
+        self.velocidad = velocidad    # bytes/s
+        self.eta = eta                # segundos
+        self.video_id = video_id
+        self.archivo = archivo
+
+    @property
+    def porcentaje(self):
+        if not self.total:
+            return None
+        return min(100.0, 100.0 * self.descargados / self.total)
+
+
+class EventoPostproceso(Evento):
+    tipo = POSTPROCESO
+
+    def __init__(self, trabajo, estado, procesador, video_id=None, momento=None):
+        super().__init__(trabajo, momento)
+        self.estado = estado          # 'started', 'processing' o 'finished'
+        self.procesador = procesador
+        self.video_id = video_id
+
+
+class EventoFin(Evento):
+    """yt-dlp terminó bien; bytes es la suma de todos los archivos descargados"""
+
+    tipo = FIN
+
+    def __init__(self, trabajo, bytes_descargados, segundos, momento=None):
+        super().__init__(trabajo, momento)
+        self.bytes = bytes_descargados
+        self.segundos = segundos
+
+    @property
+    def velocidad_media(self):
+        return self.bytes / self.segundos if self.segundos > 0 else None
+
+
+class EventoError(Evento):
+    tipo = ERROR
+
+    def __init__(self, trabajo, mensaje, bytes_descargados=0, segundos=0.0, momento=None):
+        super().__init__(trabajo, momento)
+        self.mensaje = mensaje
+        self.bytes = bytes_descargados
+        self.segundos = segundos
+
+
+def _numero(texto, tipo=float):
+    if texto in ("NA", "None", ""):
+        return None
+    try:
+        return tipo(float(texto))
+    except ValueError:
+        return None
+
+
+class AnalizadorProgreso:
+    """Convierte la salida de una ejecución de yt-dlp en eventos, línea a línea
+
+    procesar_linea devuelve el evento de las líneas de la plantilla y None
+    para el resto (que se muestran tal cual). Además recuerda la última
+    línea de error y cuántos bytes se han descargado de cada archivo.
+    """
+
+    def __init__(self, trabajo=None, url=None):
+        self.trabajo = nuevo_trabajo() if trabajo is None else trabajo
+        self.url = url
+        self.inicio = time.monotonic()
+        self.ultimo_error = None
+        self._bytes_por_archivo = {}
+
+    @property
+    def bytes_descargados(self):
+        return sum(self._bytes_por_archivo.values())
+
+    @property
+    def segundos(self):
+        return time.monotonic() - self.inicio
+
+    def evento_inicio(self):
+        return EventoInicio(self.trabajo, self.url)
+
+    def evento_final(self, exito, mensaje=None):
+        """EventoFin si exito, si no EventoError con el mensaje o el último error visto"""
+        if exito:
+            return EventoFin(self.trabajo, self.bytes_descargados, self.segundos)
+        return EventoError(
+            self.trabajo, mensaje or self.ultimo_error or "yt-dlp terminó con error",
+            self.bytes_descargados, self.segundos
+        )
+
+    def procesar_linea(self, linea):
+        if linea.startswith(MARCA_DESCARGA):
+            campos = linea[len(MARCA_DESCARGA):].strip().split("|", 7)
+            if len(campos) == 8:
+                estado, descargados, total, estimado, velocidad, eta, video_id, archivo = campos
+                return self.procesar_estado({
+                    'status': estado,
+                    'downloaded_bytes': _numero(descargados, int),
+                    'total_bytes': _numero(total, int),
+                    'total_bytes_estimate': _numero(estimado, int),
+                    'speed': _numero(velocidad),
+                    'eta': _numero(eta, int),
+                    'filename': archivo,
+                }, video_id if video_id != "NA" else None)
+        elif linea.startswith(MARCA_POSTPROCESO):
+            campos = linea[len(MARCA_POSTPROCESO):].strip().split("|", 2)
+            if len(campos) == 3:
+                return EventoPostproceso(
+                    self.trabajo, campos[0], campos[1],
+                    campos[2] if campos[2] != "NA" else None
+                )
+        elif linea.startswith("ERROR:"):
+            self.ultimo_error = linea.strip()
+        return None
+
+    def procesar_estado(self, estado, video_id=None):
+        """Evento de un diccionario de progreso de yt-dlp (plantilla o progress_hooks)"""
+        if estado.get('status') not in ('downloading', 'finished'):
+            return None
+        archivo = estado.get('filename')
+        descargados = estado.get('downloaded_bytes') or 0
+        total = estado.get('total_bytes') or estado.get('total_bytes_estimate')
+        if estado['status'] == 'finished' and total is None:
+            total = descargados
+        self._bytes_por_archivo[archivo] = descargados
+        if video_id is None:
+            video_id = (estado.get('info_dict') or {}).get('id')
+        return EventoProgreso(
+            self.trabajo, estado['status'], descargados, total,
+            estado.get('speed'), estado.get('eta'), video_id, archivo
+        )
+
+
+class BusEventos:
+    """Lista de suscriptores: cualquier callable que reciba un evento
+
+    Los eventos se publican en el hilo que ejecuta yt-dlp, así lo que
+    imprime un suscriptor acaba en el buffer de ese trabajador. Un
+    suscriptor que lanza una excepción se da de baja en lugar de romper
+    la descarga.
+    """
+
+    def __init__(self):
+        self._suscriptores = ()
+        self._cerrojo = threading.Lock()
+
+    def suscribir(self, suscriptor):
+        with self._cerrojo:
+            if suscriptor not in self._suscriptores:
+                self._suscriptores = self._suscriptores + (suscriptor,)
+        return suscriptor
+
+    def desuscribir(self, suscriptor):
+        with self._cerrojo:
+            self._suscriptores = tuple(s for s in self._suscriptores if s is not suscriptor)
+
+    def __contains__(self, suscriptor):
+        return suscriptor in self._suscriptores
+
+    def publicar(self, evento):
+        for suscriptor in self._suscriptores:
+            try:
+                suscriptor(evento)
+            except Exception as e:
+                self.desuscribir(suscriptor)
+                print(f"⚠️  Suscriptor de progreso desactivado por un error: {e}")
+
+
+class RenderizadorConsola:
+    """Muestra el progreso como hacía yt-dlp, pero a partir de los eventos
+
+    En una terminal reescribe una sola línea cada `intervalo` segundos; si
+    la salida va a un archivo o al buffer de un trabajador paralelo solo
+    escribe el resumen de cada archivo, para no llenarlos de líneas.
+    """
+
+    def __init__(self, intervalo=0.5):
+        self.intervalo = intervalo
+        self._ultimo = {}
+        self._linea_abierta = False
+
+    def _cerrar_linea(self):
+        if self._linea_abierta:
+            sys.stdout.write("\n")
+            self._linea_abierta = False
+
+    def __call__(self, evento):
+        if evento.tipo == PROGRESO:
+            self._progreso(evento)
+        elif evento.tipo == POSTPROCESO:
+            if evento.estado == 'started':
+                self._cerrar_linea()
+                print(f"   🔧 Postprocesando ({evento.procesador})...")
+        elif evento.tipo in (FIN, ERROR):
+            self._cerrar_linea()
+            self._ultimo.pop(evento.trabajo, None)
+            if evento.tipo == FIN and evento.bytes:
+                velocidad = evento.velocidad_media
+                ritmo = f" ({formatear_bytes(velocidad)}/s)" if velocidad else ""
+                print(f"   📶 {formatear_bytes(evento.bytes)} en {evento.segundos:.1f}s{ritmo}")
+
+    def _progreso(self, evento):
+        terminado = evento.estado == 'finished'
+        if terminado and not evento.descargados:
+            return   # ya estaba descargado
+        en_terminal = sys.stdout.isatty()
+        if not terminado:
+            if not en_terminal:
+                return
+            ahora = time.monotonic()
+            if ahora - self._ultimo.get(evento.trabajo, 0.0) < self.intervalo:
+                return
+            self._ultimo[evento.trabajo] = ahora
+
+        porcentaje = evento.porcentaje
+        texto = f"   ⬇️  {porcentaje:5.1f}% de {formatear_bytes(evento.total)}" \
+            if porcentaje is not None else f"   ⬇️  {formatear_bytes(evento.descargados)}"
+        if evento.velocidad:
+            texto += f" a {formatear_bytes(evento.velocidad)}/s"
+        if not terminado and evento.eta is not None:
+            texto += f", quedan {formatear_duracion(evento.eta)}"
+
+        if en_terminal:
+            sys.stdout.write(f"\r{texto:<60}")
+            self._linea_abierta = True
+            if terminado:
+                self._cerrar_linea()
+            sys.stdout.flush()
+        else:
+            print(texto)
+
+
+class RegistroJSONL:
+    """Escribe los eventos en un archivo JSONL (uno por línea)
+
+    Los de progreso se limitan a uno cada `intervalo_progreso` segundos por
+    trabajo; el resto se escribe siempre.
+    """
+
+    def __init__(self, ruta, intervalo_progreso=1.0):
+        self.ruta = ruta
+        self.intervalo_progreso = intervalo_progreso
+        self._archivo = open(ruta, 'a', encoding='utf-8')
+        self._cerrojo = threading.Lock()
+        self._ultimo = {}
+
+    def __call__(self, evento):
+        if evento.tipo == PROGRESO and evento.estado != 'finished':
+            ahora = time.monotonic()
+            if ahora - self._ultimo.get(evento.trabajo, float('-inf')) < self.intervalo_progreso:
+                return
+            self._ultimo[evento.trabajo] = ahora
+        elif evento.tipo in (FIN, ERROR):
+            self._ultimo.pop(evento.trabajo, None)
+
+        linea = json.dumps(evento.a_dict(), ensure_ascii=False)
+        with self._cerrojo:
+            self._archivo.write(linea + "\n")
+            self._archivo.flush()
+
+    def cerrar(self):
+        with self._cerrojo:
+            self._archivo.close()
+
+
+class AgregadorMetricas:
+    """Bytes, velocidad y trabajos de todas las descargas (seguro entre hilos)"""
+
+    def __init__(self):
+        self._cerrojo = threading.Lock()
+        self._activos = {}     # trabajo -> {archivo: (bytes, velocidad)}
+        self.bytes = 0         # de los trabajos ya terminados
+        self.terminados = 0
+        self.fallidos = 0
+        self.segundos = 0.0    # suma de la duración de los trabajos terminados
+        self.inicio = None
+
+    def __call__(self, evento):
+        with self._cerrojo:
+            if self.inicio is None:
+                self.inicio = time.monotonic()
+            if evento.tipo == INICIO:
+                self._activos[evento.trabajo] = {}
+            elif evento.tipo == PROGRESO:
+                archivos = self._activos.setdefault(evento.trabajo, {})
+                velocidad = evento.velocidad if evento.estado == 'downloading' else None
+                archivos[evento.archivo] = (evento.descargados, velocidad)
+            elif evento.tipo in (FIN, ERROR):
+                self._activos.pop(evento.trabajo, None)
+                self.bytes += evento.bytes
+                self.segundos += evento.segundos
+                if evento.tipo == FIN:
+                    self.terminados += 1
+                else:
+                    self.fallidos += 1
+
+    @property
+    def activos(self):
+        with self._cerrojo:
+            return len(self._activos)
+
+    def velocidad_actual(self):
+        """Suma de la velocidad instantánea de las descargas en curso (bytes/s)"""
+        with self._cerrojo:
+            return sum(v or 0.0 for archivos in self._activos.values()
+                       for _, v in archivos.values())
+
+    def bytes_totales(self):
+        """Bytes descargados, incluidos los de las descargas en curso"""
+        with self._cerrojo:
+            return self.bytes + sum(b for archivos in self._activos.values()
+                                    for b, _ in archivos.values())
+
+    def resumen(self):
+        transcurrido = time.monotonic() - self.inicio if self.inicio is not None else 0.0
+        total = self.bytes_totales()
+        return {
+            "bytes": total,
+            "terminados": self.terminados,
+            "fallidos": self.fallidos,
+            "activos": self.activos,
+            "segundos": transcurrido,
+            "velocidad_media": total / transcurrido if transcurrido > 0 else 0.0,
+            "velocidad_actual": self.velocidad_actual(),
+        }
+
+    def mostrar_resumen(self):
+        datos = self.resumen()
+        if datos["bytes"]:
+            print(f"📶 Descargado: {formatear_bytes(datos['bytes'])} en "
+                  f"{formatear_duracion(datos['segundos'])} "
+                  f"({formatear_bytes(datos['velocidad_media'])}/s de media)")
+
+
+BUS_PROGRESO = BusEventos()
+RENDERIZADOR_CONSOLA = BUS_PROGRESO.suscribir(RenderizadorConsola())
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+extraccion_masiva.py - Metadatos de miles de URLs sin descargar nada
+Lee un flujo de URLs (archivo, .gz o '-') y las extrae con varios hilos
+dentro de este mismo proceso: cada hilo conserva su yt_dlp.YoutubeDL, así
+los extractores se cargan una vez y no un intérprete nuevo por URL. Cada
+resultado sale como una línea JSON en cuanto termina, en el orden en que
+van acabando; los fallos también son una línea ({"url", "error"}) y no
+detienen el lote. Cada registro lleva "linea", su número de línea en la
+entrada: las líneas inválidas salen como {"indice", "linea", "entrada",
+"error"} y las URLs repetidas como {"indice", "linea", "url", "repetida"}
+(o se extraen de nuevo con --repetidas), así la salida cuadra línea a línea
+con la entrada. Solo las líneas vacías y los comentarios no generan nada.
+
+Con --campos solo se emiten las claves pedidas; los caminos con puntos
+entran en listas (formats.format_id da la lista de format_id).
+
+Uso como comando:
+    python extraccion_masiva.py urls.txt -j 8 > info.jsonl
+    cat urls.txt | python extraccion_masiva.py - --campos id,title,duration,formats.format_id
+"""
+
+import sys
+import threading
+import time
+
+from cortesia import LIMITADOR_SITIOS, es_limite_de_tasa
+from ytdlp_en_proceso import RegistroSilencioso, cargar_ytdlp, mensaje_de_error
+
+
+TRABAJADORES_POR_DEFECTO = 4
+
+
+def leer_campos(texto):
+    """'id, title,formats.format_id' -> ['id', 'title', 'formats.format_id']"""
+    return [campo.strip() for campo in texto.split(",") if campo.strip()]
+
+
+def _valor_en(valor, partes):
+    if not partes:
+        return valor
+    if isinstance(valor, list):
+        return [_valor_en(elemento, partes) for elemento in valor]
+    if isinstance(valor, dict):
+        return _valor_en(valor.get(partes[0]), partes[1:])
+    return None
+
+
+def proyectar(info, campos):
+    """Solo las claves pedidas del info dict; las que no existen quedan en None"""
+    return {campo: _valor_en(info, campo.split(".")) for campo in campos}
+
+
+def leer_entradas(archivo, estadisticas=None, repetidas=False):
+    """Genera (línea, texto, motivo) por cada línea con contenido, en orden
+
+    motivo es None para las URLs válidas y el motivo del descarte para las
+    inválidas y las repetidas (MOTIVO_REPETIDA). Con repetidas=True las
+    URLs repetidas se tratan como nuevas.
+    """
+    from ingesta_urls import EstadisticasIngesta, iterar_urls
+
+    if estadisticas is None:
+        estadisticas = EstadisticasIngesta()
+    descartadas = []
+
+    def al_descartar(linea, texto, motivo):
+        descartadas.append((linea, texto, motivo))
+
+    for url in iterar_urls(archivo, estadisticas, deduplicar=not repetidas,
+                           al_descartar=al_descartar):
+        yield from descartadas
+        descartadas.clear()
+        yield estadisticas.lineas, url, None
+    yield from descartadas
+
+
+class ExtractorMasivo:
+    """Extrae info dicts con un YoutubeDL caliente por hilo
+
+    La caché de extracciones se consulta antes de tocar la red (basta con
+    los metadatos, las URLs firmadas pueden haber caducado) y cada
+    extracción nueva se guarda en ella y, a través de ella, en el catálogo.
+    """
+
+    def __init__(self, archivo_cookies=None, cache=None, catalogo=None):
+        self.yt_dlp = cargar_ytdlp()
+        self.cache = cache
+        self.catalogo = catalogo
+        self.params = {
+            'quiet': True,
+            'no_warnings': True,
+            'noprogress': True,
+            'skip_download': True,
+            # Una lista de reproducción es un registro con sus entradas sin extraer
+            'extract_flat': 'in_playlist',
+            'socket_timeout': 20,
+            'logger': RegistroSilencioso(),
+        }
+        if archivo_cookies:
+            self.params['cookiefile'] = archivo_cookies
+        self._locales = threading.local()
+        self._instancias = []
+        self._cerrojo = threading.Lock()
+
+    def _ydl(self):
+        ydl = getattr(self._locales, 'ydl', None)
+        if ydl is None:
+            ydl = self.yt_dlp.YoutubeDL(dict(self.params))
+            self._locales.ydl = ydl
+            with self._cerrojo:
+                self._instancias.append(ydl)
+        return ydl
+
+    def extraer(self, url):
+        """Info dict de la URL (serializable a JSON); lanza excepción si falla"""
+        if self.cache is not None:
+            info = self.cache.buscar(url, requiere_urls=False)
+            if info is not None:
+                return info
+
+        LIMITADOR_SITIOS.esperar_turno(url)
+        ydl = self._ydl()
+        try:
+            info = ydl.sanitize_info(ydl.extract_info(url, download=False))
+        except self.yt_dlp.utils.YoutubeDLError as e:
+            mensaje = mensaje_de_error(e)
+            if es_limite_de_tasa(mensaje):
+                LIMITADOR_SITIOS.registrar_limite(url)
+            raise RuntimeError(mensaje) from None
+        LIMITADOR_SITIOS.registrar_exito(url)
+
+        if self.cache is not None:
+            self.cache.guardar(url, info)
+        elif self.catalogo is not None:
+            self.catalogo.registrar_info(url, info)
+        return info
+
+    def ejecutar(self, entradas, emisor, trabajadores=TRABAJADORES_POR_DEFECTO, campos=None):
+        """Extrae las URLs de `entradas` (tuplas de leer_entradas, se consumen
+        poco a poco) y emite una línea por entrada
+
+        Las inválidas y las repetidas se emiten al leerlas; las URLs, al
+        terminar su extracción. Devuelve el resumen {'total', 'exitosas',
+        'fallidas', 'ignoradas', 'repetidas'}.
+        """
+        from ingesta_urls import MOTIVO_REPETIDA
+        from motor_concurrente import MotorDescargas
+
+        resumen = {'total': 0, 'exitosas': 0, 'fallidas': 0, 'ignoradas': 0, 'repetidas': 0}
+        lineas = {}
+
+        def trabajos():
+            for indice, (linea, texto, motivo) in enumerate(entradas, 1):
+                if motivo is None:
+                    lineas[indice] = linea
+                    yield indice, texto
+                    continue
+                registro = {'indice': indice, 'linea': linea}
+                if motivo == MOTIVO_REPETIDA:
+                    resumen['repetidas'] += 1
+                    registro.update(url=texto, repetida=True)
+                else:
+                    resumen['ignoradas'] += 1
+                    registro.update(entrada=texto, error=motivo)
+                emisor.emitir(registro)
+
+        def al_terminar(resultado):
+            resumen['total'] += 1
+            registro = {'indice': resultado.indice, 'linea': lineas.pop(resultado.indice),
+                        'url': resultado.url}
+            if resultado.exito:
+                resumen['exitosas'] += 1
+                info = resultado.valor
+                registro.update(proyectar(info, campos) if campos else info)
+            else:
+                resumen['fallidas'] += 1
+                registro['error'] = resultado.error or "Sin información"
+            emisor.emitir(registro)
+
+        motor = MotorDescargas(self.extraer, trabajadores=trabajadores)
+        try:
+            motor.ejecutar_trabajos(trabajos(), al_terminar=al_terminar,
+                                    guardar_resultados=False)
+        finally:
+            for ydl in self._instancias:
+                ydl.close()
+        return resumen
+
+
+def main(argv=None):
+    import argparse
+    from contextlib import redirect_stdout
+
+    from core import (
+        SALIDA_DEPENDENCIAS,
+        SALIDA_EXITO,
+        SALIDA_FALLOS,
+        SALIDA_INTERRUMPIDA,
+        SALIDA_USO,
+        DependenciaError,
+        EmisorJSON,
+        ValidacionError,
+        validar_archivo_cookies,
+    )
+    from ingesta_urls import EstadisticasIngesta
+
+    parser = argparse.ArgumentParser(
+        description="Metadatos de una lista de URLs en JSON Lines, sin descargar",
+        epilog="Códigos de salida: 0 todo bien, 1 alguna URL falló, "
+               "2 argumentos o archivos no válidos, 3 falta yt-dlp, 130 interrumpido.",
+    )
+    parser.add_argument("archivo", help="Archivo con una URL por línea (.txt o .gz) "
+                                        "o '-' para la entrada estándar")
+    parser.add_argument("-j", "--trabajadores", type=int, default=TRABAJADORES_POR_DEFECTO,
+                        help=f"Extracciones simultáneas (por defecto {TRABAJADORES_POR_DEFECTO})")
+    parser.add_argument("--campos", type=leer_campos, metavar="A,B.C",
+                        help="Solo estas claves del info dict (p. ej. id,title,formats.format_id)")
+    parser.add_argument("--repetidas", action="store_true",
+                        help="Extraer también las URLs repetidas en lugar de marcarlas")
+    parser.add_argument("-s", "--salida", help="Archivo JSONL (por defecto la salida estándar)")
+    parser.add_argument("-c", "--cookies", help="Archivo de cookies (formato Netscape)")
+    parser.add_argument("--sin-cache", action="store_true",
+                        help="No reutilizar ni guardar extracciones")
+    parser.add_argument("--sin-catalogo", action="store_true",
+                        help="No anotar metadatos en el catálogo (ver catalogo.py)")
+    args = parser.parse_args(argv)
+
+    flujo = open(args.salida, 'w', encoding='utf-8') if args.salida else sys.stdout
+    emisor = EmisorJSON(flujo)
+    # stdout queda solo para los registros; los avisos van a stderr
+    with redirect_stdout(sys.stderr):
+        try:
+            if args.trabajadores < 1:
+                raise ValidacionError("❌ --trabajadores debe ser 1 o más")
+            archivo_cookies = validar_archivo_cookies(args.cookies) if args.cookies else None
+            catalogo = cache = None
+            if not args.sin_catalogo:
+                from catalogo import CatalogoMetadatos
+                catalogo = CatalogoMetadatos()
+            if not args.sin_cache:
+                from cache_extraccion import CacheExtraccion
+                cache = CacheExtraccion(catalogo=catalogo)
+            extractor = ExtractorMasivo(archivo_cookies, cache=cache, catalogo=catalogo)
+
+            estadisticas = EstadisticasIngesta()
+            inicio = time.perf_counter()
+            entradas = leer_entradas(args.archivo, estadisticas, args.repetidas)
+            resumen = extractor.ejecutar(entradas, emisor, args.trabajadores, args.campos)
+            duracion = time.perf_counter() - inicio
+            estadisticas.mostrar_resumen()
+            print(f"✅ {resumen['exitosas']} extraídas, {resumen['fallidas']} con error "
+                  f"en {duracion:.1f}s ({resumen['total'] / max(duracion, 1e-9):.1f} URLs/s)")
+            return SALIDA_FALLOS if resumen['fallidas'] else SALIDA_EXITO
+        except DependenciaError as e:
+            print(str(e))
+            return SALIDA_DEPENDENCIAS
+        except ValidacionError as e:
+            print(str(e))
+            return SALIDA_USO
+        except KeyboardInterrupt:
+            print("\n\n⚠️  Operación cancelada por el usuario")
+            return SALIDA_INTERRUMPIDA
+        finally:
+            if args.salida:
+                flujo.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
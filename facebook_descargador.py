@@ -5,88 +5,185 @@ Script especializado para descargar videos de Facebook
 Incluye múltiples métodos y técnicas para manejar errores
 """
 
+import argparse
 import subprocess
 import sys
 import os
+import json
+import time
+from contextlib import nullcontext, redirect_stdout
 from pathlib import Path
 import re
 
+try:
+    from core import (
+        ejecutar_comando_ytdlp,
+        configurar_backend_ytdlp,
+        detectar_plataforma,
+        validar_archivo_cookies,
+        verificar_dependencias,
+        agregar_opciones_comunes,
+        aplicar_opciones_comunes,
+        EmisorJSON,
+        SALIDA_EXITO,
+        SALIDA_FALLOS,
+        SALIDA_USO,
+        SALIDA_DEPENDENCIAS,
+        SALIDA_INTERRUMPIDA,
+        ValidacionError,
+        DependenciaError,
+    )
+    from eventos_progreso import BUS_PROGRESO
+    from formatos import resolver_formato, id_formato
+    from canonicalizar import canonicalizar
+    from cache_extraccion import CacheExtraccion
+    from archivo_descargas import ArchivoDescargas
+    from estadisticas_metodos import EstadisticasMetodos, clave_dominio
+except ImportError:
+    print("❌ Error: No se encuentra el módulo 'core.py'")
+    print("   Asegúrate de que core.py esté en el mismo directorio")
+    sys.exit(1)
+
 class DescargadorFacebook:
-    def __init__(self):
+    def __init__(self, backend=None, usar_cache=True, modo_carrera=False,
+                 carrera_paralelo=3, retraso_cobertura=0.0, usar_archivo=True,
+                 aprender_orden=True, autoajustar=True, almacen=False, disposicion=None,
+                 usar_catalogo=True):
         self.directorio_descargas = Path.home() / "Descargas" / "Facebook_Videos"
         self.directorio_descargas.mkdir(parents=True, exist_ok=True)
+        # Carpetas dentro de la de descarga (ver disposicion.py)
+        from disposicion import resolver_disposicion
+        self.disposicion = resolver_disposicion(self.directorio_descargas, disposicion)
+        # Metadatos de lo extraído y lo descargado, para consultas (catalogo.py)
+        self.catalogo = None
+        if usar_catalogo:
+            from catalogo import CatalogoMetadatos
+            self.catalogo = CatalogoMetadatos()
+        self.cache = CacheExtraccion(catalogo=self.catalogo) if usar_cache else None
+        self.archivo = ArchivoDescargas(catalogo=self.catalogo) if usar_archivo else None
+        # Cada video idéntico (también entre plataformas) guardado una vez
+        self.almacen = None
+        if almacen:
+            from almacen_contenido import AlmacenContenido
+            self.almacen = AlmacenContenido()
+        # Éxitos y tiempos de cada método, para probar antes los que funcionan
+        self.estadisticas = EstadisticasMetodos() if aprender_orden else None
+        # Tamaño de trozo y fragmentos que mejor rinden (el método 3 parte de 10M)
+        self.autoajuste = None
+        if autoajustar:
+            from autoajuste import AutoAjusteTransferencia
+            self.autoajuste = AutoAjusteTransferencia()
+        # Modo carrera: los métodos 1-5 compiten en paralelo
+        self.modo_carrera = modo_carrera
+        self.carrera_paralelo = carrera_paralelo
+        self.retraso_cobertura = retraso_cobertura
+        if backend:
+            configurar_backend_ytdlp(backend)
+    
+    def _ordenar_metodos(self, url, metodos, nombre=lambda metodo: metodo[0]):
+        """Pone primero los métodos que mejor funcionan últimamente (ver estadisticas_metodos)"""
+        if self.estadisticas is None:
+            return metodos
+        return self.estadisticas.ordenar(clave_dominio(url), metodos, nombre)
+    
+    def _registrar_intento(self, url, metodo, exito, segundos):
+        if self.estadisticas is not None:
+            self.estadisticas.registrar(clave_dominio(url), metodo, exito, segundos)
+    
+    def _transferencia(self, url, opciones):
+        """Opciones de transferencia ajustadas al sitio (ver autoajuste.py)"""
+        if self.autoajuste is None:
+            return nullcontext(list(opciones))
+        from autoajuste import transferencia_ajustada
+        return transferencia_ajustada(self.autoajuste, url, opciones)
     
     def limpiar_url_facebook(self, url):
-        """Limpia y normaliza URLs de Facebook"""
-        # Eliminar parámetros innecesarios
-        url = re.sub(r'[?&](mibextid|app|source|paipv)=[^&]*', '', url)
-        
-        # Convertir fb.watch a URL completa
-        if 'fb.watch' in url:
-            video_id = url.split('/')[-1].split('?')[0]
-            url = f"https://www.facebook.com/watch/?v={video_id}"
-        
-        return url
+        """Limpia y normaliza URLs de Facebook (ver canonicalizar)"""
+        return canonicalizar(url)[2]
+    
+    def _plantilla(self, url, directorio=None):
+        """Plantilla de salida de yt-dlp en la carpeta indicada (o la de descargas)"""
+        from disposicion import construir_plantilla
+        return construir_plantilla(directorio or self.directorio_descargas,
+                                   canonicalizar(url)[0], self.disposicion)
     
-    def metodo_1_basico(self, url):
+    def _objetivo(self, url, info_json=None, registro=()):
+        """Destino del comando: el info dict ya extraído o la URL original
+
+        registro son los argumentos de registro en el índice y el almacén de
+        la descarga en curso; van por parámetro porque la misma instancia
+        atiende descargas simultáneas (carrera, lotes en paralelo).
+        """
+        if info_json:
+            return list(registro) + ["--load-info-json", str(info_json)]
+        return list(registro) + [url]
+    
+    def _formato(self, info, especificacion):
+        """Resuelve el formato localmente si hay info; si no, lo decide yt-dlp"""
+        if info is None:
+            return especificacion
+        elegidos = resolver_formato(info, especificacion)
+        return id_formato(elegidos) if elegidos else None
+    
+    def metodo_1_basico(self, url, info_json=None, info=None, directorio=None, registro=()):
         """Método 1: Descarga básica con mejor formato"""
         print("\n[Método 1] Descarga básica optimizada...")
+        formato = self._formato(info, "best")
+        if formato is None:
+            print("  Formato 'best' no disponible, omitiendo...")
+            return False
         comando = [
             "yt-dlp",
-            "--format", "best",
+            "--format", formato,
             "--no-warnings",
-            "-o", str(self.directorio_descargas / "%(title)s.%(ext)s"),
-            url
-        ]
+            "-o", self._plantilla(url, directorio),
+        ] + self._objetivo(url, info_json, registro)
         
-        try:
-            subprocess.run(comando, check=True, capture_output=False)
-            return True
-        except subprocess.CalledProcessError:
-            return False
+        exito, _ = ejecutar_comando_ytdlp(comando)
+        return exito
     
-    def metodo_2_con_headers(self, url):
+    def metodo_2_con_headers(self, url, info_json=None, info=None, directorio=None, registro=()):
         """Método 2: Con headers y user-agent específicos"""
         print("\n[Método 2] Con headers personalizados...")
+        formato = self._formato(info, "best")
+        if formato is None:
+            print("  Formato 'best' no disponible, omitiendo...")
+            return False
         comando = [
             "yt-dlp",
             "--user-agent", "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
             "--referer", "https://www.facebook.com/",
             "--add-header", "Accept-Language:es-ES,es;q=0.9,en;q=0.8",
             "--add-header", "Accept:text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-            "--format", "best",
+            "--format", formato,
             "--no-check-certificate",
-            "-o", str(self.directorio_descargas / "%(title)s.%(ext)s"),
-            url
-        ]
+            "-o", self._plantilla(url, directorio),
+        ] + self._objetivo(url, info_json, registro)
         
-        try:
-            subprocess.run(comando, check=True, capture_output=False)
-            return True
-        except subprocess.CalledProcessError:
-            return False
+        exito, _ = ejecutar_comando_ytdlp(comando)
+        return exito
     
-    def metodo_3_api_version(self, url):
+    def metodo_3_api_version(self, url, info_json=None, info=None, directorio=None, registro=()):
         """Método 3: Con versión específica de API"""
         print("\n[Método 3] Con configuración de API...")
-        comando = [
-            "yt-dlp",
+        formato = self._formato(info, "best")
+        if formato is None:
+            print("  Formato 'best' no disponible, omitiendo...")
+            return False
+        opciones = [
             "--extractor-args", "facebook:api_version=v13.0",
-            "--format", "best",
+            "--format", formato,
             "--http-chunk-size", "10M",
             "--retries", "15",
             "--fragment-retries", "15",
-            "-o", str(self.directorio_descargas / "%(title)s.%(ext)s"),
-            url
+            "-o", self._plantilla(url, directorio),
         ]
         
-        try:
-            subprocess.run(comando, check=True, capture_output=False)
-            return True
-        except subprocess.CalledProcessError:
-            return False
+        with self._transferencia(url, opciones) as opciones:
+            exito, _ = ejecutar_comando_ytdlp(["yt-dlp"] + opciones + self._objetivo(url, info_json, registro))
+        return exito
     
-    def metodo_4_formato_especifico(self, url):
+    def metodo_4_formato_especifico(self, url, info_json=None, info=None, directorio=None, registro=()):
         """Método 4: Probando diferentes formatos"""
         print("\n[Método 4] Probando formatos alternativos...")
         
@@ -97,105 +194,235 @@ class DescargadorFacebook:
             "mp4",
         ]
         
-        for formato in formatos:
+        probados = set()
+        for especificacion in formatos:
+            formato = self._formato(info, especificacion)
+            if formato is None:
+                print(f"  Formato no disponible: {especificacion}")
+                continue
+            if formato in probados:
+                # Otra especificación ya eligió este mismo formato
+                continue
+            probados.add(formato)
+            
             print(f"  Probando formato: {formato}")
             comando = [
                 "yt-dlp",
                 "--format", formato,
                 "--merge-output-format", "mp4",
-                "-o", str(self.directorio_descargas / "%(title)s.%(ext)s"),
-                url
-            ]
+                "-o", self._plantilla(url, directorio),
+            ] + self._objetivo(url, info_json, registro)
             
-            try:
-                subprocess.run(comando, check=True, capture_output=True)
+            exito, _ = ejecutar_comando_ytdlp(comando, capturar_salida=True)
+            if exito:
                 print(f"  ✓ Éxito con formato: {formato}")
                 return True
-            except subprocess.CalledProcessError:
-                continue
         
         return False
     
-    def metodo_5_cookies(self, url, archivo_cookies):
+    def metodo_5_cookies(self, url, archivo_cookies, info_json=None, info=None,
+                         directorio=None, registro=()):
         """Método 5: Con cookies de sesión"""
         if not archivo_cookies or not os.path.exists(archivo_cookies):
             print("\n[Método 5] Cookies no disponibles, omitiendo...")
             return False
         
         print("\n[Método 5] Usando cookies de sesión...")
+        formato = self._formato(info, "best")
+        if formato is None:
+            print("  Formato 'best' no disponible, omitiendo...")
+            return False
         comando = [
             "yt-dlp",
             "--cookies", archivo_cookies,
-            "--format", "best",
-            "-o", str(self.directorio_descargas / "%(title)s.%(ext)s"),
-            url
-        ]
+            "--format", formato,
+            "-o", self._plantilla(url, directorio),
+        ] + self._objetivo(url, info_json, registro)
         
-        try:
-            subprocess.run(comando, check=True, capture_output=False)
-            return True
-        except subprocess.CalledProcessError:
-            return False
+        exito, _ = ejecutar_comando_ytdlp(comando)
+        return exito
     
-    def metodo_6_extraccion_directa(self, url):
+    def metodo_6_extraccion_directa(self, url, info=None):
         """Método 6: Extracción directa sin descarga"""
         print("\n[Método 6] Obteniendo URL directa del video...")
-        comando = [
-            "yt-dlp",
-            "--get-url",
-            "--format", "best",
-            url
-        ]
         
-        try:
-            resultado = subprocess.run(comando, check=True, 
-                                     capture_output=True, text=True)
-            url_directa = resultado.stdout.strip()
-            
-            if url_directa:
-                print(f"\n✓ URL directa obtenida:")
-                print(f"  {url_directa}")
-                print("\nPuedes descargar directamente con wget o curl:")
-                print(f"  wget -O video.mp4 '{url_directa}'")
-                return True
-        except subprocess.CalledProcessError:
-            return False
+        if info is not None:
+            # La URL ya está en el info dict: no hace falta otra petición
+            elegidos = resolver_formato(info, "best")
+            url_directa = elegidos[0].get('url', '') if elegidos and len(elegidos) == 1 else ""
+        else:
+            comando = [
+                "yt-dlp",
+                "--get-url",
+                "--format", "best",
+                url
+            ]
+            exito, salida = ejecutar_comando_ytdlp(comando, capturar_salida=True)
+            url_directa = salida.strip() if exito and salida else ""
+        
+        if url_directa:
+            print(f"\n✓ URL directa obtenida:")
+            print(f"  {url_directa}")
+            print("\nPuedes descargar directamente con wget o curl:")
+            print(f"  wget -O video.mp4 '{url_directa}'")
+            return True
         
         return False
     
-    def descargar_con_todos_los_metodos(self, url):
-        """Intenta descargar usando todos los métodos disponibles"""
+    def extraer_info(self, url, archivo_cookies=None, requiere_urls=True):
+        """Extrae metadatos y formatos una sola vez por URL
+        
+        Primero se consulta la caché de extracciones; requiere_urls=False
+        acepta entradas cuyas URLs firmadas ya caducaron (solo información).
+        Si la extracción anónima falla y hay cookies, se reintenta con ellas
+        (videos privados). Devuelve el info dict o None.
+        """
+        if self.cache is not None:
+            info = self.cache.buscar(url, requiere_urls=requiere_urls)
+            if info is not None:
+                print("⚡ Información obtenida de la caché")
+                return info
+        
+        intentos = [[]]
+        if archivo_cookies and os.path.exists(archivo_cookies):
+            intentos.append(["--cookies", archivo_cookies])
+        
+        for opciones in intentos:
+            comando = ["yt-dlp", "--dump-json", "--no-warnings"] + opciones + [url]
+            exito, salida = ejecutar_comando_ytdlp(comando, capturar_salida=True)
+            if not exito or not salida:
+                continue
+            try:
+                info = json.loads(salida)
+            except ValueError:
+                continue
+            if self.cache is not None:
+                self.cache.guardar(url, info)
+            elif self.catalogo is not None:
+                self.catalogo.registrar_info(url, info)
+            return info
+        
+        return None
+    
+    def _guardar_info_temporal(self, info):
+        """Guarda el info dict para que yt-dlp lo cargue con --load-info-json"""
+        directorio = self.directorio_descargas / ".info"
+        directorio.mkdir(exist_ok=True)
+        nombre = re.sub(r'[^\w.-]', '_', str(info.get('id') or 'video'))
+        ruta = directorio / f"{nombre}.info.json"
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump(info, f)
+        return ruta
+    
+    def descargar_con_todos_los_metodos(self, url, archivo_cookies=None, preguntar_cookies=False):
+        """Intenta descargar usando todos los métodos disponibles
+        
+        La página se extrae una sola vez; los métodos solo reintentan la
+        transferencia del video a partir del info dict guardado. Solo se
+        pregunta por las cookies con preguntar_cookies=True (menú).
+        """
         url = self.limpiar_url_facebook(url)
         print(f"\n📎 URL limpia: {url}")
         print(f"📁 Carpeta de descarga: {self.directorio_descargas}")
         
+        descargado = self.archivo.buscar_url(url) if self.archivo is not None else None
+        if descargado:
+            print(f"\n⏭️  Ya descargado: {descargado['ruta']}")
+            return True
+        
         # Preguntar por cookies
-        archivo_cookies = None
-        usar_cookies = input("\n¿Tienes un archivo de cookies de Facebook? (s/n): ").lower()
-        if usar_cookies == 's':
-            archivo_cookies = input("Ruta del archivo de cookies: ").strip()
+        if preguntar_cookies and archivo_cookies is None:
+            usar_cookies = input("\n¿Tienes un archivo de cookies de Facebook? (s/n): ").lower()
+            if usar_cookies == 's':
+                archivo_cookies = input("Ruta del archivo de cookies: ").strip()
+        
+        if self.archivo is None and self.almacen is None:
+            return self._descargar_con_metodos(url, archivo_cookies)
+        
+        # Lo que descarguen los métodos queda registrado en el índice y el almacén
+        registro_indice = (self.archivo.registro_ytdlp(url)
+                           if self.archivo is not None else nullcontext([]))
+        registro_almacen = (self.almacen.registro_ytdlp()
+                            if self.almacen is not None else nullcontext([]))
+        with registro_indice as indice, registro_almacen as almacen:
+            return self._descargar_con_metodos(url, archivo_cookies, indice + almacen)
+    
+    def _descargar_con_metodos(self, url, archivo_cookies, registro=()):
+        """Extrae la información y recorre la escalera de métodos"""
+        print("\n🔍 Extrayendo información del video...")
+        info = self.extraer_info(url, archivo_cookies)
+        if info is None:
+            print("\n" + "="*60)
+            print("❌ No se pudo extraer el video")
+            print("="*60)
+            print("\n💡 Sugerencias:")
+            print("  1. Verifica que la URL sea correcta y el video esté disponible")
+            print("  2. Si es privado, usa un archivo de cookies de tu navegador")
+            print("  3. Actualiza yt-dlp: pip install --upgrade yt-dlp")
+            return False
+        
+        if self.archivo is not None and info.get('id'):
+            plataforma = detectar_plataforma(info.get('webpage_url') or url)
+            descargado = self.archivo.buscar(plataforma, info['id'])
+            if descargado:
+                print(f"\n⏭️  Ya descargado: {descargado['ruta']}")
+                return True
+        
+        info_json = self._guardar_info_temporal(info)
+        
+        if self.modo_carrera:
+            try:
+                return self._descargar_en_carrera(url, info_json, info, archivo_cookies,
+                                                  registro)
+            finally:
+                try:
+                    info_json.unlink()
+                except OSError:
+                    pass
         
         metodos = [
-            ("Básico", lambda: self.metodo_1_basico(url)),
-            ("Headers personalizados", lambda: self.metodo_2_con_headers(url)),
-            ("API configurada", lambda: self.metodo_3_api_version(url)),
-            ("Formatos alternativos", lambda: self.metodo_4_formato_especifico(url)),
-            ("Con cookies", lambda: self.metodo_5_cookies(url, archivo_cookies)),
-            ("Extracción URL directa", lambda: self.metodo_6_extraccion_directa(url)),
+            ("Básico", lambda: self.metodo_1_basico(url, info_json, info, registro=registro)),
+            ("Headers personalizados",
+             lambda: self.metodo_2_con_headers(url, info_json, info, registro=registro)),
+            ("API configurada",
+             lambda: self.metodo_3_api_version(url, info_json, info, registro=registro)),
+            ("Formatos alternativos",
+             lambda: self.metodo_4_formato_especifico(url, info_json, info, registro=registro)),
         ]
+        if archivo_cookies and os.path.exists(archivo_cookies):
+            metodos.append(
+                ("Con cookies", lambda: self.metodo_5_cookies(url, archivo_cookies, info_json,
+                                                              info, registro=registro))
+            )
+        metodos = self._ordenar_metodos(url, metodos)
         
         print("\n" + "="*60)
         print("🚀 Iniciando descarga con múltiples métodos...")
         print("="*60)
         
-        for nombre, metodo in metodos:
-            try:
-                if metodo():
+        try:
+            for nombre, metodo in metodos:
+                inicio = time.monotonic()
+                try:
+                    exito = metodo()
+                except Exception as e:
+                    print(f"❌ Error en método {nombre}: {str(e)}")
+                    exito = False
+                self._registrar_intento(url, nombre, exito, time.monotonic() - inicio)
+                if exito:
                     print(f"\n✅ ¡Descarga exitosa con método: {nombre}!")
                     return True
-            except Exception as e:
-                print(f"❌ Error en método {nombre}: {str(e)}")
-                continue
+            
+            # El método 6 no descarga nada (solo muestra la URL): va siempre
+            # el último y fuera de las estadísticas, o ganaría a los demás
+            if self.metodo_6_extraccion_directa(url, info):
+                print("\n✅ ¡Descarga exitosa con método: Extracción URL directa!")
+                return True
+        finally:
+            try:
+                info_json.unlink()
+            except OSError:
+                pass
         
         print("\n" + "="*60)
         print("❌ No se pudo descargar con ningún método")
@@ -208,21 +435,60 @@ class DescargadorFacebook:
         
         return False
     
+    def _descargar_en_carrera(self, url, info_json, info, archivo_cookies, registro=()):
+        """Ejecuta los métodos de transferencia (1-5) en paralelo
+        
+        El primero que termina gana; si todos fallan se recurre a la
+        extracción de la URL directa (método 6).
+        """
+        from carrera import Estrategia, correr_carrera
+        
+        estrategias = [
+            Estrategia("Básico", lambda d: self.metodo_1_basico(url, info_json, info, d, registro)),
+            Estrategia("Headers personalizados",
+                       lambda d: self.metodo_2_con_headers(url, info_json, info, d, registro)),
+            Estrategia("API configurada",
+                       lambda d: self.metodo_3_api_version(url, info_json, info, d, registro)),
+            Estrategia("Formatos alternativos",
+                       lambda d: self.metodo_4_formato_especifico(url, info_json, info, d, registro)),
+        ]
+        if archivo_cookies and os.path.exists(archivo_cookies):
+            estrategias.append(Estrategia(
+                "Con cookies",
+                lambda d: self.metodo_5_cookies(url, archivo_cookies, info_json, info, d,
+                                                registro)
+            ))
+        
+        estrategias = self._ordenar_metodos(url, estrategias, nombre=lambda e: e.nombre)
+        
+        print("\n" + "="*60)
+        print(f"🏎️  Modo carrera: hasta {self.carrera_paralelo} métodos en paralelo")
+        print("="*60)
+        
+        ganador = correr_carrera(
+            estrategias,
+            self.directorio_descargas,
+            max_paralelo=self.carrera_paralelo,
+            retraso_cobertura=self.retraso_cobertura,
+            al_terminar=lambda nombre, exito, segundos: self._registrar_intento(
+                url, nombre, exito, segundos
+            )
+        )
+        if ganador:
+            print(f"\n✅ ¡Descarga exitosa con método: {ganador}!")
+            return True
+        
+        return self.metodo_6_extraccion_directa(url, info)
+    
     def obtener_info_video(self, url):
         """Obtiene información del video sin descargarlo"""
         print("\n📋 Obteniendo información del video...")
-        comando = [
-            "yt-dlp",
-            "--dump-json",
-            "--no-warnings",
-            url
-        ]
         
         try:
-            resultado = subprocess.run(comando, check=True, 
-                                     capture_output=True, text=True)
-            import json
-            info = json.loads(resultado.stdout)
+            info = self.extraer_info(url, requiere_urls=False)
+            if info is None:
+                print("❌ No se pudo obtener información del video")
+                return False
             
             print("\n" + "="*60)
             print("📊 INFORMACIÓN DEL VIDEO")
@@ -241,9 +507,6 @@ class DescargadorFacebook:
             print("="*60)
             return True
             
-        except subprocess.CalledProcessError:
-            print("❌ No se pudo obtener información del video")
-            return False
         except Exception as e:
             print(f"❌ Error al procesar información: {e}")
             return False
@@ -267,7 +530,7 @@ def menu():
         if opcion == "1":
             url = input("\n📎 URL del video de Facebook: ").strip()
             if url:
-                descargador.descargar_con_todos_los_metodos(url)
+                descargador.descargar_con_todos_los_metodos(url, preguntar_cookies=True)
             else:
                 print("❌ URL no válida")
         
@@ -297,9 +560,80 @@ def menu():
         input("\n⏸ Presiona Enter para continuar...")
 
 
+def crear_parser():
+    parser = argparse.ArgumentParser(
+        prog="facebook_descargador.py",
+        description="Descarga videos de Facebook probando todos los métodos. "
+                    "Sin argumentos abre el menú interactivo.",
+        epilog="Códigos de salida: 0 todo bien, 1 algún video falló, "
+               "2 argumentos no válidos, 3 falta una dependencia, 130 interrumpido.",
+    )
+    parser.add_argument("urls", nargs="*", metavar="URL", help="URLs de videos de Facebook")
+    parser.add_argument("-c", "--cookies", help="Archivo de cookies (formato Netscape)")
+    parser.add_argument("--info", action="store_true",
+                        help="Solo mostrar la información de los videos")
+    agregar_opciones_comunes(parser)
+    return parser
+
+
+def main(argv=None):
+    """Menú sin argumentos; con URLs recorre la escalera de métodos sin preguntar"""
+    args = crear_parser().parse_args(argv)
+    if not args.urls:
+        try:
+            menu()
+        except KeyboardInterrupt:
+            print("\n\n👋 Programa interrumpido")
+        return SALIDA_EXITO
+    
+    emisor = EmisorJSON(sys.stdout) if args.json else None
+    with redirect_stdout(sys.stderr) if args.json else nullcontext():
+        registro = None
+        try:
+            registro = aplicar_opciones_comunes(args)
+            archivo_cookies = validar_archivo_cookies(args.cookies) if args.cookies else None
+            if not verificar_dependencias(instalar=False):
+                return SALIDA_DEPENDENCIAS
+            descargador = DescargadorFacebook(
+                backend=args.backend,
+                usar_cache=not args.sin_cache,
+                modo_carrera=args.carrera,
+                usar_archivo=not args.sin_archivo,
+                aprender_orden=not args.orden_fijo,
+                autoajustar=not args.sin_autoajuste,
+                almacen=args.almacen,
+                disposicion=args.disposicion,
+                usar_catalogo=not args.sin_catalogo,
+            )
+            fallidas = 0
+            for url in args.urls:
+                if args.info:
+                    exito = descargador.obtener_info_video(url)
+                else:
+                    exito = descargador.descargar_con_todos_los_metodos(url, archivo_cookies)
+                fallidas += not exito
+                if emisor is not None:
+                    emisor.emitir({'tipo': 'resultado', 'url': url, 'exito': bool(exito)})
+            codigo = SALIDA_FALLOS if fallidas else SALIDA_EXITO
+            if emisor is not None:
+                emisor.emitir({'tipo': 'resumen', 'total': len(args.urls),
+                               'exitosas': len(args.urls) - fallidas,
+                               'fallidas': fallidas, 'codigo': codigo})
+            return codigo
+        except ValidacionError as e:
+            print(str(e))
+            return SALIDA_USO
+        except DependenciaError as e:
+            print(str(e))
+            return SALIDA_DEPENDENCIAS
+        except KeyboardInterrupt:
+            print("\n\n👋 Programa interrumpido")
+            return SALIDA_INTERRUMPIDA
+        finally:
+            if registro is not None:
+                BUS_PROGRESO.desuscribir(registro)
+                registro.cerrar()
+
+
 if __name__ == "__main__":
-    try:
-        menu()
-    except KeyboardInterrupt:
-        print("\n\n👋 Programa interrumpido")
-        sys.exit(0)
+    sys.exit(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+formatos.py - Selección local de formatos sobre un info dict de yt-dlp
+Permite elegir "best", "worst", "720p", etc. sin volver a extraer la página
+"""
+
+import operator
+import re
+
+
+_OPERADORES = {
+    '<=': operator.le,
+    '>=': operator.ge,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '>': operator.gt,
+    '=': operator.eq,
+}
+
+_FILTRO = re.compile(r'\[(\w+)\s*(<=|>=|!=|<|>|=)\s*([^\]]+)\]')
+_SELECTOR = re.compile(r'^(?P<base>[^\[]*)(?P<filtros>(?:\[[^\]]+\])*)$')
+
+_EXTENSIONES = {'mp4', 'webm', 'flv', 'm4a', 'mp3', 'ogg', 'aac', 'wav', '3gp'}
+
+
+def tiene_video(formato):
+    return formato.get('vcodec') != 'none'
+
+
+def tiene_audio(formato):
+    return formato.get('acodec') != 'none'
+
+
+def _cumple_filtros(formato, filtros):
+    for campo, simbolo, valor in filtros:
+        actual = formato.get(campo)
+        if actual is None:
+            return False
+        try:
+            esperado = type(actual)(valor) if not isinstance(actual, str) else valor
+        except (TypeError, ValueError):
+            return False
+        if not _OPERADORES[simbolo](actual, esperado):
+            return False
+    return True
+
+
+def _seleccionar_simple(formatos, selector):
+    """Resuelve un selector sin '+' ni '/' (p. ej. "bestvideo[height<=720]")"""
+    coincidencia = _SELECTOR.match(selector.strip())
+    if not coincidencia:
+        return None
+
+    base = coincidencia.group('base') or 'best'
+    filtros = _FILTRO.findall(coincidencia.group('filtros'))
+
+    mejor = True
+    if base in ('best', 'b'):
+        candidatos = [f for f in formatos if tiene_video(f) and tiene_audio(f)]
+    elif base in ('worst', 'w'):
+        candidatos = [f for f in formatos if tiene_video(f) and tiene_audio(f)]
+        mejor = False
+    elif base in ('bestvideo', 'bv'):
+        candidatos = [f for f in formatos if tiene_video(f) and not tiene_audio(f)]
+    elif base in ('worstvideo', 'wv'):
+        candidatos = [f for f in formatos if tiene_video(f) and not tiene_audio(f)]
+        mejor = False
+    elif base in ('bestaudio', 'ba'):
+        candidatos = [f for f in formatos if tiene_audio(f) and not tiene_video(f)]
+    elif base in ('worstaudio', 'wa'):
+        candidatos = [f for f in formatos if tiene_audio(f) and not tiene_video(f)]
+        mejor = False
+    elif base in _EXTENSIONES:
+        candidatos = [f for f in formatos
+                      if f.get('ext') == base and tiene_video(f) and tiene_audio(f)]
+    else:
+        candidatos = [f for f in formatos if f.get('format_id') == base]
+
+    candidatos = [f for f in candidatos if _cumple_filtros(f, filtros)]
+    if not candidatos:
+        return None
+    # yt-dlp ordena info['formats'] de peor a mejor
+    return candidatos[-1] if mejor else candidatos[0]
+
+
+def resolver_formato(info, especificacion):
+    """Resuelve una especificación de formato usando solo info['formats']
+
+    Admite el subconjunto de la sintaxis de yt-dlp que usan los métodos de
+    descarga: alternativas con '/', mezclas con '+', best/worst/bestvideo/
+    bestaudio, extensiones y filtros como [height<=720].
+
+    Devuelve la lista de formatos elegidos (dos si hay mezcla) o None si
+    ninguna alternativa está disponible.
+    """
+    formatos = info.get('formats') or [info]
+
+    for alternativa in especificacion.split('/'):
+        partes = [_seleccionar_simple(formatos, p) for p in alternativa.split('+')]
+        if partes and all(partes):
+            return partes
+    return None
+
+
+def id_formato(elegidos):
+    """Convierte una selección de resolver_formato en un argumento para --format"""
+    return '+'.join(str(f['format_id']) for f in elegidos)
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ingesta_urls.py - Lectura en streaming de listas de URLs
+Lee archivos de texto, .gz o la entrada estándar línea a línea, valida cada
+URL al vuelo y descarta duplicados con memoria acotada, para empezar a
+descargar en cuanto aparece la primera URL válida
+"""
+
+import gzip
+import sys
+from array import array
+from pathlib import Path
+
+from canonicalizar import clave_canonica
+from core import validar_url, validar_archivo_existe, ValidacionError
+
+
+ENTRADA_ESTANDAR = "-"
+EJEMPLOS_POR_MOTIVO = 3
+MOTIVO_REPETIDA = "URL repetida"
+
+
+class FiltroDuplicados:
+    """Conjunto compacto de huellas de 64 bits para detectar URLs repetidas
+
+    Guarda la huella (hash de 64 bits) de cada URL en una tabla de
+    direccionamiento abierto sobre un array de enteros: entre 12 y 24 bytes
+    por URL en lugar de los ~150 que ocupa un set de strings, así millones
+    de líneas caben en pocas decenas de megas. La tabla empieza pequeña y
+    dobla su tamaño según se llena.
+
+    Dos URLs distintas solo se confunden si comparten los 64 bits de
+    huella: con diez millones de URLs la probabilidad es de una entre
+    cientos de miles de lotes.
+    """
+
+    CARGA_MAXIMA = 0.7
+
+    def __init__(self, capacidad_inicial=1024):
+        tamano = 1
+        while tamano * self.CARGA_MAXIMA < capacidad_inicial:
+            tamano *= 2
+        self._tabla = array('Q', bytes(8 * tamano))
+        self._mascara = tamano - 1
+        self._elementos = 0
+
+    @staticmethod
+    def _huella(texto):
+        # hash() de str es SipHash de 64 bits; el 0 marca hueco libre
+        return (hash(texto) & 0xFFFFFFFFFFFFFFFF) or 1
+
+    def __len__(self):
+        return self._elementos
+
+    def __contains__(self, texto):
+        huella = self._huella(texto)
+        tabla, mascara = self._tabla, self._mascara
+        posicion = huella & mascara
+        while True:
+            actual = tabla[posicion]
+            if actual == huella:
+                return True
+            if actual == 0:
+                return False
+            posicion = (posicion + 1) & mascara
+
+    def agregar(self, texto):
+        """Añade el texto y devuelve True si es nuevo, False si ya estaba"""
+        huella = self._huella(texto)
+        tabla, mascara = self._tabla, self._mascara
+        posicion = huella & mascara
+        while True:
+            actual = tabla[posicion]
+            if actual == huella:
+                return False
+            if actual == 0:
+                break
+            posicion = (posicion + 1) & mascara
+
+        tabla[posicion] = huella
+        self._elementos += 1
+        if self._elementos > (mascara + 1) * self.CARGA_MAXIMA:
+            self._crecer()
+        return True
+
+    def _crecer(self):
+        anterior = self._tabla
+        tamano = len(anterior) * 2
+        tabla = array('Q', bytes(8 * tamano))
+        mascara = tamano - 1
+        for huella in anterior:
+            if huella:
+                posicion = huella & mascara
+                while tabla[posicion]:
+                    posicion = (posicion + 1) & mascara
+                tabla[posicion] = huella
+        self._tabla = tabla
+        self._mascara = mascara
+
+
+class EstadisticasIngesta:
+    """Cuenta lo leído y agrupa los avisos por motivo en vez de uno por línea"""
+
+    def __init__(self):
+        self.lineas = 0
+        self.validas = 0
+        self.duplicadas = 0
+        self.posicion = 0     # byte donde empieza la próxima línea por leer
+        self.ignoradas = {}   # motivo -> [cantidad, ejemplos de número de línea]
+        self.terminada = False
+
+    def ignorar(self, linea_num, motivo):
+        registro = self.ignoradas.setdefault(motivo, [0, []])
+        registro[0] += 1
+        if len(registro[1]) < EJEMPLOS_POR_MOTIVO:
+            registro[1].append(linea_num)
+
+    @property
+    def total_ignoradas(self):
+        return sum(cantidad for cantidad, _ in self.ignoradas.values())
+
+    def mostrar_resumen(self):
+        """Imprime un resumen de las líneas leídas, ignoradas y repetidas"""
+        print(f"✓ {self.validas} URLs válidas de {self.lineas} líneas")
+        if self.duplicadas:
+            print(f"🔁 {self.duplicadas} URLs repetidas omitidas")
+        for motivo, (cantidad, ejemplos) in sorted(self.ignoradas.items(),
+                                                    key=lambda m: -m[1][0]):
+            lineas = ", ".join(str(n) for n in ejemplos)
+            extra = "..." if cantidad > len(ejemplos) else ""
+            print(f"⚠️  {cantidad} líneas ignoradas: {motivo} (líneas {lineas}{extra})")
+
+
+def abrir_fuente(archivo):
+    """Abre un archivo de URLs en binario: '-' es la entrada estándar, .gz se descomprime
+
+    Se lee en bytes para conocer la posición de cada línea (ver iterar_urls).
+    """
+    if archivo == ENTRADA_ESTANDAR:
+        return sys.stdin.buffer
+
+    ruta = Path(validar_archivo_existe(archivo, "archivo de URLs"))
+    if ruta.suffix.lower() == '.gz':
+        return gzip.open(ruta, 'rb')
+    return open(ruta, 'rb')
+
+
+def _motivo(error):
+    """Primera línea del mensaje de validación, sin el emoji, para agrupar avisos"""
+    return str(error).splitlines()[0].lstrip("❌ ").rstrip(".")
+
+
+def iterar_urls(archivo, estadisticas=None, deduplicar=True, desde=None, al_descartar=None):
+    """Genera las URLs válidas del archivo a medida que se leen
+
+    Ignora líneas vacías y comentarios (#). Las líneas inválidas y las URLs
+    repetidas se cuentan en `estadisticas` en lugar de avisar una por una.
+    Dos URLs son la misma si tienen la misma forma canónica (youtu.be/X y
+    youtube.com/watch?v=X&t=30 cuentan como una sola).
+
+    Tras cada URL, estadisticas.posicion es el byte (del contenido sin
+    comprimir) donde empieza la línea siguiente. desde=(posicion, lineas)
+    continúa una lectura anterior en ese punto sin leer ni validar lo de
+    antes; las repetidas de esa parte ya no se detectan aquí.
+
+    al_descartar(número de línea, texto, motivo) se llama por cada línea
+    inválida o repetida (motivo MOTIVO_REPETIDA) además de contarla.
+    """
+    if estadisticas is None:
+        estadisticas = EstadisticasIngesta()
+    vistas = FiltroDuplicados() if deduplicar else None
+
+    fuente = abrir_fuente(archivo)
+    try:
+        if desde is not None:
+            fuente.seek(desde[0])
+            estadisticas.posicion, estadisticas.lineas = desde
+        for crudo in fuente:
+            estadisticas.lineas += 1
+            estadisticas.posicion += len(crudo)
+            linea = crudo.decode('utf-8').strip()
+
+            # Ignorar líneas vacías y comentarios
+            if not linea or linea.startswith('#'):
+                continue
+
+            try:
+                url = validar_url(linea)
+            except ValidacionError as e:
+                motivo = _motivo(e)
+                estadisticas.ignorar(estadisticas.lineas, motivo)
+                if al_descartar is not None:
+                    al_descartar(estadisticas.lineas, linea, motivo)
+                continue
+
+            if vistas is not None and not vistas.agregar(clave_canonica(url)):
+                estadisticas.duplicadas += 1
+                if al_descartar is not None:
+                    al_descartar(estadisticas.lineas, url, MOTIVO_REPETIDA)
+                continue
+
+            estadisticas.validas += 1
+            yield url
+    except UnicodeDecodeError:
+        raise ValidacionError(
+            "❌ Error de codificación en el archivo\n"
+            "   Guarda el archivo con codificación UTF-8"
+        )
+    except (EOFError, gzip.BadGzipFile) as e:
+        raise ValidacionError(f"❌ Archivo comprimido dañado: {e}")
+    finally:
+        if archivo != ENTRADA_ESTANDAR:
+            fuente.close()   # sys.stdin queda abierto
+    estadisticas.terminada = True
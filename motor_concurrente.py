@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+motor_concurrente.py - Pool de trabajadores para descargas masivas
+Ejecuta varias descargas a la vez respetando límites por plataforma
+"""
+
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from core import capturar_salida_hilo, detectar_plataforma, REGISTRO_PLATAFORMAS
+
+# URLs leídas por adelantado (por trabajador) al consumir un generador
+VENTANA_POR_TRABAJADOR = 4
+
+
+class ResultadoDescarga:
+    """Resultado de una descarga ejecutada por el motor"""
+
+    def __init__(self, indice, url, plataforma, exito, salida="", error=None, valor=None):
+        self.indice = indice
+        self.url = url
+        self.plataforma = plataforma
+        self.exito = exito
+        self.salida = salida
+        self.error = error
+        # Lo que devolvió la función de descarga (p. ej. un info dict)
+        self.valor = valor
+
+
+class MotorDescargas:
+    """Reparte URLs entre un pool de hilos con topes de concurrencia por plataforma
+
+    Un planificador en el hilo llamador solo envía trabajo cuando la
+    plataforma tiene un hueco libre, así las URLs de una plataforma
+    saturada no bloquean a los trabajadores que podrían atender otras.
+    """
+
+    def __init__(self, funcion_descarga, trabajadores=4, limites_plataforma=None,
+                 clasificador=detectar_plataforma):
+        if trabajadores < 1:
+            raise ValueError("Se necesita al menos un trabajador")
+
+        self.funcion_descarga = funcion_descarga
+        self.trabajadores = trabajadores
+        # Topes por plataforma: los del registro salvo que se indiquen otros
+        self.limites = dict(limites_plataforma or {})
+        self.clasificador = clasificador
+        self._cerrojo_consola = threading.Lock()
+
+    def limite_de(self, plataforma):
+        """Devuelve el tope de descargas simultáneas de una plataforma"""
+        limite = self.limites.get(plataforma)
+        if limite is None:
+            limite = REGISTRO_PLATAFORMAS.perfil(plataforma).limite_concurrencia
+        return max(1, min(limite or self.trabajadores, self.trabajadores))
+
+    def _trabajo(self, indice, url, plataforma):
+        """Ejecuta una descarga capturando su salida para no mezclarla"""
+        with capturar_salida_hilo() as buffer:
+            valor = None
+            try:
+                valor = self.funcion_descarga(url)
+                error = None
+            except Exception as e:
+                error = str(e)
+        return ResultadoDescarga(indice, url, plataforma, bool(valor),
+                                 buffer.getvalue(), error, valor)
+
+    def ejecutar(self, urls, al_terminar=None):
+        """Descarga todas las URLs y devuelve los resultados ordenados por índice
+
+        al_terminar(resultado) se llama en el hilo llamador cada vez que una
+        descarga termina, en el orden en que van acabando.
+        """
+        return self.ejecutar_trabajos(enumerate(urls, 1), al_terminar)
+
+    def ejecutar_trabajos(self, trabajos, al_terminar=None, guardar_resultados=True):
+        """Igual que ejecutar() pero con pares (índice, url) ya numerados
+
+        `trabajos` puede ser un generador: se consume poco a poco, con una
+        ventana de lectura anticipada acotada, así la primera descarga
+        empieza sin esperar a leer la lista entera. Con
+        guardar_resultados=False los resultados solo llegan a al_terminar y
+        la memoria no crece con el tamaño del lote.
+        """
+        trabajos = iter(trabajos)
+        ventana = self.trabajadores * VENTANA_POR_TRABAJADOR
+        pendientes = {}
+        en_espera = 0
+        agotados = False
+
+        en_curso = {}
+        activos_por_plataforma = {}
+        resultados = []
+
+        def leer_mas():
+            # Leer hasta llenar la ventana o encontrar trabajo para una
+            # plataforma con hueco (las saturadas no frenan a las demás)
+            nonlocal en_espera, agotados
+            while not agotados and en_espera < ventana:
+                try:
+                    indice, url = next(trabajos)
+                except StopIteration:
+                    agotados = True
+                    break
+                plataforma = self.clasificador(url)
+                pendientes.setdefault(plataforma, deque()).append((indice, url))
+                en_espera += 1
+                if activos_por_plataforma.get(plataforma, 0) < self.limite_de(plataforma):
+                    break
+
+        def siguiente_trabajo():
+            # Elegir la URL más antigua cuya plataforma tenga hueco
+            candidata = None
+            for plataforma, cola in pendientes.items():
+                if not cola:
+                    continue
+                if activos_por_plataforma.get(plataforma, 0) >= self.limite_de(plataforma):
+                    continue
+                if candidata is None or cola[0][0] < pendientes[candidata][0][0]:
+                    candidata = plataforma
+            return candidata
+
+        with ThreadPoolExecutor(max_workers=self.trabajadores,
+                                thread_name_prefix="descarga") as pool:
+            while True:
+                while len(en_curso) < self.trabajadores:
+                    plataforma = siguiente_trabajo()
+                    if plataforma is None:
+                        leer_mas()
+                        plataforma = siguiente_trabajo()
+                        if plataforma is None:
+                            break
+                    indice, url = pendientes[plataforma].popleft()
+                    en_espera -= 1
+                    activos_por_plataforma[plataforma] = \
+                        activos_por_plataforma.get(plataforma, 0) + 1
+                    futuro = pool.submit(self._trabajo, indice, url, plataforma)
+                    en_curso[futuro] = plataforma
+
+                if not en_curso:
+                    break
+
+                terminados, _ = wait(list(en_curso), return_when=FIRST_COMPLETED)
+                for futuro in terminados:
+                    plataforma = en_curso.pop(futuro)
+                    activos_por_plataforma[plataforma] -= 1
+                    resultado = futuro.result()
+                    if guardar_resultados:
+                        resultados.append(resultado)
+                    if al_terminar:
+                        with self._cerrojo_consola:
+                            al_terminar(resultado)
+
+        resultados.sort(key=lambda r: r.indice)
+        return resultados
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+plataformas.py - Registro de plataformas soportadas
+Cada plataforma tiene un perfil (dominios, opciones de yt-dlp, métodos de
+respaldo, límite de descargas simultáneas). Para añadir un sitio basta con
+registrar su perfil; los descargadores no tienen que cambiar.
+
+    from plataformas import PerfilPlataforma, registrar_plataforma
+
+    registrar_plataforma(PerfilPlataforma(
+        'vimeo', dominios=('vimeo.com',),
+        opciones=('--format', 'best'), limite_concurrencia=2,
+    ))
+"""
+
+import re
+
+
+GENERICO = 'generico'
+
+# Host de una URL: lo que va entre "esquema://" (opcional) y la ruta
+_HOST = re.compile(r'^\s*(?:[A-Za-z][A-Za-z0-9+.-]*://|//)?(?:[^@/?#]*@)?(\[[^\]]*\]|[^:/?#]*)')
+
+_AGENTE_ESCRITORIO = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+_AGENTE_IPHONE = "Mozilla/5.0 (iPhone; CPU iPhone OS 16_0 like Mac OS X) AppleWebKit/605.1.15"
+
+# Reintentos de yt-dlp con espera exponencial (1, 2, 4... hasta 30 s) en lugar
+# de repetir la petición al instante contra un sitio que ya nos limita
+_REINTENTOS_PAUSADOS = (
+    "--retry-sleep", "http:exp=1:30",
+    "--retry-sleep", "fragment:exp=1:30",
+)
+
+_AYUDA_GENERICA = (
+    "Actualiza yt-dlp (opción 4 del menú)",
+    "Verifica que el video esté disponible",
+    "Prueba con otra URL",
+    "Lee README.md para más ayuda",
+)
+
+
+class PerfilPlataforma:
+    """Todo lo que los descargadores necesitan saber de una plataforma
+
+    - opciones: argumentos de yt-dlp propios de la plataforma.
+    - escalera: métodos de respaldo [(nombre, argumentos)] que se prueban
+      en orden si la descarga principal falla.
+    - limite_concurrencia: descargas simultáneas en modo paralelo (None =
+      sin más límite que el número de trabajadores).
+    - intervalo_minimo: segundos entre dos ejecuciones de yt-dlp contra el
+      sitio, compartidos por todos los trabajadores (ver cortesia.py).
+    - ayuda_fallo: sugerencias que se muestran si todo falla.
+    """
+
+    def __init__(self, nombre, dominios=(), opciones=(), escalera=None,
+                 limite_concurrencia=None, ayuda_fallo=_AYUDA_GENERICA,
+                 intervalo_minimo=0.0):
+        self.nombre = nombre
+        self.dominios = tuple(d.lower() for d in dominios)
+        self.opciones = tuple(opciones)
+        if escalera is None:
+            escalera = [("Descarga simplificada", ("--format", "best"))]
+        self.escalera = [(nombre_metodo, tuple(argumentos)) for nombre_metodo, argumentos in escalera]
+        self.limite_concurrencia = limite_concurrencia
+        self.ayuda_fallo = list(ayuda_fallo)
+        self.intervalo_minimo = intervalo_minimo
+
+
+class RegistroPlataformas:
+    """Índice dominio -> perfil
+
+    La plataforma de una URL se resuelve extrayendo el host una sola vez y
+    buscándolo en un diccionario: primero el host exacto y luego cada
+    dominio padre (m.facebook.com -> facebook.com). Así el coste no crece
+    con el número de sitios y 'netflix.com' nunca se confunde con 'x.com'.
+    """
+
+    def __init__(self, generico=None):
+        self._perfiles = {}
+        self._por_dominio = {}
+        self.generico = generico or PerfilPlataforma(GENERICO)
+        self._perfiles[GENERICO] = self.generico
+
+    def registrar(self, perfil):
+        """Añade (o reemplaza) una plataforma"""
+        anterior = self._perfiles.get(perfil.nombre)
+        if anterior is not None:
+            for dominio in anterior.dominios:
+                self._por_dominio.pop(dominio, None)
+        self._perfiles[perfil.nombre] = perfil
+        for dominio in perfil.dominios:
+            self._por_dominio[dominio] = perfil
+        return perfil
+
+    def perfil(self, nombre):
+        """Perfil de una plataforma por nombre (el genérico si no existe)"""
+        return self._perfiles.get(nombre, self.generico)
+
+    def nombres(self):
+        return [nombre for nombre in self._perfiles if nombre != GENERICO]
+
+    def dominios_por_plataforma(self):
+        """{plataforma: [dominios]} de las plataformas registradas"""
+        return {p.nombre: list(p.dominios) for p in self._perfiles.values() if p.dominios}
+
+    def perfil_de_host(self, host):
+        """Perfil del host (en minúsculas, sin puerto) o el genérico"""
+        por_dominio = self._por_dominio
+        while True:
+            perfil = por_dominio.get(host)
+            if perfil is not None:
+                return perfil
+            punto = host.find('.')
+            if punto < 0:
+                return self.generico
+            host = host[punto + 1:]
+
+    def perfil_de_url(self, url):
+        """Perfil de la plataforma a la que pertenece una URL"""
+        coincidencia = _HOST.match(url)
+        if coincidencia is None:
+            return self.generico
+        return self.perfil_de_host(coincidencia.group(1).lower().rstrip('.'))
+
+    def clasificar(self, url):
+        """Nombre de la plataforma de una URL ('generico' si no se conoce)"""
+        return self.perfil_de_url(url).nombre
+
+
+REGISTRO = RegistroPlataformas()
+
+
+def registrar_plataforma(perfil):
+    """Registra una plataforma en el registro global"""
+    return REGISTRO.registrar(perfil)
+
+
+registrar_plataforma(PerfilPlataforma(
+    'facebook',
+    dominios=('facebook.com', 'fb.watch', 'fb.com'),
+    opciones=(
+        "--user-agent", _AGENTE_ESCRITORIO,
+        "--referer", "https://www.facebook.com/",
+        "--format", "best",
+        "--http-chunk-size", "10M",
+        "--retries", "10",
+        "--fragment-retries", "10",
+        "--extractor-args", "facebook:api_version=v13.0",
+        *_REINTENTOS_PAUSADOS,
+    ),
+    escalera=[
+        ("Mejor calidad disponible", ("--format", "best")),
+        ("Calidad media", ("--format", "worst")),
+        ("HD 720p", ("--format", "bestvideo[height<=720]+bestaudio/best")),
+    ],
+    # Facebook bloquea rápido a quien abre muchas conexiones a la vez
+    limite_concurrencia=2,
+    intervalo_minimo=2.0,
+    ayuda_fallo=(
+        "Verifica que la URL sea correcta",
+        "Intenta configurar cookies (opción 3 del menú)",
+        "Lee GUIA_COOKIES.md si es un video privado",
+        "Prueba facebook_descargador.py para más opciones",
+    ),
+))
+
+registrar_plataforma(PerfilPlataforma(
+    'instagram',
+    dominios=('instagram.com', 'instagr.am'),
+    opciones=(
+        "--format", "best",
+        "--user-agent", _AGENTE_IPHONE,
+        *_REINTENTOS_PAUSADOS,
+    ),
+    limite_concurrencia=2,
+    intervalo_minimo=2.0,
+))
+
+registrar_plataforma(PerfilPlataforma(
+    'tiktok',
+    dominios=('tiktok.com', 'tiktokv.com'),
+    opciones=(
+        "--format", "best",
+        "--extractor-args", "tiktok:api_hostname=api16-normal-c-useast1a.tiktokv.com",
+    ),
+    limite_concurrencia=3,
+))
+
+registrar_plataforma(PerfilPlataforma(
+    'youtube',
+    dominios=('youtube.com', 'youtu.be', 'youtube-nocookie.com'),
+    opciones=(
+        "--format", "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best",
+        "--merge-output-format", "mp4",
+    ),
+    limite_concurrencia=4,
+))
+
+registrar_plataforma(PerfilPlataforma(
+    'twitter',
+    dominios=('twitter.com', 'x.com'),
+    limite_concurrencia=3,
+))
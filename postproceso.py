@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+postproceso.py - Postproceso en un pool de procesos aparte de las descargas
+Las descargas (hilos, limitados por la red) solo bajan los flujos tal cual
+llegan: video y audio por separado, miniatura, subtítulos y el .info.json,
+en una carpeta .crudo/<clave> dentro de la de descargas. Un pool de
+procesos del tamaño de los núcleos (limitado por la CPU) hace después, en
+una sola pasada de ffmpeg, lo que yt-dlp hacía en varias dentro de cada
+descarga: mezclar video y audio, incrustar subtítulos (convertidos), la
+miniatura y los metadatos. Así un ffmpeg lento no ocupa un hueco de red.
+
+Entre las dos etapas hay una cola acotada: si el postproceso no da abasto,
+enviar() bloquea al hilo de descarga hasta que haya hueco (contrapresión)
+en lugar de acumular gigas de flujos sin procesar en disco.
+
+    tuberia = TuberiaPostproceso()
+    crudo = tuberia.directorio_crudo(carpeta, url)
+    ... yt-dlp con opciones_crudas(plantilla) y -o dentro de crudo ...
+    futuro = tuberia.enviar(crudo, carpeta)
+    futuro.result()  # {'archivos': [(id, ruta, url)], 'avisos': [...]}
+
+Sin ffmpeg los flujos se mueven tal cual (sin mezclar, como hace yt-dlp)
+y los subtítulos .vtt se convierten a .srt en Python.
+
+Con almacen (ver almacen_contenido.py) la huella de cada archivo final se
+calcula también en el pool, no en el hilo de descarga, y no se incrustan
+los metadatos (título, URL...), que harían distintas dos copias del mismo
+video.
+"""
+
+import json
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+
+# Lo que yt-dlp hace dentro de cada descarga cuando no hay tubería
+OPCIONES_POSTPROCESO = (
+    "--add-metadata",
+    "--embed-thumbnail",
+    "--embed-subs",
+    "--sub-langs", "es,en",
+    "--convert-subs", "srt",
+)
+
+# Etapa de red: los mismos ingredientes, sin ffmpeg
+OPCIONES_CRUDAS = (
+    "--write-info-json",
+    "--write-thumbnail",
+    "--write-subs",
+    "--sub-langs", "es,en",
+)
+
+DIRECTORIO_CRUDO = ".crudo"
+EXTENSION_INFO = ".info.json"
+EXTENSIONES_SUBTITULOS = {'.vtt', '.srt', '.ass', '.ssa', '.ttml', '.srv3'}
+EXTENSIONES_MINIATURA = {'.jpg', '.jpeg', '.png', '.webp'}
+EXTENSIONES_TEMPORALES = {'.part', '.ytdl', '.temp'}
+
+# Flujo descargado por separado: <base>.f<format_id>.<ext>
+_FLUJO = re.compile(r'^(?P<base>.+)\.f(?P<formato>[^./]+)\.(?P<ext>[^./]+)$')
+
+# Extensión -> (formato de ffmpeg, códec de subtítulos, ¿admite miniatura incrustada?)
+_CONTENEDORES = {
+    'mp4': ('mp4', 'mov_text', True),
+    'm4a': ('mp4', 'mov_text', True),
+    'mov': ('mp4', 'mov_text', True),
+    'mkv': ('matroska', 'srt', True),
+    'webm': ('webm', 'webvtt', False),
+    'weba': ('webm', 'webvtt', False),
+}
+# Los contenedores guardan el idioma en ISO 639-2
+_IDIOMAS = {'es': 'spa', 'en': 'eng'}
+EXTENSIONES_SOLO_AUDIO = {'m4a', 'weba', 'mp3', 'opus', 'ogg', 'aac', 'wav'}
+
+
+def opciones_crudas(plantilla):
+    """Opciones de yt-dlp para la etapa de red con la plantilla de salida dada
+
+    La plantilla debe terminar en '.%(ext)s'; cada flujo lleva además su
+    format_id para que video y audio no se pisen.
+    """
+    base = plantilla[:-len(".%(ext)s")]
+    return list(OPCIONES_CRUDAS) + [
+        "-o", base + ".f%(format_id)s.%(ext)s",
+        "-o", "thumbnail:" + base + ".%(ext)s",
+        "-o", "subtitle:" + base + ".%(ext)s",
+        "-o", "infojson:" + base + ".%(ext)s",
+    ]
+
+
+def admite_plantilla(plantilla):
+    return plantilla.endswith(".%(ext)s")
+
+
+def formato_por_separado(especificacion):
+    """'A+B/C' -> '(A,B)/C': los flujos de una mezcla se bajan como archivos aparte"""
+    alternativas = []
+    for alternativa in especificacion.split('/'):
+        if '+' in alternativa:
+            alternativa = "(" + alternativa.replace('+', ',') + ")"
+        alternativas.append(alternativa)
+    return '/'.join(alternativas)
+
+
+def opciones_por_separado(opciones):
+    """Opciones con las mezclas de --format convertidas con formato_por_separado"""
+    resultado = list(opciones)
+    for i, opcion in enumerate(resultado[:-1]):
+        if opcion in ("--format", "-f"):
+            resultado[i + 1] = formato_por_separado(resultado[i + 1])
+    return resultado
+
+
+def _extension_salida(flujos, miniatura=None):
+    """Extensión del archivo final (para mezclas, el mismo criterio que yt-dlp)"""
+    extensiones = {f.suffix[1:].lower() for f in flujos}
+    if len(flujos) == 1:
+        return extensiones.pop()
+    if extensiones <= {'mp4', 'm4a', 'mov'}:
+        return 'mp4'
+    if extensiones <= {'webm', 'weba'} and miniatura is None:
+        return 'webm'
+    return 'mkv'
+
+
+def vtt_a_srt(texto):
+    """Convierte subtítulos WebVTT a SubRip"""
+    bloques = re.split(r'\n\s*\n', texto.replace('\r\n', '\n').strip())
+    salida = []
+    for bloque in bloques:
+        lineas = bloque.split('\n')
+        for i, linea in enumerate(lineas):
+            if '-->' in linea:
+                break
+        else:
+            continue  # cabecera WEBVTT, NOTE, STYLE...
+        inicio, _, fin = lineas[i].partition('-->')
+        tiempos = []
+        for marca in (inicio.strip(), fin.strip().split(' ')[0]):
+            if marca.count(':') == 1:
+                marca = "00:" + marca
+            tiempos.append(marca.replace('.', ','))
+        cuerpo = [re.sub(r'<[^>]+>', '', l) for l in lineas[i + 1:]]
+        salida.append(f"{len(salida) + 1}\n{tiempos[0]} --> {tiempos[1]}\n" + '\n'.join(cuerpo))
+    return '\n\n'.join(salida) + '\n'
+
+
+def _ingredientes(crudo):
+    """Agrupa los archivos de la carpeta cruda por video: {base: {...}}"""
+    grupos = {}
+
+    def grupo(base):
+        return grupos.setdefault(base, {'flujos': [], 'subtitulos': [], 'miniatura': None,
+                                        'info': None})
+
+    for raiz, _, archivos in os.walk(crudo):
+        for nombre in archivos:
+            ruta = Path(raiz) / nombre
+            sufijo = ruta.suffix.lower()
+            if sufijo in EXTENSIONES_TEMPORALES:
+                continue
+            if nombre.endswith(EXTENSION_INFO):
+                grupo(str(ruta)[:-len(EXTENSION_INFO)])['info'] = ruta
+                continue
+            flujo = _FLUJO.match(str(ruta))
+            if flujo and sufijo not in EXTENSIONES_SUBTITULOS | EXTENSIONES_MINIATURA:
+                grupo(flujo.group('base'))['flujos'].append(ruta)
+            elif sufijo in EXTENSIONES_SUBTITULOS:
+                # <base>.<idioma>.<ext>
+                base, _, idioma = str(ruta.with_suffix('')).rpartition('.')
+                grupo(base)['subtitulos'].append((idioma, ruta))
+            elif sufijo in EXTENSIONES_MINIATURA:
+                grupo(str(ruta.with_suffix('')))['miniatura'] = ruta
+    # Sin flujos no hay nada que postprocesar (p. ej. el info.json de una lista)
+    return {base: g for base, g in grupos.items() if g['flujos']}
+
+
+def _metadatos(info):
+    campos = {
+        'title': info.get('title'),
+        'artist': info.get('artist') or info.get('uploader'),
+        'date': info.get('upload_date'),
+        'description': info.get('description'),
+        'synopsis': info.get('description'),
+        'purl': info.get('webpage_url'),
+        'comment': info.get('webpage_url'),
+    }
+    return [a for clave, valor in campos.items() if valor
+            for a in ("-metadata", f"{clave}={valor}")]
+
+
+def _ordenar_flujos(flujos, info):
+    """El video primero (como en la mezcla de yt-dlp), según info['formats']"""
+    sin_video = {str(f.get('format_id')) for f in info.get('formats') or ()
+                 if f.get('vcodec') == 'none'}
+
+    def clave(flujo):
+        formato = _FLUJO.match(str(flujo)).group('formato')
+        solo_audio = (formato in sin_video
+                      or flujo.suffix[1:].lower() in EXTENSIONES_SOLO_AUDIO)
+        return solo_audio, flujo.name
+
+    return sorted(flujos, key=clave)
+
+
+def _mezclar_con_ffmpeg(ffmpeg, grupo, info, salida, ext, metadatos=True):
+    formato, codec_subtitulos, con_miniatura = _CONTENEDORES[ext]
+    entradas = []
+    mapas = []
+    for i, flujo in enumerate(_ordenar_flujos(grupo['flujos'], info)):
+        entradas += ["-i", str(flujo)]
+        mapas += ["-map", str(i)]
+    n = len(grupo['flujos'])
+    idiomas = []
+    for idioma, subtitulo in grupo['subtitulos']:
+        entradas += ["-i", str(subtitulo)]
+        mapas += ["-map", str(n)]
+        idiomas.append(idioma)
+        n += 1
+    extra = []
+    miniatura = grupo['miniatura'] if con_miniatura else None
+    if miniatura is not None and formato == 'mp4':
+        # La portada es la primera pista de video si el archivo es solo audio
+        pista = "v:0" if ext in EXTENSIONES_SOLO_AUDIO else "v:1"
+        entradas += ["-i", str(miniatura)]
+        mapas += ["-map", str(n)]
+        extra += [f"-c:{pista}", "mjpeg", f"-disposition:{pista}", "attached_pic"]
+    elif miniatura is not None:
+        extra += ["-attach", str(miniatura), "-metadata:s:t", "mimetype=image/"
+                  + {'.jpg': 'jpeg', '.jpeg': 'jpeg'}.get(miniatura.suffix.lower(),
+                                                          miniatura.suffix.lower()[1:])]
+    for i, idioma in enumerate(idiomas):
+        extra += [f"-metadata:s:s:{i}", f"language={_IDIOMAS.get(idioma, idioma)}"]
+    comando = [ffmpeg, "-y", "-nostdin", "-loglevel", "error", *entradas, *mapas,
+               "-c", "copy", "-c:s", codec_subtitulos, *extra,
+               *(_metadatos(info) if metadatos else ()),
+               "-f", formato, str(salida)]
+    resultado = subprocess.run(comando, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                               text=True, errors='replace')
+    if resultado.returncode != 0:
+        raise RuntimeError(f"ffmpeg falló: {resultado.stderr.strip()[-500:]}")
+
+
+def _mover_sin_ffmpeg(grupo, destino_base, avisos):
+    """Sin ffmpeg: los flujos tal cual y los subtítulos como .srt al lado"""
+    rutas = []
+    for flujo in grupo['flujos']:
+        sufijo = flujo.suffix if len(grupo['flujos']) == 1 else \
+            f".f{_FLUJO.match(str(flujo)).group('formato')}{flujo.suffix}"
+        ruta = Path(str(destino_base) + sufijo)
+        os.replace(flujo, ruta)
+        rutas.append(ruta)
+    if len(rutas) > 1:
+        avisos.append("ffmpeg no está instalado: video y audio quedan en archivos separados")
+    for idioma, subtitulo in grupo['subtitulos']:
+        if subtitulo.suffix.lower() == '.vtt':
+            texto = vtt_a_srt(subtitulo.read_text(encoding='utf-8', errors='replace'))
+            Path(f"{destino_base}.{idioma}.srt").write_text(texto, encoding='utf-8')
+        else:
+            os.replace(subtitulo, f"{destino_base}.{idioma}{subtitulo.suffix}")
+    if grupo['miniatura'] is not None:
+        os.replace(grupo['miniatura'], str(destino_base) + grupo['miniatura'].suffix)
+    return rutas
+
+
+def postprocesar(crudo, destino, enviado=None, almacen=None):
+    """Convierte una carpeta cruda en los archivos finales dentro de destino
+
+    Se ejecuta en un proceso del pool. Devuelve {'archivos': [(id, ruta,
+    url_pagina)], 'avisos': [...], 'ahorrado': [(ruta, bytes)], 'cola': s,
+    'segundos': s}; la carpeta cruda se borra si todo fue bien. Con almacen
+    (carpeta del almacén por contenido) los archivos finales se guardan en él.
+    """
+    inicio = time.time()
+    crudo, destino = Path(crudo), Path(destino)
+    ffmpeg = shutil.which("ffmpeg")
+    archivos = []
+    avisos = []
+    grupos = _ingredientes(crudo)
+    if not grupos:
+        raise RuntimeError(f"No hay nada que postprocesar en {crudo}")
+    for base, grupo in grupos.items():
+        info = {}
+        if grupo['info'] is not None:
+            with open(grupo['info'], 'r', encoding='utf-8') as f:
+                info = json.load(f)
+        destino_base = destino / Path(base).relative_to(crudo)
+        destino_base.parent.mkdir(parents=True, exist_ok=True)
+        ext = _extension_salida(grupo['flujos'], grupo['miniatura'])
+        if ffmpeg is None or ext not in _CONTENEDORES:
+            rutas = _mover_sin_ffmpeg(grupo, destino_base, avisos)
+        else:
+            ruta = Path(f"{destino_base}.{ext}")
+            temporal = Path(f"{destino_base}.postproceso.{ext}")
+            try:
+                _mezclar_con_ffmpeg(ffmpeg, grupo, info, temporal, ext,
+                                    metadatos=almacen is None)
+                os.replace(temporal, ruta)
+            finally:
+                if temporal.exists():
+                    temporal.unlink()
+            rutas = [ruta]
+            if grupo['miniatura'] is not None and not _CONTENEDORES[ext][2]:
+                # webm no admite portada: se queda al lado del video
+                os.replace(grupo['miniatura'], str(destino_base) + grupo['miniatura'].suffix)
+        archivos += [(info.get('id'), str(r), info.get('webpage_url')) for r in rutas]
+    ahorrado = _guardar_en_almacen(almacen, [r for _, r, _ in archivos], avisos) if almacen else []
+    shutil.rmtree(crudo, ignore_errors=True)
+    try:
+        crudo.parent.rmdir()  # .crudo, si ya no queda nada pendiente
+    except OSError:
+        pass
+    return {
+        'archivos': archivos,
+        'avisos': avisos,
+        'ahorrado': ahorrado,
+        'cola': inicio - enviado if enviado is not None else 0.0,
+        'segundos': time.time() - inicio,
+    }
+
+
+def _guardar_en_almacen(raiz, rutas, avisos):
+    from almacen_contenido import AlmacenContenido
+
+    almacen = AlmacenContenido(raiz)
+    ahorrado = []
+    for ruta in rutas:
+        try:
+            ahorrado.append((ruta, almacen.guardar(ruta)))
+        except OSError as e:
+            avisos.append(f"No se pudo guardar en el almacén {Path(ruta).name}: {e}")
+    return ahorrado
+
+
+class TuberiaPostproceso:
+    """Pool de procesos para el postproceso con cola acotada y tiempos por etapa
+
+    procesos: tamaño del pool (por defecto, los núcleos).
+    en_espera: carpetas crudas que pueden esperar en cola además de las
+    que se están procesando; con la cola llena, enviar() bloquea.
+    almacen: carpeta del almacén por contenido donde guardar lo terminado.
+    """
+
+    def __init__(self, procesos=None, en_espera=None, almacen=None):
+        self.almacen = str(almacen) if almacen is not None else None
+        self.procesos = max(1, procesos or os.cpu_count() or 1)
+        self.en_espera = self.procesos * 2 if en_espera is None else max(0, en_espera)
+        self._huecos = threading.BoundedSemaphore(self.procesos + self.en_espera)
+        self._cerrojo = threading.Lock()
+        self._terminado = threading.Condition(self._cerrojo)
+        self._ejecutor = None
+        self._pendientes = set()
+        # Etapa: [número, segundos]
+        self.tiempos = {'red': [0, 0.0], 'contrapresion': [0, 0.0],
+                        'cola': [0, 0.0], 'postproceso': [0, 0.0]}
+
+    def _anotar(self, etapa, segundos):
+        with self._cerrojo:
+            self.tiempos[etapa][0] += 1
+            self.tiempos[etapa][1] += segundos
+
+    def registrar_red(self, segundos):
+        """Anota lo que tardó la etapa de red de un video"""
+        self._anotar('red', segundos)
+
+    @staticmethod
+    def directorio_crudo(directorio, url):
+        """Carpeta de trabajo de una URL: la misma en cada intento, para
+        que un reintento continúe los .part en lugar de empezar de cero"""
+        import hashlib
+
+        clave = hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+        return Path(directorio) / DIRECTORIO_CRUDO / clave
+
+    def _ejecutor_activo(self):
+        with self._cerrojo:
+            if self._ejecutor is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                # spawn: los trabajadores no heredan hilos ni cerrojos a medias
+                self._ejecutor = ProcessPoolExecutor(
+                    max_workers=self.procesos,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._ejecutor
+
+    def enviar(self, crudo, destino, cancelar=None, al_terminar=None):
+        """Encola el postproceso de una carpeta cruda; devuelve el Future
+
+        Bloquea mientras la cola esté llena. Devuelve None si `cancelar`
+        (threading.Event) se activa durante la espera. al_terminar(futuro)
+        se llama al acabar, antes de que esperar() lo dé por terminado.
+        """
+        espera = time.monotonic()
+        if not self._huecos.acquire(blocking=False):
+            print("⏳ El postproceso va por detrás: esperando hueco en la cola...")
+            while not self._huecos.acquire(timeout=0.5):
+                if cancelar is not None and cancelar.is_set():
+                    return None
+        self._anotar('contrapresion', time.monotonic() - espera)
+        try:
+            futuro = self._ejecutor_activo().submit(postprocesar, str(crudo), str(destino),
+                                                    time.time(), self.almacen)
+        except Exception:
+            self._huecos.release()
+            raise
+        with self._cerrojo:
+            self._pendientes.add(futuro)
+        futuro.add_done_callback(lambda f: self._al_terminar(f, al_terminar))
+        return futuro
+
+    def _al_terminar(self, futuro, al_terminar):
+        self._huecos.release()
+        if not futuro.cancelled() and futuro.exception() is None:
+            resultado = futuro.result()
+            self._anotar('cola', resultado['cola'])
+            self._anotar('postproceso', resultado['segundos'])
+        try:
+            if al_terminar is not None:
+                al_terminar(futuro)
+        finally:
+            with self._terminado:
+                self._pendientes.discard(futuro)
+                self._terminado.notify_all()
+
+    def esperar(self):
+        """Espera a que termine todo lo encolado (y sus al_terminar)"""
+        with self._terminado:
+            if self._pendientes:
+                print(f"⏳ Terminando {len(self._pendientes)} postproceso(s)...")
+            while self._pendientes:
+                self._terminado.wait()
+
+    def cerrar(self, cancelar_pendientes=False):
+        """Apaga el pool; con cancelar_pendientes, lo que aún no empezó se descarta"""
+        with self._cerrojo:
+            ejecutor, self._ejecutor = self._ejecutor, None
+        if ejecutor is not None:
+            ejecutor.shutdown(wait=True, cancel_futures=cancelar_pendientes)
+
+    def mostrar_resumen(self):
+        """Tiempo total de cada etapa (solo si se usó la tubería)"""
+        with self._cerrojo:
+            tiempos = {etapa: tuple(valores) for etapa, valores in self.tiempos.items()}
+        if not tiempos['postproceso'][0] and not tiempos['red'][0]:
+            return
+        print(f"⏱️  Red: {tiempos['red'][0]} video(s), {tiempos['red'][1]:.1f}s · "
+              f"Postproceso: {tiempos['postproceso'][0]} en {self.procesos} proceso(s), "
+              f"{tiempos['postproceso'][1]:.1f}s (en cola {tiempos['cola'][1]:.1f}s)")
+        if tiempos['contrapresion'][1] >= 0.1:
+            print(f"   Las descargas esperaron {tiempos['contrapresion'][1]:.1f}s "
+                  f"a que el postproceso tuviera hueco")
@@ -0,0 +1,797 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+servicio.py - Servicio de descargas en segundo plano con API HTTP local
+Un solo proceso mantiene caliente el DescargadorVideos (cachés, índice,
+estadísticas y, si está disponible, yt-dlp cargado en proceso) y un pool de
+trabajadores. Los trabajos llegan por HTTP en 127.0.0.1 y la cola se guarda
+en SQLite: si el servicio se reinicia, lo pendiente y lo que estaba a medias
+vuelve a la cola (el .part se conserva y la descarga continúa).
+
+Uso como comando:
+    python servicio.py iniciar [-j 3] [--puerto 8642] [--limite-banda 4M]
+    python servicio.py enviar URL [URL ...] [--prioridad 2]
+    python servicio.py lista [--estado pendiente]
+    python servicio.py estado ID
+    python servicio.py cancelar ID
+    python servicio.py eventos [ID]
+
+API (JSON, con "Authorization: Bearer <clave>"; la clave está en
+~/Descargas/.servicio.clave, solo legible por el usuario, y los subcomandos
+la envían solos):
+    POST   /trabajos              {"url": "...", "prioridad": 1} -> trabajo
+    GET    /trabajos[?estado=X]   -> lista de trabajos
+    GET    /trabajos/ID           -> trabajo
+    DELETE /trabajos/ID           -> cancela el trabajo (pendiente o en curso)
+    GET    /eventos[?trabajo=ID]  -> text/event-stream con el progreso y los
+                                     cambios de estado
+
+Una página web abierta en el navegador puede enviar peticiones a 127.0.0.1:
+por eso se rechazan las que traen cabecera Origin, las de un Host que no
+sea 127.0.0.1 o localhost (DNS rebinding), los POST que no son
+application/json y las que no llevan la clave.
+"""
+
+import argparse
+import hmac
+import http.server
+import json
+import os
+import queue
+import secrets
+import signal
+import sqlite3
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from pathlib import Path
+
+from core import (
+    BACKEND_EN_PROCESO,
+    SALIDA_DEPENDENCIAS,
+    SALIDA_EXITO,
+    SALIDA_FALLOS,
+    SALIDA_USO,
+    DependenciaError,
+    ValidacionError,
+    agregar_opciones_comunes,
+    aplicar_opciones_comunes,
+    cancelacion_hilo,
+    capturar_salida_hilo,
+    configurar_backend_ytdlp,
+    detectar_plataforma,
+    formatear_titulo_seccion,
+    postproceso_diferido_hilo,
+    prioridad_hilo,
+    trabajo_hilo,
+    trabajo_hilo_actual,
+    validar_archivo_cookies,
+    validar_url,
+    verificar_dependencias,
+    REGISTRO_PLATAFORMAS,
+)
+from diario_lotes import EN_CURSO, FALLIDO, HECHO, PENDIENTE
+from eventos_progreso import BUS_PROGRESO, INICIO, PROGRESO, FIN, ERROR
+
+
+CANCELADO = "cancelado"
+ESTADOS = (PENDIENTE, EN_CURSO, HECHO, FALLIDO, CANCELADO)
+
+PUERTO_POR_DEFECTO = 8642
+INTERVALO_PROGRESO = 0.5      # progreso enviado por trabajo a los oyentes (segundos)
+LATIDO_EVENTOS = 15.0         # comentario SSE para mantener viva la conexión
+MAX_EVENTOS_EN_COLA = 1000    # por oyente; a un oyente lento se le descartan
+
+
+def ruta_cola_por_defecto():
+    return Path.home() / "Descargas" / ".servicio.sqlite3"
+
+
+def ruta_clave_por_defecto():
+    return Path.home() / "Descargas" / ".servicio.clave"
+
+
+def cargar_clave(ruta=None, crear=False):
+    """Clave de acceso a la API, guardada en un archivo con permisos 0600
+
+    Con crear=True (al iniciar el servicio) se genera si no existe.
+    """
+    ruta = Path(ruta or ruta_clave_por_defecto()).expanduser()
+    try:
+        clave = ruta.read_text(encoding='utf-8').strip()
+    except FileNotFoundError:
+        clave = ""
+    if clave or not crear:
+        if not clave:
+            raise ValidacionError(
+                f"❌ No se encuentra la clave del servicio en {ruta}\n"
+                "   Se crea al arrancarlo con: python servicio.py iniciar"
+            )
+        return clave
+
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    clave = secrets.token_urlsafe(32)
+    descriptor = os.open(ruta, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(descriptor, 'w', encoding='utf-8') as f:
+        f.write(clave + "\n")
+    return clave
+
+
+class ColaTrabajos:
+    """Cola persistente de trabajos (SQLite)
+
+    Cada trabajo guarda su plataforma para que el servicio respete los
+    topes de descargas simultáneas por plataforma al elegir el siguiente.
+    """
+
+    _COLUMNAS = ("id", "url", "plataforma", "estado", "prioridad", "creado",
+                 "actualizado", "intentos", "error", "ruta")
+
+    def __init__(self, ruta=None):
+        self.ruta = Path(ruta or ruta_cola_por_defecto()).expanduser()
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        self._cerrojo = threading.Lock()
+        self._conexion = sqlite3.connect(str(self.ruta), check_same_thread=False, timeout=30)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.executescript("""
+            CREATE TABLE IF NOT EXISTS trabajos (
+                id TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                plataforma TEXT NOT NULL,
+                estado TEXT NOT NULL,
+                prioridad REAL NOT NULL,
+                creado REAL NOT NULL,
+                actualizado REAL NOT NULL,
+                intentos INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                ruta TEXT
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS trabajos_por_estado
+                ON trabajos (estado, prioridad, creado);
+        """)
+        self._conexion.commit()
+
+    def _fila(self, fila):
+        return dict(zip(self._COLUMNAS, fila)) if fila else None
+
+    def cerrar(self):
+        with self._cerrojo:
+            self._conexion.close()
+
+    def recuperar(self):
+        """Tras un reinicio, lo que estaba en curso vuelve a estar pendiente"""
+        with self._cerrojo:
+            cursor = self._conexion.execute(
+                "UPDATE trabajos SET estado = ?, actualizado = ? WHERE estado = ?",
+                (PENDIENTE, time.time(), EN_CURSO)
+            )
+            self._conexion.commit()
+            return cursor.rowcount
+
+    def agregar(self, url, prioridad=1.0):
+        ahora = time.time()
+        trabajo = {
+            "id": uuid.uuid4().hex[:12], "url": url, "plataforma": detectar_plataforma(url),
+            "estado": PENDIENTE, "prioridad": float(prioridad), "creado": ahora,
+            "actualizado": ahora, "intentos": 0, "error": None, "ruta": None,
+        }
+        with self._cerrojo:
+            self._conexion.execute(
+                f"INSERT INTO trabajos VALUES ({', '.join('?' * len(self._COLUMNAS))})",
+                tuple(trabajo[c] for c in self._COLUMNAS)
+            )
+            self._conexion.commit()
+        return trabajo
+
+    def obtener(self, identificador):
+        with self._cerrojo:
+            return self._fila(self._conexion.execute(
+                f"SELECT {', '.join(self._COLUMNAS)} FROM trabajos WHERE id = ?",
+                (identificador,)
+            ).fetchone())
+
+    def listar(self, estado=None, limite=1000):
+        consulta = f"SELECT {', '.join(self._COLUMNAS)} FROM trabajos"
+        parametros = []
+        if estado:
+            consulta += " WHERE estado = ?"
+            parametros.append(estado)
+        consulta += " ORDER BY creado DESC LIMIT ?"
+        parametros.append(limite)
+        with self._cerrojo:
+            return [self._fila(f) for f in self._conexion.execute(consulta, parametros)]
+
+    def tomar(self, plataformas_llenas=()):
+        """Pasa a en_curso el pendiente más prioritario (y antiguo) con hueco"""
+        excluidas = tuple(plataformas_llenas)
+        filtro = (f" AND plataforma NOT IN ({', '.join('?' * len(excluidas))})"
+                  if excluidas else "")
+        with self._cerrojo:
+            fila = self._conexion.execute(
+                f"SELECT {', '.join(self._COLUMNAS)} FROM trabajos WHERE estado = ?{filtro} "
+                "ORDER BY prioridad DESC, creado LIMIT 1",
+                (PENDIENTE,) + excluidas
+            ).fetchone()
+            if fila is None:
+                return None
+            trabajo = self._fila(fila)
+            trabajo.update(estado=EN_CURSO, intentos=trabajo["intentos"] + 1,
+                           actualizado=time.time())
+            self._conexion.execute(
+                "UPDATE trabajos SET estado = ?, intentos = ?, actualizado = ? WHERE id = ?",
+                (EN_CURSO, trabajo["intentos"], trabajo["actualizado"], trabajo["id"])
+            )
+            self._conexion.commit()
+            return trabajo
+
+    def marcar(self, identificador, estado, error=None, ruta=None, solo_si=None):
+        """Cambia el estado; con solo_si, únicamente si el actual es ese"""
+        consulta = "UPDATE trabajos SET estado = ?, error = ?, ruta = ?, actualizado = ? WHERE id = ?"
+        parametros = [estado, error[:500] if error else None, ruta, time.time(), identificador]
+        if solo_si is not None:
+            consulta += " AND estado = ?"
+            parametros.append(solo_si)
+        with self._cerrojo:
+            cambiado = self._conexion.execute(consulta, parametros).rowcount
+            self._conexion.commit()
+        return bool(cambiado)
+
+
+class ServicioDescargas:
+    """Pool de trabajadores que consume la cola con un único descargador
+
+    Los eventos de progreso de BUS_PROGRESO y los cambios de estado se
+    reenvían a los oyentes (conexiones de /eventos) con el id del trabajo.
+    """
+
+    def __init__(self, descargador, cola, trabajadores=3):
+        if trabajadores < 1:
+            raise ValidacionError("❌ El servicio necesita al menos un trabajador")
+        self.descargador = descargador
+        self.cola = cola
+        self.trabajadores = trabajadores
+        self._condicion = threading.Condition()
+        self._activos_por_plataforma = {}
+        self._cancelaciones = {}          # id de trabajo en curso -> Event
+        self._ejecuciones = {}            # trabajo de yt-dlp (evento) -> id de trabajo
+        self._ultimo_progreso = {}
+        self._oyentes = []
+        self._cerrojo_oyentes = threading.Lock()
+        self._hilos = []
+        self.detenido = threading.Event()
+
+    # --- trabajadores ---
+
+    def iniciar(self):
+        recuperados = self.cola.recuperar()
+        if recuperados:
+            print(f"♻️  {recuperados} trabajos interrumpidos vuelven a la cola")
+        BUS_PROGRESO.suscribir(self._al_evento)
+        for numero in range(self.trabajadores):
+            hilo = threading.Thread(target=self._trabajador, daemon=True,
+                                    name=f"servicio-{numero + 1}")
+            self._hilos.append(hilo)
+            hilo.start()
+
+    def detener(self):
+        """Detiene los trabajadores; lo que estaba en curso queda pendiente"""
+        self.detenido.set()
+        with self._condicion:
+            for evento in self._cancelaciones.values():
+                evento.set()
+            self._condicion.notify_all()
+        for hilo in self._hilos:
+            hilo.join(timeout=30)
+        # Lo que espera al postproceso vuelve a pendiente; lo que ya se procesa, termina
+        self.descargador.esperar_postproceso(cancelar=True)
+        BUS_PROGRESO.desuscribir(self._al_evento)
+        with self._cerrojo_oyentes:
+            for oyente in self._oyentes:
+                oyente.put(None)
+
+    def _plataformas_llenas(self):
+        return [plataforma for plataforma, activos in self._activos_por_plataforma.items()
+                if activos >= self._limite_de(plataforma)]
+
+    def _limite_de(self, plataforma):
+        limite = REGISTRO_PLATAFORMAS.perfil(plataforma).limite_concurrencia
+        return max(1, min(limite or self.trabajadores, self.trabajadores))
+
+    def _siguiente(self):
+        with self._condicion:
+            while not self.detenido.is_set():
+                trabajo = self.cola.tomar(self._plataformas_llenas())
+                if trabajo is not None:
+                    plataforma = trabajo["plataforma"]
+                    self._activos_por_plataforma[plataforma] = \
+                        self._activos_por_plataforma.get(plataforma, 0) + 1
+                    self._cancelaciones[trabajo["id"]] = threading.Event()
+                    return trabajo
+                self._condicion.wait()
+        return None
+
+    def _trabajador(self):
+        while True:
+            trabajo = self._siguiente()
+            if trabajo is None:
+                return
+            self._notificar_estado(trabajo)
+            try:
+                self._ejecutar(trabajo)
+            finally:
+                with self._condicion:
+                    self._activos_por_plataforma[trabajo["plataforma"]] -= 1
+                    self._cancelaciones.pop(trabajo["id"], None)
+                    self._condicion.notify_all()
+
+    def _ejecutar(self, trabajo):
+        identificador = trabajo["id"]
+        cancelar = self._cancelaciones[identificador]
+        error = None
+        # El postproceso no ocupa al trabajador: el trabajo se cierra al acabar
+        continuar = lambda exito: self._terminar(
+            trabajo, cancelar, exito, None if exito else "Falló el postproceso")
+        with capturar_salida_hilo(), cancelacion_hilo(cancelar), \
+                trabajo_hilo(identificador), prioridad_hilo(trabajo["prioridad"]), \
+                postproceso_diferido_hilo(continuar) as diferidos:
+            try:
+                exito = self.descargador.descargar_video(trabajo["url"])
+            except Exception as e:
+                exito, error = False, str(e)
+            if not exito and error is None:
+                error = self.descargador._ultimo_error()
+        if not diferidos:
+            self._terminar(trabajo, cancelar, exito, error)
+
+    def _terminar(self, trabajo, cancelar, exito, error):
+        """Anota el estado final de un trabajo (exito None: postproceso cancelado)"""
+        identificador = trabajo["id"]
+        if exito is None or (self.detenido.is_set() and cancelar.is_set()):
+            # Apagado del servicio: se retoma en el próximo arranque
+            estado, error = PENDIENTE, None
+        elif cancelar.is_set():
+            estado, error = CANCELADO, None
+        else:
+            estado = HECHO if exito else FALLIDO
+        entrada = self.descargador.buscar_descargado(trabajo["url"]) if exito else None
+        ruta = entrada["ruta"] if entrada else None
+        self.cola.marcar(identificador, estado, error, ruta)
+        trabajo.update(estado=estado, error=error, ruta=ruta)
+        self._notificar_estado(trabajo)
+        icono = {HECHO: "✅", FALLIDO: "❌", CANCELADO: "⏹️ ", PENDIENTE: "⏸️ "}[estado]
+        print(f"{icono} [{identificador}] {trabajo['url']}"
+              + (f" -> {ruta}" if ruta else "") + (f" ({error})" if error else ""))
+
+    # --- API ---
+
+    def enviar(self, url, prioridad=1.0):
+        url = validar_url(url)
+        if prioridad <= 0:
+            raise ValidacionError("❌ La prioridad debe ser mayor que 0")
+        trabajo = self.cola.agregar(url, prioridad)
+        self._notificar_estado(trabajo)
+        with self._condicion:
+            self._condicion.notify()
+        return trabajo
+
+    def cancelar(self, identificador):
+        """Cancela un trabajo; devuelve el trabajo o None si no existe"""
+        if self.cola.marcar(identificador, CANCELADO, solo_si=PENDIENTE):
+            trabajo = self.cola.obtener(identificador)
+            self._notificar_estado(trabajo)
+            return trabajo
+        with self._condicion:
+            evento = self._cancelaciones.get(identificador)
+            if evento is not None:
+                evento.set()
+        return self.cola.obtener(identificador)
+
+    # --- eventos ---
+
+    def escuchar(self, identificador=None):
+        """Registra un oyente y devuelve (cola de eventos, filtro)"""
+        oyente = queue.Queue(maxsize=MAX_EVENTOS_EN_COLA)
+        oyente.filtro = identificador
+        with self._cerrojo_oyentes:
+            self._oyentes.append(oyente)
+        return oyente
+
+    def dejar_de_escuchar(self, oyente):
+        with self._cerrojo_oyentes:
+            if oyente in self._oyentes:
+                self._oyentes.remove(oyente)
+
+    def _difundir(self, datos):
+        with self._cerrojo_oyentes:
+            for oyente in self._oyentes:
+                if oyente.filtro not in (None, datos["id"]):
+                    continue
+                try:
+                    oyente.put_nowait(datos)
+                except queue.Full:
+                    pass   # oyente que no lee: pierde eventos, no frena descargas
+
+    def _notificar_estado(self, trabajo):
+        self._difundir(dict(trabajo, tipo="estado"))
+
+    def _al_evento(self, evento):
+        # El inicio se publica en el hilo que descarga (o en un corredor de la
+        # carrera, que hereda el trabajo): ahí se asocia la ejecución al trabajo
+        if evento.tipo == INICIO:
+            identificador = trabajo_hilo_actual()
+            if identificador is None:
+                return
+            self._ejecuciones[evento.trabajo] = identificador
+        else:
+            identificador = self._ejecuciones.get(evento.trabajo)
+            if identificador is None:
+                return
+        if evento.tipo in (FIN, ERROR):
+            self._ejecuciones.pop(evento.trabajo, None)
+            self._ultimo_progreso.pop(evento.trabajo, None)
+        elif evento.tipo == PROGRESO and evento.estado != 'finished':
+            ahora = time.monotonic()
+            if ahora - self._ultimo_progreso.get(evento.trabajo, float('-inf')) < INTERVALO_PROGRESO:
+                return
+            self._ultimo_progreso[evento.trabajo] = ahora
+        datos = evento.a_dict()
+        datos["id"] = identificador
+        self._difundir(datos)
+
+
+class _ManejadorAPI(http.server.BaseHTTPRequestHandler):
+    """Peticiones HTTP del servicio (solo se escucha en 127.0.0.1)"""
+
+    servicio = None
+    clave = None
+
+    def _responder(self, codigo, datos):
+        cuerpo = json.dumps(datos, ensure_ascii=False).encode('utf-8')
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _rechazo(self, metodo):
+        """(código, mensaje) si la petición no viene de un cliente local legítimo"""
+        if self.headers.get("Origin") is not None:
+            return 403, "Peticiones desde un navegador no permitidas"
+        puerto = self.server.server_address[1]
+        if self.headers.get("Host") not in (f"127.0.0.1:{puerto}", f"localhost:{puerto}"):
+            return 403, "Host no permitido"
+        autorizacion = self.headers.get("Authorization") or ""
+        if not hmac.compare_digest(autorizacion.encode('utf-8'),
+                                   f"Bearer {self.clave}".encode('utf-8')):
+            return 401, "Falta la clave del servicio o no es válida"
+        tipo = (self.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+        if metodo == "POST" and tipo != "application/json":
+            return 415, "Se esperaba Content-Type: application/json"
+        return None
+
+    def _admitir(self, metodo):
+        rechazo = self._rechazo(metodo)
+        if rechazo is not None:
+            self._responder(rechazo[0], {"error": rechazo[1]})
+            return False
+        return True
+
+    def _ruta(self):
+        partes = urllib.parse.urlsplit(self.path)
+        consulta = dict(urllib.parse.parse_qsl(partes.query))
+        return [p for p in partes.path.split("/") if p], consulta
+
+    def do_GET(self):
+        if not self._admitir("GET"):
+            return
+        ruta, consulta = self._ruta()
+        if ruta == ["trabajos"]:
+            estado = consulta.get("estado")
+            if estado and estado not in ESTADOS:
+                return self._responder(400, {"error": f"Estado desconocido: {estado}"})
+            return self._responder(200, self.servicio.cola.listar(estado))
+        if len(ruta) == 2 and ruta[0] == "trabajos":
+            trabajo = self.servicio.cola.obtener(ruta[1])
+            if trabajo is None:
+                return self._responder(404, {"error": "Trabajo no encontrado"})
+            return self._responder(200, trabajo)
+        if ruta == ["eventos"]:
+            return self._eventos(consulta.get("trabajo"))
+        self._responder(404, {"error": "Ruta desconocida"})
+
+    def do_POST(self):
+        if not self._admitir("POST"):
+            return
+        ruta, _ = self._ruta()
+        if ruta != ["trabajos"]:
+            return self._responder(404, {"error": "Ruta desconocida"})
+        try:
+            longitud = int(self.headers.get("Content-Length") or 0)
+            datos = json.loads(self.rfile.read(longitud) or b"{}")
+            trabajo = self.servicio.enviar(datos.get("url"), float(datos.get("prioridad", 1.0)))
+        except (ValueError, TypeError, AttributeError):
+            return self._responder(400, {"error": 'Se esperaba {"url": "...", "prioridad": 1}'})
+        except ValidacionError as e:
+            return self._responder(400, {"error": str(e)})
+        self._responder(201, trabajo)
+
+    def do_DELETE(self):
+        if not self._admitir("DELETE"):
+            return
+        ruta, _ = self._ruta()
+        if len(ruta) != 2 or ruta[0] != "trabajos":
+            return self._responder(404, {"error": "Ruta desconocida"})
+        trabajo = self.servicio.cancelar(ruta[1])
+        if trabajo is None:
+            return self._responder(404, {"error": "Trabajo no encontrado"})
+        self._responder(200, trabajo)
+
+    def _eventos(self, identificador):
+        """Server-Sent Events: una línea 'data: {json}' por evento"""
+        oyente = self.servicio.escuchar(identificador)
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            while True:
+                try:
+                    datos = oyente.get(timeout=LATIDO_EVENTOS)
+                except queue.Empty:
+                    self.wfile.write(b": latido\n\n")
+                    self.wfile.flush()
+                    continue
+                if datos is None:
+                    return
+                linea = json.dumps(datos, ensure_ascii=False)
+                self.wfile.write(f"data: {linea}\n\n".encode('utf-8'))
+                self.wfile.flush()
+        except (ConnectionError, OSError):
+            pass   # el cliente cerró la conexión
+        finally:
+            self.servicio.dejar_de_escuchar(oyente)
+
+    def log_message(self, *args):
+        pass
+
+
+def crear_servidor(servicio, clave, puerto=PUERTO_POR_DEFECTO, anfitrion="127.0.0.1"):
+    """Servidor HTTP de la API atado a `servicio` (serve_forever para atenderlo)
+
+    Solo atiende peticiones con "Authorization: Bearer <clave>".
+    """
+    manejador = type("ManejadorAPI", (_ManejadorAPI,), {"servicio": servicio, "clave": clave})
+    servidor = http.server.ThreadingHTTPServer((anfitrion, puerto), manejador)
+    servidor.daemon_threads = True
+    return servidor
+
+
+class ClienteServicio:
+    """Cliente mínimo de la API para scripts y para los subcomandos"""
+
+    def __init__(self, puerto=PUERTO_POR_DEFECTO, anfitrion="127.0.0.1", tiempo_limite=10,
+                 clave=None):
+        self.base = f"http://{anfitrion}:{puerto}"
+        self.tiempo_limite = tiempo_limite
+        self.cabeceras = {"Authorization": f"Bearer {clave or cargar_clave()}"}
+
+    def _pedir(self, metodo, ruta, datos=None):
+        cuerpo = json.dumps(datos).encode('utf-8') if datos is not None else None
+        cabeceras = dict(self.cabeceras)
+        if cuerpo:
+            cabeceras["Content-Type"] = "application/json"
+        peticion = urllib.request.Request(
+            self.base + ruta, data=cuerpo, method=metodo, headers=cabeceras
+        )
+        try:
+            with urllib.request.urlopen(peticion, timeout=self.tiempo_limite) as respuesta:
+                return json.loads(respuesta.read())
+        except urllib.error.HTTPError as e:
+            try:
+                mensaje = json.loads(e.read()).get("error", str(e))
+            except ValueError:
+                mensaje = str(e)
+            raise ValidacionError(mensaje if mensaje.startswith("❌") else f"❌ {mensaje}")
+        except (urllib.error.URLError, OSError) as e:
+            raise DependenciaError(
+                f"❌ No se pudo contactar con el servicio en {self.base}: {e}\n"
+                "   Arráncalo con: python servicio.py iniciar"
+            )
+
+    def enviar(self, url, prioridad=1.0):
+        return self._pedir("POST", "/trabajos", {"url": url, "prioridad": prioridad})
+
+    def lista(self, estado=None):
+        consulta = f"?{urllib.parse.urlencode({'estado': estado})}" if estado else ""
+        return self._pedir("GET", "/trabajos" + consulta)
+
+    def estado(self, identificador):
+        return self._pedir("GET", f"/trabajos/{urllib.parse.quote(identificador)}")
+
+    def cancelar(self, identificador):
+        return self._pedir("DELETE", f"/trabajos/{urllib.parse.quote(identificador)}")
+
+    def eventos(self, identificador=None):
+        """Generador de eventos (dicts) hasta que el servicio cierre la conexión"""
+        consulta = f"?{urllib.parse.urlencode({'trabajo': identificador})}" if identificador else ""
+        peticion = urllib.request.Request(self.base + "/eventos" + consulta,
+                                          headers=self.cabeceras)
+        try:
+            respuesta = urllib.request.urlopen(peticion)
+        except (urllib.error.URLError, OSError) as e:
+            raise DependenciaError(f"❌ No se pudo contactar con el servicio en {self.base}: {e}")
+        with respuesta:
+            for linea in respuesta:
+                if linea.startswith(b"data: "):
+                    yield json.loads(linea[6:])
+
+
+def _mostrar_trabajo(trabajo):
+    iconos = {PENDIENTE: "⏳", EN_CURSO: "📥", HECHO: "✅", FALLIDO: "❌", CANCELADO: "⏹️ "}
+    print(f"{iconos.get(trabajo['estado'], '•')} {trabajo['id']}  {trabajo['estado']:<10} "
+          f"{trabajo['url']}")
+    if trabajo.get("ruta"):
+        print(f"   📁 {trabajo['ruta']}")
+    if trabajo.get("error"):
+        print(f"   ⚠️  {trabajo['error']}")
+
+
+def _mostrar_evento(datos):
+    if datos["tipo"] == "estado":
+        _mostrar_trabajo(datos)
+    elif datos["tipo"] == PROGRESO and datos.get("total") and datos.get("descargados"):
+        porcentaje = 100 * datos["descargados"] / datos["total"]
+        print(f"   [{datos['id']}] {porcentaje:5.1f}% {datos.get('archivo') or ''}")
+
+
+def _interrumpir(numero, marco):
+    raise KeyboardInterrupt
+
+
+def iniciar_servicio(args):
+    from descargar_videos import DescargadorVideos
+
+    registro = aplicar_opciones_comunes(args)
+    archivo_cookies = validar_archivo_cookies(args.cookies) if args.cookies else None
+    if not verificar_dependencias(instalar=False):
+        return SALIDA_DEPENDENCIAS
+    backend = args.backend
+    if backend is None:
+        # Caliente de verdad: yt-dlp cargado una vez en este proceso
+        try:
+            backend = configurar_backend_ytdlp(BACKEND_EN_PROCESO)
+        except DependenciaError:
+            backend = None
+    descargador = DescargadorVideos(
+        backend=backend,
+        usar_cache=not args.sin_cache,
+        modo_carrera=args.carrera,
+        usar_archivo=not args.sin_archivo,
+        aprender_orden=not args.orden_fijo,
+        directorio=args.directorio,
+        plantilla=args.plantilla,
+        autoajustar=not args.sin_autoajuste,
+        procesos_postproceso=args.procesos_postproceso,
+        almacen=args.almacen,
+        disposicion=args.disposicion,
+        usar_catalogo=not args.sin_catalogo,
+    )
+    descargador.archivo_cookies = archivo_cookies
+
+    cola = ColaTrabajos(args.cola)
+    servicio = ServicioDescargas(descargador, cola, args.trabajadores)
+    try:
+        servidor = crear_servidor(servicio, cargar_clave(crear=True), args.puerto)
+    except OSError as e:
+        raise ValidacionError(f"❌ No se puede escuchar en el puerto {args.puerto}: {e}")
+
+    print(formatear_titulo_seccion("🛰️  SERVICIO DE DESCARGAS"))
+    print(f"🌐 API: http://127.0.0.1:{servidor.server_address[1]}")
+    print(f"⚡ Trabajadores: {args.trabajadores}")
+    print(f"🗃️  Cola: {cola.ruta}")
+    print(f"🔑 Clave de la API: {ruta_clave_por_defecto()}")
+    servicio.iniciar()
+    # En contenedores y con systemd la parada llega como SIGTERM
+    signal.signal(signal.SIGTERM, _interrumpir)
+    try:
+        servidor.serve_forever(poll_interval=0.5)
+    except KeyboardInterrupt:
+        print("\n⏹️  Deteniendo el servicio (lo que esté a medias seguirá en la cola)...")
+    finally:
+        servidor.server_close()
+        servicio.detener()
+        cola.cerrar()
+        if registro is not None:
+            BUS_PROGRESO.desuscribir(registro)
+            registro.cerrar()
+    return SALIDA_EXITO
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(
+        prog="servicio.py",
+        description="Servicio de descargas en segundo plano con API HTTP local",
+    )
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_iniciar = sub.add_parser("iniciar", help="Arranca el servicio (Ctrl-C para detenerlo)")
+    p_iniciar.add_argument("-j", "--trabajadores", type=int, default=3,
+                           help="Descargas simultáneas (por defecto 3)")
+    p_iniciar.add_argument("--puerto", type=int, default=PUERTO_POR_DEFECTO)
+    p_iniciar.add_argument("--cola", help="Base de datos de la cola (por defecto ~/Descargas)")
+    p_iniciar.add_argument("-d", "--directorio", help="Carpeta de descarga")
+    p_iniciar.add_argument("-o", "--plantilla", help="Nombre de archivo de yt-dlp")
+    p_iniciar.add_argument("-c", "--cookies", help="Archivo de cookies (formato Netscape)")
+    p_iniciar.add_argument("--procesos-postproceso", type=int, metavar="N",
+                           help="Procesos para mezclar e incrustar con ffmpeg aparte de las "
+                                "descargas (por defecto, los núcleos; 0 = dentro de cada descarga)")
+    agregar_opciones_comunes(p_iniciar, salida_json=False)
+
+    p_enviar = sub.add_parser("enviar", help="Añade URLs a la cola")
+    p_enviar.add_argument("urls", nargs="+", metavar="URL")
+    p_enviar.add_argument("--prioridad", type=float, default=1.0,
+                          help="Más alta, antes sale y más ancho de banda recibe")
+
+    p_lista = sub.add_parser("lista", help="Muestra los trabajos")
+    p_lista.add_argument("--estado", choices=ESTADOS)
+
+    p_estado = sub.add_parser("estado", help="Muestra un trabajo")
+    p_estado.add_argument("id")
+
+    p_cancelar = sub.add_parser("cancelar", help="Cancela un trabajo")
+    p_cancelar.add_argument("id")
+
+    p_eventos = sub.add_parser("eventos", help="Sigue el progreso en directo")
+    p_eventos.add_argument("id", nargs="?")
+
+    for sub_parser in (p_enviar, p_lista, p_estado, p_cancelar, p_eventos):
+        sub_parser.add_argument("--puerto", type=int, default=PUERTO_POR_DEFECTO)
+        sub_parser.add_argument("--json", action="store_true", help="Respuesta en JSON")
+    return parser
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    try:
+        if args.comando == "iniciar":
+            return iniciar_servicio(args)
+
+        cliente = ClienteServicio(args.puerto)
+        mostrar = ((lambda datos: print(json.dumps(datos, ensure_ascii=False)))
+                   if args.json else None)
+        if args.comando == "enviar":
+            for url in args.urls:
+                (mostrar or _mostrar_trabajo)(cliente.enviar(url, args.prioridad))
+        elif args.comando == "lista":
+            trabajos = cliente.lista(args.estado)
+            if mostrar:
+                mostrar(trabajos)
+            for trabajo in ([] if mostrar else trabajos):
+                _mostrar_trabajo(trabajo)
+        elif args.comando == "estado":
+            (mostrar or _mostrar_trabajo)(cliente.estado(args.id))
+        elif args.comando == "cancelar":
+            (mostrar or _mostrar_trabajo)(cliente.cancelar(args.id))
+        elif args.comando == "eventos":
+            for datos in cliente.eventos(args.id):
+                (mostrar or _mostrar_evento)(datos)
+                if (args.id and datos["tipo"] == "estado"
+                        and datos["estado"] in (HECHO, FALLIDO, CANCELADO)):
+                    return SALIDA_EXITO if datos["estado"] == HECHO else SALIDA_FALLOS
+        return SALIDA_EXITO
+    except ValidacionError as e:
+        print(str(e))
+        return SALIDA_USO
+    except DependenciaError as e:
+        print(str(e))
+        return SALIDA_DEPENDENCIAS
+    except KeyboardInterrupt:
+        return SALIDA_EXITO
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+sincronizar.py - Descarga solo lo nuevo de una lista de reproducción o un canal
+La lista se recorre en modo plano (id, URL y título de cada entrada, sin
+extraer los videos) y página a página: yt-dlp solo pide la siguiente página
+cuando se llega a ella. Cada entrada se busca en el índice de descargas
+(archivo_descargas.py); tras PARAR_TRAS_CONOCIDAS entradas seguidas ya
+descargadas se deja de listar, así la sincronización diaria de un canal de
+miles de videos cuesta una página de listado. Solo las entradas nuevas se
+extraen y se descargan, de la más antigua a la más reciente.
+
+Se usa desde descargar_videos.py:
+    python descargar_videos.py --sincronizar https://www.youtube.com/@canal/videos
+"""
+
+from canonicalizar import canonicalizar
+from ytdlp_en_proceso import RegistroSilencioso, cargar_ytdlp, mensaje_de_error
+
+
+# Entradas ya descargadas seguidas tras las que se deja de listar (0 = nunca)
+PARAR_TRAS_CONOCIDAS = 20
+
+
+def _es_sublista(ydl, entrada, url):
+    """Si una entrada plana es otra lista (p. ej. las pestañas de un canal)
+
+    Solo se consulta el extractor cuando ni él ni la URL dicen que es un
+    video; las entradas sin extractor (feeds RSS) se tratan como videos.
+    """
+    clave = entrada.get('ie_key')
+    if entrada.get('_type') == 'playlist':
+        return True
+    if not clave or canonicalizar(url)[1] is not None:
+        return False
+    extractor = ydl.get_info_extractor(clave)
+    return extractor is not None and extractor.is_single_video(url) is not True
+
+
+def entradas_planas(ydl, url):
+    """Genera (url, id, título) de las entradas de una lista, página a página
+
+    Las sublistas (pestañas de un canal, listas de un perfil) se recorren
+    en el sitio donde aparecen.
+    """
+    yt_dlp = cargar_ytdlp()
+    resultado = ydl.extract_info(url, download=False, process=False)
+    if resultado.get('_type') in ('url', 'url_transparent') and resultado.get('url') != url:
+        # Redirección (p. ej. /@canal -> su pestaña de videos)
+        yield from entradas_planas(ydl, resultado['url'])
+        return
+    if resultado.get('entries') is None:
+        # No es una lista: la URL es un video suelto
+        yield url, resultado.get('id'), resultado.get('title')
+        return
+
+    for _, entrada in yt_dlp.utils.PlaylistEntries(ydl, resultado).get_requested_items():
+        if not entrada:
+            continue
+        destino = entrada.get('url') or entrada.get('webpage_url')
+        if not destino:
+            continue
+        if _es_sublista(ydl, entrada, destino):
+            yield from entradas_planas(ydl, destino)
+        else:
+            yield destino, entrada.get('id'), entrada.get('title')
+
+
+def nuevas_entradas(url, es_conocida, parar_tras=PARAR_TRAS_CONOCIDAS, archivo_cookies=None):
+    """Entradas de la lista que es_conocida(url, id) no reconoce
+
+    Devuelve ([(url, id, título)] en el orden de la lista, resumen) con
+    resumen = {'revisadas', 'conocidas', 'completa'}; 'completa' es False
+    si se dejó de listar por encontrar parar_tras conocidas seguidas.
+    Si el listado falla lanza RuntimeError con el mensaje de yt-dlp.
+    """
+    yt_dlp = cargar_ytdlp()
+    params = {
+        'quiet': True,
+        'no_warnings': True,
+        'extract_flat': True,
+        'lazy_playlist': True,
+        'socket_timeout': 20,
+        'logger': RegistroSilencioso(),
+    }
+    if archivo_cookies:
+        params['cookiefile'] = archivo_cookies
+
+    nuevas = []
+    resumen = {'revisadas': 0, 'conocidas': 0, 'completa': True}
+    seguidas = 0
+    with yt_dlp.YoutubeDL(params) as ydl:
+        try:
+            for entrada in entradas_planas(ydl, url):
+                resumen['revisadas'] += 1
+                if not es_conocida(entrada[0], entrada[1]):
+                    nuevas.append(entrada)
+                    seguidas = 0
+                    continue
+                resumen['conocidas'] += 1
+                seguidas += 1
+                if parar_tras and seguidas >= parar_tras:
+                    resumen['completa'] = False
+                    break
+        except yt_dlp.utils.YoutubeDLError as e:
+            raise RuntimeError(mensaje_de_error(e)) from None
+    return nuevas, resumen
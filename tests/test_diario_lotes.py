@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Reanudación de lotes (diario_lotes.py y DescargadorVideos._trabajos_del_lote)
+
+Un lote reanudado no vuelve a leer ni a validar lo que ya está en el diario.
+
+Uso:
+    python -m pytest tests/test_diario_lotes.py
+"""
+
+import gzip
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import descargar_videos  # noqa: E402
+import ingesta_urls  # noqa: E402
+from diario_lotes import FALLIDO, HECHO, DiarioLote  # noqa: E402
+from ingesta_urls import EstadisticasIngesta  # noqa: E402
+
+URLS = [f"https://www.youtube.com/watch?v=video{i:06d}" for i in range(1, 7)]
+
+
+def trabajos(diario, archivo):
+    return list(descargar_videos.DescargadorVideos._trabajos_del_lote(
+        None, diario, str(archivo), EstadisticasIngesta(), 3
+    ))
+
+
+def escribir_lista(ruta, lineas):
+    contenido = "".join(linea + "\n" for linea in lineas).encode("utf-8")
+    if ruta.suffix == ".gz":
+        contenido = gzip.compress(contenido)
+    ruta.write_bytes(contenido)
+
+
+def leer_a_medias(ruta_diario, archivo, cuantas):
+    """Simula un lote cortado tras leer `cuantas` URLs; la primera terminó bien"""
+    diario = DiarioLote(ruta_diario)
+    estadisticas = EstadisticasIngesta()
+    for url in ingesta_urls.iterar_urls(str(archivo), estadisticas):
+        diario.agregar(url, (estadisticas.posicion, estadisticas.lineas))
+        if diario.total == cuantas:
+            break
+    diario.marcar(URLS[0], HECHO)
+    diario.cerrar()
+
+
+def test_lote_cargado_no_abre_el_archivo(tmp_path, monkeypatch):
+    archivo = tmp_path / "urls.txt"
+    escribir_lista(archivo, URLS)
+    ruta = tmp_path / "diario.jsonl"
+    diario = DiarioLote(ruta)
+    for url in URLS[:3]:
+        diario.agregar(url)
+    diario.terminar_carga()
+    diario.marcar(URLS[0], HECHO)
+    diario.marcar(URLS[1], FALLIDO, "error")
+    diario.cerrar()
+
+    def no_leer(*args, **kwargs):
+        raise AssertionError("el archivo de URLs no debe abrirse")
+
+    monkeypatch.setattr(ingesta_urls, "abrir_fuente", no_leer)
+    monkeypatch.setattr(descargar_videos, "iterar_urls", no_leer)
+    diario = DiarioLote(ruta)
+    assert diario.cargado
+    assert trabajos(diario, archivo) == [(2, URLS[1]), (3, URLS[2])]
+    diario.cerrar()
+
+
+@pytest.mark.parametrize("nombre", ["urls.txt", "urls.txt.gz"])
+def test_lectura_a_medias_sigue_desde_la_posicion(tmp_path, monkeypatch, nombre):
+    archivo = tmp_path / nombre
+    escribir_lista(archivo, ["# lista", *URLS[:2], "", *URLS[2:]])
+    ruta = tmp_path / "diario.jsonl"
+    leer_a_medias(ruta, archivo, 3)
+
+    validadas = []
+    validar = ingesta_urls.validar_url
+
+    def validar_url(linea):
+        validadas.append(linea)
+        return validar(linea)
+
+    monkeypatch.setattr(ingesta_urls, "validar_url", validar_url)
+    diario = DiarioLote(ruta)
+    assert not diario.cargado
+    assert trabajos(diario, archivo) == [(i, url) for i, url in enumerate(URLS, 1)][1:]
+    # Solo se validan las líneas posteriores a la última URL del diario
+    assert validadas == URLS[3:]
+    assert diario.cargado and diario.total == len(URLS)
+    diario.cerrar()
+
+    diario = DiarioLote(ruta)
+    assert diario.cargado and diario.lectura is not None
+    diario.cerrar()
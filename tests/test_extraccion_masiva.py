@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Entradas de la extracción masiva (extraccion_masiva.leer_entradas)
+
+Cada línea con contenido da una entrada, válida o no, para que la salida
+JSONL cuadre con la entrada.
+
+Uso:
+    python -m pytest tests/test_extraccion_masiva.py
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from extraccion_masiva import leer_entradas  # noqa: E402
+from ingesta_urls import MOTIVO_REPETIDA  # noqa: E402
+
+A = "https://www.youtube.com/watch?v=aaaaaaaaaaa"
+B = "https://www.youtube.com/watch?v=bbbbbbbbbbb"
+
+
+def test_invalidas_y_repetidas_conservan_su_linea(tmp_path):
+    archivo = tmp_path / "urls.txt"
+    archivo.write_text(f"{A}\n# comentario\nhttps://youtu.be/aaaaaaaaaaa\nno-es-url\n\n{B}\n")
+
+    entradas = list(leer_entradas(str(archivo)))
+    assert [(linea, texto) for linea, texto, _ in entradas] == [
+        (1, A), (3, "https://youtu.be/aaaaaaaaaaa"), (4, "no-es-url"), (6, B)
+    ]
+    motivos = [motivo for _, _, motivo in entradas]
+    assert motivos[0] is None and motivos[3] is None
+    assert motivos[1] == MOTIVO_REPETIDA
+    assert motivos[2] not in (None, MOTIVO_REPETIDA)
+
+
+def test_con_repetidas_se_extraen_de_nuevo(tmp_path):
+    archivo = tmp_path / "urls.txt"
+    archivo.write_text(f"{A}\n{A}\n")
+    assert list(leer_entradas(str(archivo), repetidas=True)) == [(1, A, None), (2, A, None)]
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Plazos del vigilante de descargas (vigilancia.py) con un reloj simulado
+
+Uso:
+    python -m pytest tests/test_vigilancia.py
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from eventos_progreso import EventoProgreso  # noqa: E402
+from vigilancia import PLAZO_BASE, VigilanteDescarga  # noqa: E402
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 0.0
+
+    def __call__(self):
+        return self.ahora
+
+
+def descargar(vigilante, reloj, segundos, velocidad, total=None, descargados=0):
+    """Avanza el reloj de segundo en segundo recibiendo `velocidad` bytes/s
+
+    Devuelve (motivo de detención o None, bytes descargados).
+    """
+    for _ in range(segundos):
+        reloj.ahora += 1
+        descargados += velocidad
+        vigilante.observar(EventoProgreso(1, 'downloading', descargados, total))
+        motivo = vigilante.revisar()
+        if motivo is not None:
+            return motivo, descargados
+    return None, descargados
+
+
+def test_sin_tamano_no_hay_plazo_total_mientras_llegan_datos():
+    reloj = Reloj()
+    vigilante = VigilanteDescarga(reloj=reloj)
+    # Media hora a 500 KB/s sin que yt-dlp informe del tamaño (~900 MB)
+    motivo, descargados = descargar(vigilante, reloj, 1800, 500 * 1024)
+    assert motivo is None
+    assert descargados == 1800 * 500 * 1024
+
+
+def test_sin_tamano_el_plazo_base_limita_la_preparacion():
+    reloj = Reloj()
+    vigilante = VigilanteDescarga(reloj=reloj)
+    reloj.ahora = PLAZO_BASE
+    assert vigilante.revisar() is None
+    reloj.ahora = PLAZO_BASE + 1
+    assert "plazo" in vigilante.revisar()
+
+
+def test_sin_tamano_sigue_detectando_el_estancamiento():
+    reloj = Reloj()
+    vigilante = VigilanteDescarga(reloj=reloj)
+    _, descargados = descargar(vigilante, reloj, 600, 500 * 1024)
+    motivo, _ = descargar(vigilante, reloj, 120, 0, descargados=descargados)
+    assert motivo is not None and "sin recibir datos" in motivo
+
+
+def test_con_tamano_el_plazo_crece_con_el_archivo():
+    reloj = Reloj()
+    total = 150 * 1024 * 1024
+    vigilante = VigilanteDescarga(reloj=reloj)
+    # 150 MB a 10 KB/s: por encima de la velocidad mínima, pero el plazo
+    # (300 s + 150 MB / 50 KB/s) se agota antes de terminar
+    motivo, _ = descargar(vigilante, reloj, 20000, 10 * 1024, total=total)
+    assert motivo is not None and motivo.startswith("superado el plazo de")
+    assert reloj.ahora == int(vigilante.plazo()) + 1
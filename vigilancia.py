@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+vigilancia.py - Vigilante de descargas estancadas
+Sustituye el tiempo límite fijo: una descarga solo se detiene si deja de
+recibir datos (o los recibe por debajo de un mínimo) durante una ventana de
+tiempo, o si supera un plazo que crece con el tamaño esperado del archivo.
+Sin tamaño conocido no hay plazo total, solo uno para arrancar.
+"""
+
+import time
+from collections import deque
+
+from eventos_progreso import POSTPROCESO, PROGRESO, formatear_bytes
+
+
+VENTANA_ESTANCAMIENTO = 60        # segundos de ventana para medir el avance
+VELOCIDAD_MINIMA = 1024           # bytes/s medios en la ventana (0 = solo sin datos)
+PLAZO_BASE = 300                  # segundos para extraer y arrancar (o entre archivos)
+RITMO_PLAZO = 50 * 1024           # el plazo crece 1 s por cada 50 KB esperados
+
+# Fases de una ejecución de yt-dlp: el estancamiento solo se mide descargando
+# (extraer o postprocesar no recibe bytes y no cuenta como atasco)
+PREPARANDO = "preparando"
+DESCARGANDO = "descargando"
+POSTPROCESANDO = "postprocesando"
+
+
+class VigilanteDescarga:
+    """Decide, a partir de los eventos de progreso, si una descarga está atascada
+
+    observar(evento) alimenta al vigilante y revisar() devuelve el motivo
+    para detener la descarga o None si va bien. El plazo total es
+    plazo_base + tamaño esperado / ritmo_plazo, y se recalcula en cuanto
+    yt-dlp informa del tamaño (de los metadatos o de Content-Length).
+
+    Si yt-dlp no da tamaño ni estimación (directos, algunos HLS) no hay
+    plazo total: mientras llegan datos mandan la ventana de estancamiento
+    y la velocidad mínima, y plazo_base solo limita el tiempo sin recibir
+    nada (la preparación antes del primer byte o entre dos archivos).
+    """
+
+    def __init__(self, ventana_estancamiento=VENTANA_ESTANCAMIENTO,
+                 velocidad_minima=VELOCIDAD_MINIMA, plazo_base=PLAZO_BASE,
+                 ritmo_plazo=RITMO_PLAZO, reloj=time.monotonic):
+        self.ventana = ventana_estancamiento
+        self.velocidad_minima = self._velocidad_configurada = velocidad_minima
+        self.plazo_base = plazo_base
+        self.ritmo_plazo = self._ritmo_configurado = ritmo_plazo
+        self.reloj = reloj
+        self.inicio = reloj()
+        self.ultimo_dato = self.inicio  # último momento en que llegaron bytes
+        self.fase = PREPARANDO
+        self.tamano_esperado = None
+        self._terminados = 0          # bytes de los archivos ya completos
+        self._actual = 0              # bytes del archivo en curso
+        self._muestras = deque()      # (momento, bytes acumulados)
+
+    @property
+    def bytes_descargados(self):
+        return self._terminados + self._actual
+
+    def plazo(self):
+        """Segundos que puede durar la ejecución entera (None sin tamaño esperado)"""
+        if self.tamano_esperado is None:
+            return None
+        return self.plazo_base + self.tamano_esperado / self.ritmo_plazo
+
+    def descontar_pausa(self, segundos):
+        """Una pausa impuesta (ver ancho_banda.py) no cuenta como atasco ni como plazo"""
+        self.inicio += segundos
+        self.ultimo_dato += segundos
+        self._muestras = deque((momento + segundos, cantidad)
+                               for momento, cantidad in self._muestras)
+
+    def ajustar_a_tasa(self, tasa):
+        """Con el ancho de banda limitado a `tasa` bytes/s, lento no es atascado"""
+        self.velocidad_minima = min(self._velocidad_configurada, tasa / 4)
+        self.ritmo_plazo = min(self._ritmo_configurado, tasa / 2)
+
+    def observar(self, evento):
+        if evento.tipo == PROGRESO:
+            if evento.total:
+                esperado = self._terminados + evento.total
+                self.tamano_esperado = max(self.tamano_esperado or 0, esperado)
+            if evento.estado == 'finished':
+                self._terminados += evento.descargados
+                self._actual = 0
+                self.fase = PREPARANDO
+                self._muestras.clear()
+            else:
+                if evento.descargados > self._actual:
+                    self.ultimo_dato = self.reloj()
+                self._actual = evento.descargados
+                self.fase = DESCARGANDO
+                self._muestras.append((self.reloj(), self.bytes_descargados))
+        elif evento.tipo == POSTPROCESO:
+            self.fase = POSTPROCESANDO
+            self._muestras.clear()
+
+    def revisar(self):
+        """Motivo para detener la descarga, o None si debe seguir"""
+        ahora = self.reloj()
+        plazo = self.plazo()
+        if plazo is None:
+            if ahora - self.ultimo_dato > self.plazo_base:
+                return f"superado el plazo de {self.plazo_base:.0f}s sin recibir datos"
+        elif ahora - self.inicio > plazo:
+            return (f"superado el plazo de {plazo:.0f}s "
+                    f"para {formatear_bytes(self.tamano_esperado)}")
+
+        if self.fase != DESCARGANDO or not self._muestras:
+            return None
+
+        # Referencia: la última muestra anterior al comienzo de la ventana
+        desde = ahora - self.ventana
+        muestras = self._muestras
+        while len(muestras) > 1 and muestras[1][0] <= desde:
+            muestras.popleft()
+        momento, referencia = muestras[0]
+        if momento > desde:
+            return None   # todavía no hay una ventana completa de historia
+
+        recibidos = self.bytes_descargados - referencia
+        if recibidos <= 0:
+            return f"sin recibir datos en {self.ventana:g}s"
+        if self.velocidad_minima and recibidos / self.ventana < self.velocidad_minima:
+            return (f"menos de {formatear_bytes(self.velocidad_minima)}/s "
+                    f"durante {self.ventana:g}s")
+        return None
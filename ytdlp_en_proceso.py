@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ytdlp_en_proceso.py - Backend de yt-dlp dentro del mismo proceso
+Usa la API de Python (yt_dlp.YoutubeDL) en lugar de lanzar un intérprete
+nuevo por cada intento de descarga
+"""
+
+import optparse
+import threading
+import time
+from contextlib import nullcontext
+
+from core import (
+    DependenciaError,
+    capturar_salida_hilo,
+    crear_vigilante,
+    evento_cancelacion_actual,
+    registrar_cuota_banda,
+)
+from cortesia import LIMITADOR_SITIOS, es_limite_de_tasa
+from eventos_progreso import BUS_PROGRESO, AnalizadorProgreso, EventoPostproceso
+
+
+_modulo_ytdlp = None
+_cerrojo_carga = threading.Lock()
+
+
+def cargar_ytdlp():
+    """Importa yt_dlp una sola vez por proceso"""
+    global _modulo_ytdlp
+
+    if _modulo_ytdlp is None:
+        with _cerrojo_carga:
+            if _modulo_ytdlp is None:
+                try:
+                    import yt_dlp
+                except ImportError as e:
+                    raise DependenciaError(
+                        "❌ El modo en proceso necesita el paquete yt-dlp\n"
+                        "   Instálalo con: pip install yt-dlp"
+                    ) from e
+                _modulo_ytdlp = yt_dlp
+    return _modulo_ytdlp
+
+
+def precargar():
+    """Carga yt_dlp y sus extractores para que la primera descarga no pague el coste"""
+    yt_dlp = cargar_ytdlp()
+    with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
+        ydl.get_info_extractor('Generic')
+    list(yt_dlp.extractor.gen_extractor_classes())
+
+
+class RegistroSilencioso:
+    """Logger para YoutubeDL cuando los errores ya llegan en la excepción"""
+
+    def debug(self, mensaje):
+        pass
+
+    info = warning = error = debug
+
+
+def mensaje_de_error(error):
+    """Texto de una excepción de yt-dlp sin el prefijo 'ERROR: '"""
+    mensaje = str(error)
+    return mensaje[len("ERROR: "):] if mensaje.startswith("ERROR: ") else mensaje
+
+
+def traducir_opciones(argumentos):
+    """Convierte argumentos de línea de comandos de yt-dlp en parámetros de la API
+
+    Usa el mismo analizador que el ejecutable, así las listas que construyen
+    obtener_opciones_base y los perfiles de plataformas.py significan
+    exactamente lo mismo en los dos backends.
+
+    Devuelve (params, urls, archivo_info_json).
+    """
+    yt_dlp = cargar_ytdlp()
+    try:
+        analizado = yt_dlp.parse_options(list(argumentos))
+    except (SystemExit, optparse.OptParseError) as e:
+        raise ValueError(f"Opciones de yt-dlp no válidas: {' '.join(argumentos)}") from e
+
+    return analizado.ydl_opts, analizado.urls, analizado.options.load_info_filename
+
+
+def _registrar_errores(ydl):
+    """Guarda los mensajes de error de yt-dlp además de mostrarlos"""
+    errores = []
+    to_stderr_original = ydl.to_stderr
+
+    def to_stderr(mensaje, only_once=False):
+        errores.append(mensaje)
+        to_stderr_original(mensaje, only_once=only_once)
+
+    ydl.to_stderr = to_stderr
+    return errores
+
+
+def ejecutar_en_proceso(argumentos, capturar_salida=False):
+    """Ejecuta yt-dlp con la API de Python
+
+    Devuelve lo mismo que core.ejecutar_comando_ytdlp: (exito, salida), donde
+    salida es el stdout capturado si tuvo éxito o los errores si falló.
+    """
+    yt_dlp = cargar_ytdlp()
+
+    try:
+        params, urls, archivo_info = traducir_opciones(argumentos)
+    except ValueError as e:
+        return False, str(e) if capturar_salida else None
+
+    url = urls[-1] if urls else None
+    analizador = AnalizadorProgreso(url=url)
+    cancelar = evento_cancelacion_actual()
+    if cancelar is not None and cancelar.is_set():
+        return False, None
+    if url is not None and not LIMITADOR_SITIOS.esperar_turno(url, cancelar):
+        return False, None
+
+    # Aquí el vigilante solo actúa cuando llegan datos: para que una conexión
+    # muda no espere más que la ventana, se acota el socket_timeout de yt-dlp
+    vigilante = crear_vigilante()
+    detenida = None
+
+    def publicar_progreso(estado):
+        nonlocal detenida
+        if cancelar is not None and cancelar.is_set():
+            raise yt_dlp.utils.DownloadCancelled("Descarga cancelada")
+        evento = analizador.procesar_estado(estado)
+        if evento is not None:
+            antes = vigilante.bytes_descargados
+            vigilante.observar(evento)
+            if cuota is not None:
+                # Si la cuota bajó, ratelimit tarda en notarse: saldar la deuda aquí
+                cuota.consumir(vigilante.bytes_descargados - antes)
+                pausa = cuota.espera()
+                if pausa > 0:
+                    time.sleep(pausa)
+                    vigilante.descontar_pausa(pausa)
+            BUS_PROGRESO.publicar(evento)
+        detenida = vigilante.revisar()
+        if detenida is not None:
+            raise yt_dlp.utils.DownloadCancelled(f"Descarga detenida: {detenida}")
+
+    def publicar_postproceso(estado):
+        evento = EventoPostproceso(
+            analizador.trabajo, estado.get('status'), estado.get('postprocessor'),
+            (estado.get('info_dict') or {}).get('id')
+        )
+        vigilante.observar(evento)
+        BUS_PROGRESO.publicar(evento)
+
+    # El progreso lo muestran los suscriptores del bus, no yt-dlp
+    params = dict(params, noprogress=True)
+    params['socket_timeout'] = min(params.get('socket_timeout') or 20, vigilante.ventana)
+
+    # El YoutubeDL lee params['ratelimit'] en cada bloque: basta con cambiarlo
+    cuota = None
+    solo_informacion = any(params.get(clave) for clave in (
+        'simulate', 'skip_download', 'forcejson', 'dump_single_json', 'forceurl'))
+    if not solo_informacion:
+        cuota = registrar_cuota_banda(url)
+    if cuota is not None:
+        def cambiar_tasa(tasa):
+            params['ratelimit'] = tasa
+            vigilante.ajustar_a_tasa(tasa)
+
+        cuota.al_cambiar = cambiar_tasa
+        cambiar_tasa(cuota.tasa)
+    params['progress_hooks'] = list(params.get('progress_hooks') or []) + [publicar_progreso]
+    params['postprocessor_hooks'] = (
+        list(params.get('postprocessor_hooks') or []) + [publicar_postproceso]
+    )
+
+    errores = []
+    codigo = None
+    contexto = capturar_salida_hilo() if capturar_salida else nullcontext()
+
+    BUS_PROGRESO.publicar(analizador.evento_inicio())
+    try:
+        with contexto as buffer:
+            # YoutubeDL fija su stdout al crearse: debe crearse dentro de la captura
+            try:
+                with yt_dlp.YoutubeDL(params) as ydl:
+                    errores = _registrar_errores(ydl)
+                    if archivo_info is not None:
+                        codigo = ydl.download_with_info_file(
+                            yt_dlp.utils.expand_path(archivo_info)
+                        )
+                    else:
+                        codigo = ydl.download(urls)
+            except yt_dlp.utils.DownloadCancelled:
+                codigo = 101
+            except yt_dlp.utils.YoutubeDLError as e:
+                if not errores:
+                    errores.append(str(e))
+                codigo = 1
+    finally:
+        if cuota is not None:
+            cuota.liberar()
+        if codigo is None:
+            mensaje = "Ejecución interrumpida"
+        elif codigo == 101:
+            mensaje = f"Descarga detenida: {detenida}" if detenida else "Descarga cancelada"
+        else:
+            mensaje = errores[-1].strip() if errores else None
+        BUS_PROGRESO.publicar(analizador.evento_final(codigo == 0, mensaje))
+
+    if url is not None:
+        if any(es_limite_de_tasa(error) for error in errores):
+            LIMITADOR_SITIOS.registrar_limite(url)
+        elif codigo == 0:
+            LIMITADOR_SITIOS.registrar_exito(url)
+
+    if detenida is not None:
+        print(f"\n⏱️  Descarga detenida: {detenida}")
+        print("   El archivo .part se conserva: al reintentar, continúa donde se quedó")
+
+    exito = codigo == 0
+    if not capturar_salida:
+        return exito, None
+    if exito:
+        return True, buffer.getvalue()
+    return False, "\n".join(errores)